@@ -0,0 +1,113 @@
+"""Columnar archive size and scan speed vs. the SQLite partition it replaces.
+
+    python benchmarks/bench_archive.py --events 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from wire_stripper.db.archive import archive_files, archive_partitions, iter_archive
+from wire_stripper.db.partitions import list_partitions, seal_partitions
+from wire_stripper.db.store import INSERT_EVENT_SQL, Store
+
+_UAS = [
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:127.0) Gecko/20100101 Firefox/127.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15",
+]
+
+
+def _seed(store: Store, n: int, start: datetime, rng: random.Random) -> None:
+    hosts = [f"cdn{i}.tracker{i % 40}.example" for i in range(400)]
+    header_sets = []
+    for ua in _UAS:
+        for lang in ("en-US,en;q=0.9", "de-DE,de;q=0.8"):
+            for accept in ("*/*", "text/html,application/xhtml+xml", "image/avif,image/webp"):
+                header_sets.append(
+                    {"user-agent": ua, "accept-language": lang, "accept": accept,
+                     "accept-encoding": "gzip, deflate, br", "connection": "keep-alive"}
+                )
+    rows = []
+    for i in range(n):
+        host = rng.choice(hosts)
+        headers = dict(rng.choice(header_sets), host=host)
+        ts = start + timedelta(seconds=i * 3)
+        rows.append(
+            Store.event_params(
+                {
+                    "event_id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "ts": ts.isoformat(timespec="seconds"),
+                    "sensor": "mitmproxy",
+                    "profile_id": "default",
+                    "url": f"https://{host}/p/{rng.getrandbits(32):x}?v={i % 7}",
+                    "hostname": host,
+                    "method": rng.choice(["GET", "GET", "GET", "POST"]),
+                    "dst_ip": f"203.0.{rng.randrange(64)}.{rng.randrange(256)}",
+                    "dst_port": 443,
+                    "proto": "tcp",
+                    "headers_json": json.dumps(headers),
+                }
+            )
+        )
+    store.executemany(INSERT_EVENT_SQL, rows)
+
+
+def _scan_sqlite(path: str) -> tuple[int, float]:
+    conn = sqlite3.connect(path)
+    t0 = time.perf_counter()
+    n = sum(1 for _ in conn.execute("SELECT hostname, ts, headers_json FROM event"))
+    conn.close()
+    return n, time.perf_counter() - t0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=200_000)
+    ap.add_argument("--format", default="auto")
+    args = ap.parse_args()
+    rng = random.Random(15)
+
+    with tempfile.TemporaryDirectory() as root:
+        store = Store(root)
+        store.init_db()
+        now = datetime(2026, 6, 1)
+        _seed(store, args.events, now - timedelta(days=60), rng)
+        seal_partitions(store, hot_days=1, period="week", now=now)
+        parts = list_partitions(store)
+        part_bytes = sum(p.path.stat().st_size for p in parts)
+        sq_rows = sq_time = 0.0
+        for p in parts:
+            n, dt = _scan_sqlite(str(p.path))
+            sq_rows += n
+            sq_time += dt
+
+        stats = archive_partitions(store, older_than_days=0, fmt=args.format, now=now)
+        files = archive_files(store, "event")
+        t0 = time.perf_counter()
+        scanned = sum(
+            1 for f in files for _ in iter_archive(f, ["hostname", "ts", "headers_json"])
+        )
+        scan = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        hosts = sum(1 for f in files for _ in iter_archive(f, ["hostname"]))
+        scan_one = time.perf_counter() - t0
+        store.close()
+
+    print(f"events:                 {args.events}")
+    print(f"sqlite partitions:      {part_bytes / 1e6:8.2f} MB ({len(parts)} files)")
+    print(f"archive ({files[0].suffix}):        {stats.archive_bytes / 1e6:8.2f} MB  ratio {part_bytes / stats.archive_bytes:.1f}x")
+    print(f"sqlite scan, 3 cols:    {sq_rows / sq_time:12,.0f} rows/s")
+    print(f"archive scan, 3 cols:   {scanned / scan:12,.0f} rows/s")
+    print(f"archive scan, hostname: {hosts / scan_one:12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Added per-flow latency of the addon under N concurrent flows on one event loop.
+
+    python benchmarks/bench_async_addon.py --flows 20000 --concurrency 100 --upstream-ms 50
+
+Synthetic flows wait a random "upstream" time, then go through the addon's
+`handle()` (sync) or `ahandle()` (async): the request hook minus building the
+451 response, so mitmproxy need not be installed. Request headers are
+synthetic.Headers (get_all/set_all/pop like mitmproxy's), so grey-listed
+hosts go through cookie/header stripping as they would in the proxy.
+A flow's latency runs from the moment it is due to resume until the hook
+returns, so it includes time spent waiting behind other flows' blocking
+work on the loop; "baseline" (a no-op hook) is the scheduler's own share to
+subtract. Lists are mutated every `--mutate-every` flows to force snapshot
+reloads.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+import synthetic
+from wire_stripper.db.store import Store
+from wire_stripper.policy.engine import PolicyEngine
+from wire_stripper.sensors.mitm_addon import AsyncWireStripperAddon, WireStripperAddon
+
+
+def _flow(rng: random.Random, i: int) -> SimpleNamespace:
+    host = f"cdn{rng.randrange(50)}.tracker{rng.randrange(100_000)}.example"
+    headers = {
+        "Host": host,
+        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:127.0) Gecko/20100101 Firefox/127.0",
+        "Accept": "*/*",
+        "Accept-Encoding": "gzip, deflate, br",
+    }
+    if rng.random() < 0.5:
+        headers["Cookie"] = f"sid={i:x}"
+    return synthetic.flow(f"https://{host}/p/{i}", host, headers, (f"203.0.113.{i % 250}", 443))
+
+
+def _pct(samples: list[float], q: int) -> float:
+    if len(samples) < 2:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+async def _drive(
+    addon: WireStripperAddon,
+    hook,
+    flows: int,
+    concurrency: int,
+    upstream: float,
+    mutate_every: int,
+) -> list[float]:
+    rng = random.Random(18)
+    latencies: list[float] = []
+    sem = asyncio.Semaphore(concurrency)
+    editor = PolicyEngine(addon.store, profile_id=addon.policy.profile_id)
+
+    async def one(i: int) -> None:
+        async with sem:
+            flow = _flow(rng, i)
+            ready = time.perf_counter() + rng.random() * upstream  # upstream / TLS time
+            await asyncio.sleep(ready - time.perf_counter())
+            if mutate_every and i % mutate_every == 0:
+                # Another process edits the lists; hits the db off-loop.
+                await asyncio.to_thread(
+                    editor.add_list_entry, "black", "domain", f"new{i}.example", "bench"
+                )
+                ready = time.perf_counter()
+            await hook(flow)
+            latencies.append(time.perf_counter() - ready)
+
+    await asyncio.gather(*(one(i) for i in range(flows)))
+    return latencies
+
+
+def _seed_lists(store: Store, profile_id: str, n: int) -> None:
+    store.executemany(
+        "INSERT INTO list_entry(entry_id, profile_id, list_type, target_type, target_value, reason) "
+        "VALUES(?,?,?,?,?,?)",
+        [
+            (f"seed-{i}", profile_id, "black" if i % 4 else "grey", "domain", f"tracker{i}.example", "bench")
+            for i in range(n)
+        ],
+    )
+
+
+async def _run(
+    mode: str,
+    flows: int,
+    concurrency: int,
+    upstream: float,
+    mutate_every: int,
+    list_entries: int,
+) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as root:
+        store = Store(root)
+        store.init_db()
+        if mode == "baseline":
+            addon: WireStripperAddon = WireStripperAddon(store)
+
+            async def hook(flow) -> None:
+                pass
+
+        elif mode == "async":
+            addon = AsyncWireStripperAddon(store, refresh_interval=0.05)
+            await addon.running()
+            hook = addon.ahandle
+        else:
+            addon = WireStripperAddon(store)
+            addon.policy.refresh_interval = 0.05
+
+            async def hook(flow) -> None:
+                addon.handle(flow)
+
+        _seed_lists(store, addon.policy.profile_id, list_entries)
+        if isinstance(addon, AsyncWireStripperAddon):
+            await addon.refresh()
+        else:
+            addon.policy.poll()
+        t0 = time.perf_counter()
+        lat = await _drive(addon, hook, flows, concurrency, upstream, mutate_every)
+        elapsed = time.perf_counter() - t0
+        if isinstance(addon, AsyncWireStripperAddon):
+            await addon.done()
+        else:
+            addon.done()
+        store.close()
+    lat_us = [x * 1e6 for x in lat]
+    return {
+        "p50": _pct(lat_us, 50),
+        "p99": _pct(lat_us, 99),
+        "max": max(lat_us),
+        "flows_per_s": flows / elapsed,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--flows", type=int, default=20_000)
+    ap.add_argument("--concurrency", type=int, default=100)
+    ap.add_argument("--upstream-ms", type=float, default=50.0, help="max simulated upstream time")
+    ap.add_argument("--list-entries", type=int, default=50_000)
+    ap.add_argument("--mutate-every", type=int, default=500, help="0 disables list edits")
+    args = ap.parse_args()
+    for mode in ("baseline", "sync", "async"):
+        r = asyncio.run(
+            _run(
+                mode,
+                args.flows,
+                args.concurrency,
+                args.upstream_ms / 1e3,
+                args.mutate_every,
+                args.list_entries,
+            )
+        )
+        print(
+            f"{mode:>8}: p50 {r['p50']:7.1f} us, p99 {r['p99']:8.1f} us, "
+            f"max {r['max']:9.1f} us, {r['flows_per_s']:8.0f} flows/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
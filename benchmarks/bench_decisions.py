@@ -0,0 +1,71 @@
+"""Decision cache + per-minute counters vs. evaluating and writing every request.
+
+    python benchmarks/bench_decisions.py --pages 500 --requests 200 --hosts 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+
+from wire_stripper.db.store import Store
+from wire_stripper.db.writer import BatchWriter
+from wire_stripper.policy.engine import PolicyEngine
+
+
+def _run(pages: int, requests: int, hosts: int, cache: int, mode: str) -> dict[str, float]:
+    rng = random.Random(17)
+    with tempfile.TemporaryDirectory() as root:
+        store = Store(root)
+        store.init_db()
+        writer = BatchWriter(store).start()
+        engine = PolicyEngine(
+            store, writer=writer, decision_cache_size=cache, decision_mode=mode
+        )
+        for i in range(200):
+            engine.add_list_entry("black", "domain", f"tracker{i}.example", "bench")
+        t0 = time.perf_counter()
+        for page in range(pages):
+            names = [f"cdn{rng.randrange(hosts * 4)}.tracker{rng.randrange(400)}.example" for _ in range(hosts)]
+            for _ in range(requests):
+                host = rng.choice(names)
+                result = engine.evaluate(host, f"203.0.113.{page % 250}")
+                engine.record_decision(f"https://{host}/", host, None, result)
+        engine.flush_decisions()
+        writer.flush()
+        elapsed = time.perf_counter() - t0
+        writer.close()
+        rows = store.conn.execute(
+            "SELECT (SELECT COUNT(*) FROM decision) + (SELECT COUNT(*) FROM decision_counter)"
+        ).fetchone()[0]
+        store.close()
+    n = pages * requests
+    return {
+        "us_per_request": elapsed / n * 1e6,
+        "evaluations": engine.decisions.misses,
+        "rows": rows,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=500)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--hosts", type=int, default=10)
+    args = ap.parse_args()
+    for label, cache, mode in (
+        ("no cache, row per request ", 0, "rows"),
+        ("cache, row per request    ", 10_000, "rows"),
+        ("cache, per-minute counters", 10_000, "counters"),
+    ):
+        r = _run(args.pages, args.requests, args.hosts, cache, mode)
+        print(
+            f"{label}: {r['us_per_request']:6.2f} us/req, "
+            f"{r['evaluations']:>7} evaluations, {r['rows']:>7} rows written"
+        )
+
+
+if __name__ == "__main__":
+    main()
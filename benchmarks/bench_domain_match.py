@@ -0,0 +1,111 @@
+"""Suffix-walk domain matching vs. one SQL query per label.
+
+    python benchmarks/bench_domain_match.py --entries 200000 --queries 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import string
+import tempfile
+import time
+
+from wire_stripper.db.store import Store
+from wire_stripper.policy.engine import PolicyEngine
+
+_TLDS = ["com", "net", "org", "io", "co.uk", "com.au", "de"]
+
+
+def _label(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+
+
+def _seed(store: Store, entries: int, rng: random.Random) -> list[str]:
+    bases: list[str] = []
+    rows = []
+    for i in range(entries):
+        base = f"{_label(rng)}{i}.{rng.choice(_TLDS)}"
+        bases.append(base)
+        list_type = rng.choices(["black", "grey", "white"], weights=[8, 1, 1])[0]
+        rows.append((f"bench:{i}", "default", list_type, "domain", base))
+    store.conn.executemany(
+        "INSERT INTO list_entry(entry_id, profile_id, list_type, target_type, target_value) VALUES(?,?,?,?,?)",
+        rows,
+    )
+    store.conn.commit()
+    return bases
+
+
+def _hostnames(bases: list[str], n: int, rng: random.Random) -> list[str]:
+    out = []
+    for _ in range(n):
+        if rng.random() < 0.5:
+            depth = rng.randint(0, 3)
+            host = ".".join([_label(rng) for _ in range(depth)] + [rng.choice(bases)])
+        else:
+            host = f"{_label(rng)}.{_label(rng)}.{rng.choice(_TLDS)}"
+        out.append(host)
+    return out
+
+
+def _sql_per_label(store: Store, host: str) -> str | None:
+    name = host
+    while name:
+        for list_type in ("white", "black", "grey"):
+            row = store.conn.execute(
+                "SELECT entry_id FROM list_entry WHERE profile_id=? AND list_type=? AND target_type='domain' AND target_value=?",
+                ("default", list_type, name),
+            ).fetchone()
+            if row:
+                return row[0]
+        _, _, name = name.partition(".")
+    return None
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entries", type=int, default=200_000)
+    ap.add_argument("--queries", type=int, default=100_000)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as root:
+        store = Store(root)
+        store.init_db()
+        bases = _seed(store, args.entries, rng)
+        hosts = _hostnames(bases, args.queries, rng)
+
+        engine = PolicyEngine(store)
+        t0 = time.perf_counter()
+        snap = engine.refresh()
+        build_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        hits = sum(1 for h in hosts if snap.match_domain(h))
+        trie_s = time.perf_counter() - t0
+
+        sample = hosts[: min(len(hosts), 20_000)]
+        t0 = time.perf_counter()
+        sql_hits = sum(1 for h in sample if _sql_per_label(store, h))
+        sql_s = time.perf_counter() - t0
+        store.close()
+
+    print(
+        {
+            "entries": args.entries,
+            "queries": len(hosts),
+            "snapshot_build_s": round(build_s, 3),
+            "suffix_walk_ops_per_s": round(len(hosts) / trie_s),
+            "suffix_walk_us_per_op": round(trie_s / len(hosts) * 1e6, 3),
+            "suffix_walk_hits": hits,
+            "sql_per_label_ops_per_s": round(len(sample) / sql_s),
+            "sql_per_label_hits_in_sample": sql_hits,
+        }
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
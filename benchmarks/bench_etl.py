@@ -0,0 +1,91 @@
+"""Row-by-row vs. set-based import of a synthetic DMBT `flow_history`.
+
+    python benchmarks/bench_etl.py --rows 1000000 --legacy-rows 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+
+from wire_stripper.db.store import Store
+from wire_stripper.etl.import_dmbt import import_dmbt
+
+
+def seed_flow_history(store: Store, rows: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    hosts = [f"h{i}.example{i % 97}.com" for i in range(5000)]
+
+    def gen():
+        for i in range(rows):
+            yield (
+                f"2026-01-01T00:{(i // 60) % 60:02d}:{i % 60:02d}",
+                f"192.168.1.{i % 250 + 1}",
+                f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                443,
+                "tcp",
+                rng.randint(100, 100_000),
+                rng.choice(hosts),
+            )
+
+    with store.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO flow_history(ts, src_ip, dst_ip, dst_port, proto, bytes, hostname) VALUES(?,?,?,?,?,?,?)",
+            gen(),
+        )
+
+
+def legacy_flow_import(store: Store, profile_id: str = "default") -> int:
+    """The pre-bulk importer: fetchall() then one committed INSERT per row."""
+    n = 0
+    for row in store.conn.execute(
+        "SELECT rowid, ts, src_ip, dst_ip, dst_port, proto, bytes, hostname FROM flow_history"
+    ).fetchall():
+        rid, ts, src_ip, dst_ip, dst_port, proto, bytes_, hostname = row
+        store.upsert(
+            "INSERT OR IGNORE INTO event(event_id, ts, sensor, profile_id, hostname, src_ip, dst_ip, dst_port, proto, bytes) "
+            "VALUES(?,?,?,?,?,?,?,?,?,?)",
+            (f"dmbt:flow:{rid}", ts, "dmbt_flow", profile_id, hostname, src_ip, dst_ip, dst_port, proto, bytes_),
+        )
+        n += 1
+    return n
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--legacy-rows", type=int, default=50_000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = Store(root, db_name="legacy.sqlite")
+        store.init_db()
+        seed_flow_history(store, args.legacy_rows)
+        t0 = time.perf_counter()
+        legacy = legacy_flow_import(store)
+        legacy_s = time.perf_counter() - t0
+        store.close()
+
+        store = Store(root, db_name="bulk.sqlite")
+        store.init_db()
+        seed_flow_history(store, args.rows)
+        t0 = time.perf_counter()
+        counts = import_dmbt(store)
+        bulk_s = time.perf_counter() - t0
+        store.close()
+
+    print(
+        {
+            "legacy_rows": legacy,
+            "legacy_rows_per_s": round(legacy / legacy_s),
+            "bulk_rows": counts["event"],
+            "bulk_rows_per_s": round(counts["event"] / bulk_s),
+        }
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+"""Size and cost of federation batches for a large list.
+
+    python benchmarks/bench_federation.py --entries 1000000 --changes 1000
+
+Seeds one store with `--entries` synthetic domain entries, enqueues the
+initial (full) batch, then deletes and adds `--changes`/2 entries each and
+enqueues the delta. Reports payload bytes and enqueue time for both, and
+how long a second store takes to import the two batches from a directory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import synthetic
+from wire_stripper.db.store import Store
+from wire_stripper.federation.inbox import import_batches
+from wire_stripper.federation.outbox import enqueue_list_delta, publish_pending
+from wire_stripper.federation.sinks import DirectorySink
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entries", type=int, default=1_000_000)
+    ap.add_argument("--changes", type=int, default=1_000)
+    ap.add_argument("--codec", choices=("zstd", "gzip"), default=None)
+    args = ap.parse_args()
+
+    rng = random.Random(24)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        store = Store(root / "a")
+        store.init_db()
+        bases = synthetic.domains(args.entries, rng)
+        synthetic.seed(store, "list_entry", synthetic.list_entries(bases, rng))
+
+        rows = []
+        for label in ("initial", "delta"):
+            if label == "delta":
+                half = args.changes // 2
+                gone = rng.sample(bases, half)
+                store.executemany(
+                    "DELETE FROM list_entry WHERE profile_id='default' AND target_value=?",
+                    [(d,) for d in gone],
+                )
+                fresh = synthetic.domains(half, random.Random(2400))
+                store.executemany(
+                    "INSERT OR IGNORE INTO list_entry(entry_id, profile_id, list_type, target_type, "
+                    "target_value) VALUES(?, 'default', 'black', 'domain', ?)",
+                    [(f"bench:new{i}", f"new-{d}") for i, d in enumerate(fresh)],
+                )
+            t0 = time.perf_counter()
+            result = enqueue_list_delta(store, codec_name=args.codec)
+            rows.append((label, result, time.perf_counter() - t0))
+        publish_pending(store, DirectorySink(root / "out"))
+        store.close()
+
+        peer = Store(root / "b")
+        peer.init_db()
+        t0 = time.perf_counter()
+        imported = import_batches(peer, root / "out")
+        import_s = time.perf_counter() - t0
+        peer.close()
+
+    for label, result, seconds in rows:
+        per_change = result.payload_bytes / max(1, result.added + result.removed)
+        print(
+            f"{label:<8} +{result.added:<8} -{result.removed:<6} "
+            f"{result.payload_bytes / 1024:10.1f} KiB ({per_change:4.1f} B/change) "
+            f"enqueue {seconds:6.2f}s  ({result.entries} entries scanned)"
+        )
+    print(
+        f"import   {imported.applied} batches, +{imported.added} -{imported.removed} "
+        f"in {import_s:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
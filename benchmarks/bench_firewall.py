@@ -0,0 +1,83 @@
+"""Prefix compaction for firewall export, checked against ipaddress as the oracle.
+
+    python benchmarks/bench_firewall.py --prefixes 500000
+"""
+
+from __future__ import annotations
+
+import argparse
+import ipaddress
+import random
+import time
+
+from wire_stripper.export.firewall import compact_prefixes
+
+
+def random_prefixes(n: int, rng: random.Random) -> list[str]:
+    out = []
+    for _ in range(n):
+        if rng.random() < 0.9:
+            length = rng.choice([16, 20, 22, 23, 24, 24, 24, 25, 28, 32])
+            net = ipaddress.ip_network((rng.getrandbits(32), length), strict=False)
+        else:
+            length = rng.choice([32, 48, 56, 64, 128])
+            net = ipaddress.ip_network(((0x2001 << 112) | rng.getrandbits(96), length), strict=False)
+        out.append(str(net))
+    return out
+
+
+def oracle(blocked: list[str], allowed: list[str], version: int) -> list[str]:
+    nets = [ipaddress.ip_network(b) for b in blocked]
+    result = list(ipaddress.collapse_addresses(n for n in nets if n.version == version))
+    for a in allowed:
+        hole = ipaddress.ip_network(a, strict=False)
+        if hole.version != version:
+            continue
+        carved = []
+        for n in result:
+            if not n.overlaps(hole):
+                carved.append(n)
+            elif not hole.supernet_of(n):
+                carved.extend(n.address_exclude(hole))
+        result = list(ipaddress.collapse_addresses(carved))
+    return [str(n) for n in result]
+
+
+def check_oracle(trials: int, rng: random.Random) -> None:
+    for trial in range(trials):
+        blocked = random_prefixes(rng.randint(0, 60), rng)
+        blocked += [f"10.0.{i}.0/24" for i in range(rng.randint(0, 8))]
+        allowed = random_prefixes(rng.randint(0, 4), rng) + [f"10.0.{rng.randint(0, 8)}.{rng.randint(0, 255)}"]
+        plan = compact_prefixes(blocked, allowed)
+        assert list(plan.v4) == oracle(blocked, allowed, 4), f"v4 mismatch in trial {trial}"
+        assert list(plan.v6) == oracle(blocked, allowed, 6), f"v6 mismatch in trial {trial}"
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--prefixes", type=int, default=500_000)
+    ap.add_argument("--trials", type=int, default=300)
+    ap.add_argument("--seed", type=int, default=11)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    check_oracle(args.trials, rng)
+
+    blocked = random_prefixes(args.prefixes, rng)
+    allowed = random_prefixes(1000, rng)
+    t0 = time.perf_counter()
+    plan = compact_prefixes(blocked, allowed)
+    elapsed = time.perf_counter() - t0
+    print(
+        {
+            "oracle_trials": args.trials,
+            "input_prefixes": args.prefixes,
+            "output_prefixes": len(plan),
+            "seconds": round(elapsed, 3),
+        }
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
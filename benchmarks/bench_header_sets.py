@@ -0,0 +1,111 @@
+"""Per-request header handling: json.dumps every time vs. HeaderInterner.
+
+    python benchmarks/bench_header_sets.py --requests 200000
+
+Times the encode step on the request path and the batched event inserts the
+BatchWriter thread then does in the same process, plus bytes stored.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import time
+import uuid
+
+from wire_stripper.db.store import INSERT_EVENT_SQL, INSERT_HEADER_SET_SQL, Store
+from wire_stripper.sensors.header_sets import HeaderInterner
+
+_UAS = [
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:127.0) Gecko/20100101 Firefox/127.0",
+]
+
+
+def _requests(n: int, rng: random.Random) -> list[list[tuple[str, str]]]:
+    hosts = [f"cdn{i}.example" for i in range(200)]
+    out = []
+    for i in range(n):
+        host = rng.choice(hosts)
+        headers = [
+            ("Host", host),
+            ("User-Agent", rng.choice(_UAS)),
+            ("Accept", rng.choice(["*/*", "text/html,application/xhtml+xml", "image/webp,*/*"])),
+            ("Accept-Language", "en-US,en;q=0.9"),
+            ("Accept-Encoding", "gzip, deflate, br"),
+            ("Sec-Fetch-Mode", rng.choice(["cors", "navigate", "no-cors"])),
+            ("Connection", "keep-alive"),
+        ]
+        if rng.random() < 0.6:
+            headers.append(("Cookie", f"sid={rng.getrandbits(64):x}"))
+        if rng.random() < 0.7:
+            headers.append(("Referer", f"https://{rng.choice(hosts)}/page/{i % 50}"))
+        out.append(headers)
+    return out
+
+
+def _insert(rows: list[dict], sets: dict[str, str]) -> tuple[float, int]:
+    """Seconds spent in 500-row executemany batches, and resulting db size."""
+    with tempfile.TemporaryDirectory() as root:
+        store = Store(root)
+        store.init_db()
+        params = [Store.event_params(r) for r in rows]
+        t0 = time.perf_counter()
+        store.executemany(INSERT_HEADER_SET_SQL, [(k, v, None) for k, v in sets.items()])
+        for i in range(0, len(params), 500):
+            store.executemany(INSERT_EVENT_SQL, params[i : i + 500])
+        elapsed = time.perf_counter() - t0
+        store.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        size = store.paths.db_path.stat().st_size
+        store.close()
+    return elapsed, size
+
+
+def _event(i: int, headers_json: str | None, set_id: str | None = None) -> dict:
+    return {
+        "event_id": str(uuid.UUID(int=i)),
+        "ts": "2026-01-01T00:00:00",
+        "sensor": "mitmproxy",
+        "hostname": "cdn.example",
+        "headers_json": headers_json,
+        "header_set_id": set_id,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=200_000)
+    args = ap.parse_args()
+    reqs = _requests(args.requests, random.Random(16))
+
+    t0 = time.perf_counter()
+    full = [json.dumps(dict(headers)) for headers in reqs]
+    legacy = time.perf_counter() - t0
+
+    stored: dict[str, str] = {}
+    interner = HeaderInterner(lambda set_id, encoded: stored.setdefault(set_id, encoded))
+    t0 = time.perf_counter()
+    refs = [interner.intern(headers) for headers in reqs]
+    interned = time.perf_counter() - t0
+
+    legacy_ins, legacy_size = _insert([_event(i, h) for i, h in enumerate(full)], {})
+    interned_ins, interned_size = _insert(
+        [_event(i, residual, set_id) for i, (set_id, residual) in enumerate(refs)], stored
+    )
+
+    n = args.requests
+    for label, enc, ins, size in (
+        ("json.dumps per request", legacy, legacy_ins, legacy_size),
+        ("HeaderInterner        ", interned, interned_ins, interned_size),
+    ):
+        print(
+            f"{label}: encode {enc / n * 1e6:5.2f} us/req, insert {ins / n * 1e6:5.2f} us/req, "
+            f"total {(enc + ins) / n * 1e6:5.2f} us/req, db {size / 1e6:6.1f} MB"
+        )
+    print(f"{len(stored)} header sets, LRU hit rate {interner.hits / n:.1%}")
+
+
+if __name__ == "__main__":
+    main()
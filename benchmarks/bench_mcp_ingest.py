@@ -0,0 +1,132 @@
+"""Load generator for the MCP browser ingest endpoint.
+
+    python benchmarks/bench_mcp_ingest.py --events 500000 --batch 1000
+    python benchmarks/bench_mcp_ingest.py --inproc      # ingest() cost only
+
+Starts `wire-strip sensor mcp-browser` as a subprocess on a fresh seeded
+store, streams pre-encoded NDJSON batches over the Unix socket as fast as
+the server reads them, then sends {"op": "sync"} and stops the clock when
+the reply arrives, i.e. once every event has been committed. The rate is
+end-to-end (socket, parse, policy, SQLite) with the generator sharing the
+machine. `--inproc` calls McpBrowserIngest.ingest() directly to separate
+the Python-side cost from SQLite.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import synthetic
+from wire_stripper.db.store import Store
+from wire_stripper.sensors.mcp_browser import McpBrowserIngest, socket_path
+
+
+def _seed(root: str, entries: int, rng: random.Random) -> list[str]:
+    store = Store(root)
+    store.init_db()
+    bases = synthetic.domains(entries, rng)
+    synthetic.seed(store, "list_entry", synthetic.list_entries(bases, rng))
+    store.close()
+    return synthetic.hostnames(bases, 2_000, rng)
+
+
+def _batches(events: int, batch: int, hosts: list[str], rng: random.Random) -> list[bytes]:
+    pool = synthetic.browser_events(min(events, 50_000), rng, hosts)
+    lines = [json.dumps(e, separators=(",", ":")).encode() for e in pool]
+    out = []
+    for start in range(0, events, batch):
+        n = min(batch, events - start)
+        out.append(b"\n".join(lines[(start + i) % len(lines)] for i in range(n)) + b"\n")
+    return out
+
+
+def _inproc(root: str, batches: list[bytes], events: int) -> None:
+    store = Store(root)
+    ingest = McpBrowserIngest(store)
+    ingest.policy.warm()
+    split = [b.rstrip(b"\n").split(b"\n") for b in batches]
+    t0 = time.perf_counter()
+    for lines in split:
+        ingest.ingest(lines)
+    queued = time.perf_counter() - t0
+    ingest.writer.flush()
+    total = time.perf_counter() - t0
+    ingest.close()
+    store.close()
+    print(
+        f"in-process: ingest() {events / queued:9.0f} events/s ({queued / events * 1e6:.1f} us/event), "
+        f"incl. SQLite commit {events / total:9.0f} events/s"
+    )
+
+
+def _wait_for(path: Path, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not path.exists():
+        if proc.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("ingest server did not start")
+        time.sleep(0.05)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=500_000)
+    ap.add_argument("--batch", type=int, default=1_000, help="events per write")
+    ap.add_argument("--entries", type=int, default=20_000, help="list entries seeded")
+    ap.add_argument("--inproc", action="store_true")
+    args = ap.parse_args()
+
+    rng = random.Random(23)
+    with tempfile.TemporaryDirectory() as root:
+        hosts = _seed(root, args.entries, rng)
+        batches = _batches(args.events, args.batch, hosts, rng)
+        if args.inproc:
+            _inproc(root, batches, args.events)
+            return
+
+        path = socket_path(root)
+        env = {**os.environ, "PYTHONPATH": str(Path(__file__).resolve().parents[1])}
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "wire_stripper", "--root", root, "sensor", "mcp-browser"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            _wait_for(path, proc)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(str(path))
+            t0 = time.perf_counter()
+            for b in batches:
+                sock.sendall(b)
+            sent = time.perf_counter() - t0
+            sock.sendall(b'{"op":"sync"}\n')
+            reply = sock.makefile("rb").readline()
+            elapsed = time.perf_counter() - t0
+            sock.close()
+        finally:
+            proc.terminate()
+            proc.wait(30)
+
+        totals = json.loads(reply)
+        store = Store(root)
+        with store.reader() as conn:
+            stored = conn.execute("SELECT count(*) FROM event").fetchone()[0]
+        store.close()
+        print(
+            f"{args.events} events in batches of {args.batch}: sent in {sent:.2f}s, "
+            f"durable after {elapsed:.2f}s -> {args.events / elapsed:,.0f} events/s "
+            f"(cpus: {os.cpu_count()})"
+        )
+        print(f"server totals {totals}; event rows in db: {stored}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Sharded proxy workers: mapped policy snapshot and single-writer throughput.
+
+    python benchmarks/bench_sharding.py --entries 100000 --flows 20000 --workers 1,2,4
+
+1. Policy state per worker: building a PolicySnapshot from SQLite vs
+   mapping the compiled snapshot file, and the per-lookup cost of each.
+2. Throughput: W worker processes each push `--flows` synthetic flows through
+   the addon's `handle()` with a mapped snapshot and a ForwardingWriter; the
+   parent runs the WriterServer (the only SQLite writer). Aggregate flows/s
+   should scale with cores until the writer saturates.
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import os
+import random
+import tempfile
+import time
+from types import SimpleNamespace
+
+import synthetic
+from wire_stripper.db.remote import ForwardingWriter, WriterServer
+from wire_stripper.db.store import Store
+from wire_stripper.policy.mapped import load_snapshot_file, publish_snapshot, snapshot_path
+from wire_stripper.policy.snapshot import PolicySnapshot
+from wire_stripper.sensors.mitm_addon import WireStripperAddon
+
+
+LISTS = ("white", "black", "grey")
+
+
+def _seed(store: Store, n: int) -> None:
+    rng = random.Random(20)
+    store.executemany(
+        "INSERT INTO list_entry(entry_id, profile_id, list_type, target_type, target_value) "
+        "VALUES(?,?,?,?,?)",
+        [
+            (f"e{i}", "default", rng.choice(LISTS), "domain", f"site{i}.example")
+            for i in range(n)
+        ],
+    )
+
+
+def _flow(rng: random.Random, i: int, entries: int) -> SimpleNamespace:
+    host = f"cdn{rng.randrange(20)}.site{rng.randrange(entries * 2)}.example"
+    headers = {"Host": host, "Accept": "*/*", "User-Agent": "bench/1.0"}
+    return synthetic.flow(f"https://{host}/{i}", host, headers, (f"203.0.113.{i % 250}", 443))
+
+
+def _worker(root: str, address: str, key: bytes, flows: int, entries: int, seed: int) -> None:
+    store = Store(root)
+    addon = WireStripperAddon(
+        store,
+        writer=ForwardingWriter(address, key),
+        decision_mode="counters",
+        snapshot_file=snapshot_path(root, "default"),
+    )
+    rng = random.Random(seed)
+    for i in range(flows):
+        addon.handle(_flow(rng, i, entries))
+    addon.done()
+    store.close()
+
+
+def _throughput(
+    root: str, store: Store, workers: int, flows: int, entries: int
+) -> dict[str, float]:
+    key = os.urandom(32)
+    server = WriterServer(store, os.path.join(root, "run", f"bench-{workers}.sock"), key).start()
+    before = server.writer.stats.written
+    t0 = time.perf_counter()
+    procs = [
+        mp.Process(target=_worker, args=(root, server.address, key, flows, entries, w))
+        for w in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    server.writer.flush()
+    elapsed = time.perf_counter() - t0
+    rows = server.writer.stats.written - before
+    server.close()
+    return {"flows_per_s": workers * flows / elapsed, "rows_per_s": rows / elapsed}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entries", type=int, default=100_000)
+    ap.add_argument("--flows", type=int, default=20_000, help="per worker")
+    ap.add_argument("--workers", default="1,2,4")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = Store(root)
+        store.init_db()
+        _seed(store, args.entries)
+        generation = store.list_generation()
+
+        t0 = time.perf_counter()
+        with store.reader() as conn:
+            loaded = PolicySnapshot.load(conn, "default", generation)
+        load_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        path, _ = publish_snapshot(store, "default")
+        publish_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        mapped = load_snapshot_file(path)
+        map_s = time.perf_counter() - t0
+
+        rng = random.Random(1)
+        names = [f"a.b.site{rng.randrange(args.entries * 2)}.example" for _ in range(50_000)]
+        lookups = {}
+        for label, snap in (("dict", loaded), ("mapped", mapped)):
+            t0 = time.perf_counter()
+            for name in names:
+                snap.match_domain(name)
+            lookups[label] = (time.perf_counter() - t0) / len(names) * 1e6
+
+        print(
+            f"snapshot, {args.entries} entries: SQLite load {load_s * 1e3:7.1f} ms/worker, "
+            f"publish {publish_s * 1e3:7.1f} ms once, map {map_s * 1e3:5.2f} ms/worker, "
+            f"file {path.stat().st_size / 1e6:.1f} MB"
+        )
+        print(f"match_domain: dict {lookups['dict']:.2f} us, mapped {lookups['mapped']:.2f} us")
+        print(f"cpus: {os.cpu_count()}")
+        for workers in (int(w) for w in args.workers.split(",")):
+            r = _throughput(root, store, workers, args.flows, args.entries)
+            print(
+                f"{workers:>2} workers: {r['flows_per_s']:8.0f} flows/s, "
+                f"writer {r['rows_per_s']:8.0f} rows/s"
+            )
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
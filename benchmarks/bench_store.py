@@ -0,0 +1,113 @@
+"""Store startup (schema init) and per-insert overhead.
+
+    python benchmarks/bench_store.py --opens 200 --inserts 20000
+
+Compares re-running schema.sql on every open (the old init_db) with the
+user_version check, and the old insert_event (SQL rebuilt per call) with
+the cached statement. Per-connection statement caching is shown by also
+running with cached_statements=0.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import tempfile
+import time
+import uuid
+from typing import Any, Mapping
+
+from wire_stripper.db.store import EVENT_COLUMNS, PERF_PROFILES, Store
+
+
+def _legacy_init(store: Store) -> None:
+    store.conn.executescript(store.paths.schema_path.read_text(encoding="utf-8"))
+    store.conn.commit()
+
+
+def _legacy_insert_event(store: Store, row: Mapping[str, Any]) -> None:
+    cols = list(EVENT_COLUMNS)
+    values = [row.get(c) for c in cols]
+    store.conn.execute(
+        f"INSERT INTO event ({','.join(cols)}) VALUES ({','.join('?' for _ in cols)})",
+        values,
+    )
+    store.conn.commit()
+
+
+def _rows(n: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "event_id": str(uuid.uuid4()),
+            "ts": "2026-01-01T00:00:00",
+            "sensor": "bench",
+            "profile_id": "default",
+            "url": f"https://host{i % 500}.example/path/{i}",
+            "hostname": f"host{i % 500}.example",
+            "method": "GET",
+            "dst_ip": f"10.0.{i % 256}.{i % 200}",
+            "dst_port": 443,
+            "proto": "tcp",
+        }
+        for i in range(n)
+    ]
+
+
+def _time_opens(root: str, opens: int, legacy: bool) -> float:
+    t0 = time.perf_counter()
+    for _ in range(opens):
+        store = Store(root)
+        if legacy:
+            _legacy_init(store)
+        else:
+            store.init_db()
+        store.close()
+    return (time.perf_counter() - t0) / opens
+
+
+def _time_inserts(root: str, rows: list[dict[str, Any]], mode: str) -> float:
+    perf = PERF_PROFILES["default"]
+    if mode == "nocache":
+        perf = dataclasses.replace(perf, cached_statements=0)
+    store = Store(root, perf=perf)
+    store.init_db()
+    store.conn.execute("DELETE FROM event")
+    store.conn.commit()
+    t0 = time.perf_counter()
+    if mode == "legacy":
+        for row in rows:
+            _legacy_insert_event(store, row)
+    else:
+        for row in rows:
+            store.insert_event(row)
+    elapsed = time.perf_counter() - t0
+    store.close()
+    return elapsed / len(rows)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--opens", type=int, default=200)
+    ap.add_argument("--inserts", type=int, default=20_000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        Store(root).init_db()
+        legacy = _time_opens(root, args.opens, legacy=True)
+        current = _time_opens(root, args.opens, legacy=False)
+        print(f"open + init_db, schema.sql every time: {legacy * 1e3:8.3f} ms")
+        print(f"open + init_db, user_version check:    {current * 1e3:8.3f} ms")
+        print(f"speedup: {legacy / current:.1f}x")
+
+        rows = _rows(args.inserts)
+        for mode, label in (
+            ("legacy", "insert_event, SQL rebuilt per call"),
+            ("nocache", "insert_event, no statement cache  "),
+            ("cached", "insert_event, cached statement    "),
+        ):
+            per = _time_inserts(root, rows, mode)
+            print(f"{label}: {per * 1e6:8.2f} us/row")
+
+
+if __name__ == "__main__":
+    main()
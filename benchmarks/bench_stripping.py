@@ -0,0 +1,79 @@
+"""Per-flow cost of cookie/header stripping in the mitmproxy addon.
+
+    python benchmarks/bench_stripping.py --flows 50000
+
+Runs synthetic flows through `request` (handle + strip) and `response`
+(Set-Cookie) for three profiles: no stripping rules, grey cookie-name rules
+only, and cookie rules plus greylisted hosts (full strip for ~30% of flows).
+Uses the mitmproxy stand-ins in benchmarks/synthetic.py, so mitmproxy need not
+be installed; cookie_strip rows go through the BatchWriter as in production.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+
+from types import SimpleNamespace
+
+import synthetic
+from wire_stripper.db.store import Store
+from wire_stripper.sensors.mitm_addon import WireStripperAddon
+
+
+def _flows(n: int, rng: random.Random) -> list[SimpleNamespace]:
+    out = []
+    for i in range(n):
+        host = f"cdn{rng.randrange(20)}.site{rng.randrange(300)}.example"
+        req = [
+            ("Host", host),
+            ("User-Agent", "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/126.0 Safari/537.36"),
+            ("Accept", "*/*"),
+            ("sec-ch-ua", '"Chromium";v="126", "Not.A/Brand";v="24"'),
+            ("sec-ch-ua-platform", '"Linux"'),
+            ("Cookie", f"_ga=GA1.2.{rng.getrandbits(32)}; sid={i:x}; _fbp=fb.1.{i}"),
+        ]
+        resp = [("Content-Type", "text/html"), ("Set-Cookie", f"_ga=GA1.2.{i}; Path=/"), ("Set-Cookie", "theme=dark")]
+        out.append(
+            synthetic.flow(f"https://{host}/p/{i}", host, req, (f"198.51.100.{i % 250}", 443), resp)
+        )
+    return out
+
+
+def _run(flows: int, profile: str) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as root:
+        store = Store(root)
+        store.init_db()
+        addon = WireStripperAddon(store)
+        if profile != "none":
+            for name in ("_ga", "_gid", "_fbp", "__utm*", "_hj*"):
+                addon.policy.add_list_entry("grey", "cookie", name, "bench")
+        if profile == "grey-hosts":
+            for i in range(0, 300, 3):
+                addon.policy.add_list_entry("grey", "domain", f"site{i}.example", "bench")
+        addon.policy.refresh()
+        batch = _flows(flows, random.Random(19))
+        t0 = time.perf_counter()
+        for flow in batch:
+            addon.handle(flow)
+            addon.response(flow)
+        elapsed = time.perf_counter() - t0
+        addon.done()
+        rows = store.conn.execute("SELECT COUNT(*) FROM cookie_strip").fetchone()[0]
+        store.close()
+    return {"us_per_flow": elapsed / flows * 1e6, "cookie_rows": rows}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--flows", type=int, default=50_000)
+    args = ap.parse_args()
+    for profile in ("none", "cookie-rules", "grey-hosts"):
+        r = _run(args.flows, profile)
+        print(f"{profile:>12}: {r['us_per_flow']:6.2f} us/flow, {r['cookie_rows']:>7} cookie_strip rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Offline benchmark suite for the policy, ingest and ETL hot paths.
+
+    python benchmarks/suite.py                       # full run, writes results JSON
+    python benchmarks/suite.py --quick --only policy_evaluate,insert_event
+    python benchmarks/suite.py --compare benchmarks/results/<earlier>.json
+
+Every case runs against a fresh temporary Store seeded from `synthetic`
+with a fixed seed, so two runs differ only by the code under test (and the
+machine). Results go to `benchmarks/results/<utc time>-<commit>.json`;
+`--compare` prints the change per metric against an earlier file and exits
+1 if any metric got worse by more than `--threshold`.
+
+Cases:
+  policy_evaluate  PolicyEngine.evaluate ops/s and latency percentiles, with
+                   and without the decision cache
+  insert_event     Store.insert_event (one commit per row) and BatchWriter
+                   rows/s
+  import_all       legacy DMBT + Privacy Proxy tables -> canonical, rows/s
+  db_growth        database size per event via the addon's ingest path,
+                   scaled to MB per million events
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+import synthetic
+from wire_stripper.db.store import Store
+from wire_stripper.db.writer import BatchWriter
+from wire_stripper.etl.import_dmbt import import_dmbt
+from wire_stripper.etl.import_all import import_all
+from wire_stripper.policy.engine import PolicyEngine
+from wire_stripper.sensors.mitm_addon import WireStripperAddon
+
+RESULTS_DIR = Path(__file__).with_name("results")
+SEED = 21
+
+# Sizes per case; --quick divides the work so the suite finishes in seconds.
+FULL = {
+    "entries": 50_000,
+    "prefixes": 20_000,
+    "lookups": 200_000,
+    "events": 20_000,
+    "batched_events": 200_000,
+    "legacy_rows": 100_000,
+    "growth_flows": 50_000,
+}
+QUICK = {
+    "entries": 5_000,
+    "prefixes": 2_000,
+    "lookups": 20_000,
+    "events": 2_000,
+    "batched_events": 20_000,
+    "legacy_rows": 10_000,
+    "growth_flows": 5_000,
+}
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    samples = sorted(samples)
+    last = len(samples) - 1
+    return {
+        f"{label}_us": samples[min(last, int(q * len(samples)))] * 1e6
+        for label, q in (("p50", 0.50), ("p99", 0.99), ("p999", 0.999))
+    }
+
+
+def _event(i: int, rng: random.Random) -> dict[str, Any]:
+    host = f"cdn{i % 50}.site{rng.randrange(5000)}.example"
+    return {
+        "event_id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "ts": "2026-01-01T00:00:00",
+        "sensor": "bench",
+        "profile_id": "default",
+        "url": f"https://{host}/p/{i}",
+        "hostname": host,
+        "method": "GET",
+        "dst_ip": synthetic.ipv4(rng),
+        "dst_port": 443,
+        "proto": "tcp",
+    }
+
+
+def _db_bytes(store: Store) -> int:
+    store.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    page_size = store.conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = store.conn.execute("PRAGMA page_count").fetchone()[0]
+    return page_size * page_count
+
+
+def bench_policy_evaluate(root: str, size: dict[str, int]) -> dict[str, float]:
+    rng = random.Random(SEED)
+    store = Store(root)
+    store.init_db()
+    bases = synthetic.domains(size["entries"], rng)
+    entries = synthetic.list_entries(bases, rng, extra=size["entries"] // 50)
+    synthetic.seed(store, "list_entry", entries)
+    # ASN lookups go through the canonical prefix table, populated the way
+    # production does it: DMBT prefix_map imported by the ETL.
+    synthetic.seed(store, "prefix_map", synthetic.prefix_map(size["prefixes"], rng))
+    import_dmbt(store)
+    # Repeated (host, ip) pairs, as a browser produces them, so the cached
+    # variant sees a realistic hit rate rather than all misses; the working
+    # set fits the default 10k-entry cache.
+    hosts = synthetic.hostnames(bases, size["lookups"] // 50, rng)
+    pairs = [
+        (rng.choice(hosts), synthetic.ipv4(rng) if rng.random() < 0.5 else None)
+        for _ in range(size["lookups"] // 50)
+    ]
+    queries = [rng.choice(pairs) for _ in range(size["lookups"])]
+
+    out: dict[str, float] = {}
+    for label, cache_size in (("cached", 10_000), ("uncached", 0)):
+        engine = PolicyEngine(store, decision_cache_size=cache_size)
+        t0 = time.perf_counter()
+        engine.warm()
+        out[f"{label}_warm_ms"] = (time.perf_counter() - t0) * 1e3
+        evaluate = engine.evaluate
+        samples = []
+        clock = time.perf_counter
+        start = clock()
+        for host, ip in queries:
+            t = clock()
+            evaluate(host, ip)
+            samples.append(clock() - t)
+        out[f"{label}_ops_per_s"] = len(queries) / (clock() - start)
+        out.update({f"{label}_{k}": v for k, v in _percentiles(samples).items()})
+    store.close()
+    return out
+
+
+def bench_insert_event(root: str, size: dict[str, int]) -> dict[str, float]:
+    rng = random.Random(SEED)
+    store = Store(root)
+    store.init_db()
+    rows = [_event(i, rng) for i in range(size["events"])]
+    t0 = time.perf_counter()
+    for row in rows:
+        store.insert_event(row)
+    direct = size["events"] / (time.perf_counter() - t0)
+
+    params = [Store.event_params(_event(i, rng)) for i in range(size["batched_events"])]
+    writer = BatchWriter(store, block_timeout=1.0).start()
+    t0 = time.perf_counter()
+    for p in params:
+        writer.submit("event", p)
+    writer.flush()
+    batched = size["batched_events"] / (time.perf_counter() - t0)
+    writer.close()
+    store.close()
+    return {"direct_rows_per_s": direct, "batched_rows_per_s": batched}
+
+
+def bench_import_all(root: str, size: dict[str, int]) -> dict[str, float]:
+    rng = random.Random(SEED)
+    store = Store(root)
+    store.init_db()
+    hosts = synthetic.hostnames(synthetic.domains(2_000, rng), 10_000, rng)
+    n = size["legacy_rows"]
+    source_rows = (
+        synthetic.seed(store, "flow_history", synthetic.flow_history(n, rng, hosts))
+        + synthetic.seed(store, "request_log", synthetic.request_log(n, rng, hosts))
+        + synthetic.seed(store, "prefix_map", synthetic.prefix_map(n // 10, rng))
+    )
+    t0 = time.perf_counter()
+    counts = import_all(store, full=True)
+    elapsed = time.perf_counter() - t0
+    written = sum(sum(c.values()) for c in counts.values())
+    store.close()
+    return {
+        "source_rows_per_s": source_rows / elapsed,
+        "written_rows_per_s": written / elapsed,
+        "elapsed_ms": elapsed * 1e3,
+    }
+
+
+def bench_db_growth(root: str, size: dict[str, int]) -> dict[str, float]:
+    rng = random.Random(SEED)
+    store = Store(root)
+    store.init_db()
+    bases = synthetic.domains(5_000, rng)
+    synthetic.seed(store, "list_entry", synthetic.list_entries(bases, rng))
+    flows = synthetic.mitm_flows(size["growth_flows"], rng, synthetic.hostnames(bases, 20_000, rng))
+    before = _db_bytes(store)
+    addon = WireStripperAddon(store, writer=BatchWriter(store, block_timeout=1.0))
+    for f in flows:
+        addon.handle(f)
+    addon.done()
+    events = store.conn.execute("SELECT count(*) FROM event").fetchone()[0]
+    growth = _db_bytes(store) - before
+    store.close()
+    # Everything the ingest path writes (events, decisions, header sets) is
+    # charged to the events; bytes per event is also MB per million events.
+    return {"mb_per_million_events": growth / max(events, 1)}
+
+
+CASES: dict[str, Callable[[str, dict[str, int]], dict[str, float]]] = {
+    "policy_evaluate": bench_policy_evaluate,
+    "insert_event": bench_insert_event,
+    "import_all": bench_import_all,
+    "db_growth": bench_db_growth,
+}
+
+
+def _higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_s")
+
+
+def _commit() -> str:
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, cwd=Path(__file__).parent, check=True
+        ).stdout.strip()
+
+    try:
+        sha = git("rev-parse", "--short", "HEAD")
+        return sha + ("-dirty" if git("status", "--porcelain", "--untracked-files=no") else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(base: dict[str, Any], current: dict[str, Any], threshold: float) -> list[str]:
+    """Print per-metric change against `base`; return the regressed metric names."""
+    regressions = []
+    print(f"\nvs {base['meta']['commit']} ({base['meta']['date']}):")
+    for case, metrics in current["results"].items():
+        for metric, value in metrics.items():
+            old = base["results"].get(case, {}).get(metric)
+            if not old:
+                continue
+            change = (value - old) / old
+            worse = -change if _higher_is_better(metric) else change
+            flag = ""
+            if worse > threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{case}.{metric}")
+            name = f"{case}.{metric}"
+            print(f"  {name:<40} {old:14.2f} -> {value:14.2f}  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--quick", action="store_true", help="smaller sizes (smoke run)")
+    ap.add_argument("--only", help=f"comma-separated subset of: {', '.join(CASES)}")
+    ap.add_argument("--out", help="results file (default: benchmarks/results/<time>-<commit>.json)")
+    ap.add_argument("--compare", metavar="BASE.json", help="compare against an earlier results file")
+    ap.add_argument("--threshold", type=float, default=0.10, help="regression tolerance (default 0.10)")
+    args = ap.parse_args()
+
+    names = args.only.split(",") if args.only else list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        ap.error(f"unknown case(s): {', '.join(unknown)}")
+    size = QUICK if args.quick else FULL
+    now = datetime.now(timezone.utc)
+    commit = _commit()
+    report: dict[str, Any] = {
+        "meta": {
+            "commit": commit,
+            "date": now.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "sqlite": sqlite3.sqlite_version,
+            "quick": args.quick,
+            "sizes": size,
+        },
+        "results": {},
+    }
+    for name in names:
+        with tempfile.TemporaryDirectory() as root:
+            t0 = time.perf_counter()
+            metrics = CASES[name](root, size)
+        report["results"][name] = metrics
+        print(f"{name} ({time.perf_counter() - t0:.1f}s)")
+        for metric, value in metrics.items():
+            print(f"  {metric:<28} {value:14.2f}")
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{now:%Y%m%dT%H%M%SZ}-{commit}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(f"\nwrote {out}")
+
+    if args.compare:
+        base = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if base["meta"].get("quick") != args.quick:
+            print("warning: comparing a --quick run with a full run", file=sys.stderr)
+        regressions = compare(base, report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
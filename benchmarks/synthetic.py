@@ -0,0 +1,220 @@
+"""Synthetic data for the benchmarks: list entries, legacy tables, mitmproxy flows.
+
+Everything is generated from a `random.Random`, so a given seed and size
+always produce the same data and runs are comparable between commits.
+"""
+
+from __future__ import annotations
+
+import random
+import string
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Iterable, Iterator, Sequence
+
+from wire_stripper.db.store import Store
+
+_TLDS = ("com", "net", "org", "io", "co.uk", "com.au", "de")
+_EPOCH = datetime(2026, 1, 1)
+
+
+class Headers:
+    """Case-insensitive multi-dict with the parts of mitmproxy's Headers the addon uses."""
+
+    def __init__(self, fields: list[tuple[str, str]] | dict[str, str]):
+        self.fields = list(fields.items()) if isinstance(fields, dict) else fields
+
+    def keys(self):
+        return [k for k, _ in self.fields]
+
+    def items(self):
+        return self.fields
+
+    def get_all(self, name: str) -> list[str]:
+        name = name.lower()
+        return [v for k, v in self.fields if k.lower() == name]
+
+    def set_all(self, name: str, values: list[str]) -> None:
+        low = name.lower()
+        self.fields = [f for f in self.fields if f[0].lower() != low] + [(name, v) for v in values]
+
+    def pop(self, name: str, default=None):
+        values = self.get_all(name)
+        if not values:
+            return default
+        low = name.lower()
+        self.fields = [f for f in self.fields if f[0].lower() != low]
+        return ", ".join(values)
+
+
+def flow(
+    url: str,
+    host: str,
+    request_headers: list[tuple[str, str]] | dict[str, str],
+    dst: tuple[str, int] | None = None,
+    response_headers: list[tuple[str, str]] | None = None,
+    method: str = "GET",
+) -> SimpleNamespace:
+    """An object shaped like mitmproxy's HTTPFlow, as far as the addon looks."""
+    return SimpleNamespace(
+        request=SimpleNamespace(
+            pretty_url=url, pretty_host=host, method=method, headers=Headers(request_headers)
+        ),
+        response=None if response_headers is None else SimpleNamespace(headers=Headers(response_headers)),
+        server_conn=SimpleNamespace(address=dst),
+    )
+
+
+def _label(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+
+
+def _ts(i: int) -> str:
+    return (_EPOCH + timedelta(seconds=i)).isoformat(timespec="seconds")
+
+
+def ipv4(rng: random.Random) -> str:
+    return f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+
+def domains(n: int, rng: random.Random) -> list[str]:
+    """Registrable-looking base domains, unique by construction."""
+    return [f"{_label(rng)}{i}.{rng.choice(_TLDS)}" for i in range(n)]
+
+
+def hostnames(bases: Sequence[str], n: int, rng: random.Random, miss_rate: float = 0.3) -> list[str]:
+    """Query hostnames: subdomains of `bases` at depth 0-3, plus unlisted names."""
+    out = []
+    for _ in range(n):
+        if rng.random() < miss_rate:
+            out.append(f"www.{_label(rng)}.{rng.choice(_TLDS)}")
+            continue
+        labels = [_label(rng) for _ in range(rng.randint(0, 3))]
+        out.append(".".join([*labels, rng.choice(bases)]))
+    return out
+
+
+def list_entries(
+    bases: Sequence[str], rng: random.Random, profile_id: str = "default", extra: int = 0
+) -> Iterator[tuple[Any, ...]]:
+    """list_entry rows: one per base domain (mostly black), plus `extra` ip/prefix/asn rows.
+
+    Columns: entry_id, profile_id, list_type, target_type, target_value, reason.
+    """
+    for i, base in enumerate(bases):
+        list_type = rng.choices(("black", "grey", "white"), weights=(8, 1, 1))[0]
+        yield (f"bench:d{i}", profile_id, list_type, "domain", base, "synthetic")
+    for i in range(extra):
+        kind = rng.choice(("ip", "prefix", "asn"))
+        if kind == "ip":
+            value = ipv4(rng)
+        elif kind == "prefix":
+            value = f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.0.0/16"
+        else:
+            value = f"AS{rng.randint(1, 65000)}"
+        yield (f"bench:x{i}", profile_id, rng.choice(("black", "white")), kind, value, "synthetic")
+
+
+def prefix_map(n: int, rng: random.Random) -> Iterator[tuple[Any, ...]]:
+    """DMBT prefix_map rows (prefix, asn, source): distinct /16-/24 IPv4 prefixes."""
+    seen: set[str] = set()
+    while len(seen) < n:
+        length = rng.choice((16, 20, 22, 24))
+        addr = rng.getrandbits(32) & (0xFFFFFFFF << (32 - length)) & 0xFFFFFFFF
+        if not 0x01000000 <= addr < 0xE0000000:
+            continue
+        prefix = f"{addr >> 24}.{(addr >> 16) & 255}.{(addr >> 8) & 255}.{addr & 255}/{length}"
+        if prefix in seen:
+            continue
+        seen.add(prefix)
+        yield (prefix, f"AS{rng.randint(1, 65000)}", "synthetic")
+
+
+def flow_history(n: int, rng: random.Random, hosts: Sequence[str]) -> Iterator[tuple[Any, ...]]:
+    """DMBT flow_history rows (ts, src_ip, dst_ip, dst_port, proto, bytes, hostname)."""
+    for i in range(n):
+        yield (
+            _ts(i),
+            f"192.168.1.{i % 250 + 1}",
+            ipv4(rng),
+            rng.choice((443, 443, 443, 80, 853)),
+            "tcp",
+            rng.randint(100, 100_000),
+            rng.choice(hosts),
+        )
+
+
+def request_log(n: int, rng: random.Random, hosts: Sequence[str]) -> Iterator[tuple[Any, ...]]:
+    """Privacy Proxy request_log rows (timestamp, method, url, host, ip_address, blocked, block_reason)."""
+    for i in range(n):
+        host = rng.choice(hosts)
+        blocked = rng.random() < 0.05
+        yield (
+            _ts(i),
+            rng.choice(("GET", "GET", "GET", "POST")),
+            f"https://{host}/{_label(rng)}?i={i}",
+            host,
+            ipv4(rng),
+            int(blocked),
+            "tracker" if blocked else None,
+        )
+
+
+def mitm_flows(n: int, rng: random.Random, hosts: Sequence[str]) -> list[SimpleNamespace]:
+    """Fake mitmproxy flows with browser-like headers (cookies on ~60%)."""
+    agents = (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36",
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:127.0) Gecko/20100101 Firefox/127.0",
+    )
+    out = []
+    for i in range(n):
+        host = rng.choice(hosts)
+        headers = [
+            ("Host", host),
+            ("User-Agent", rng.choice(agents)),
+            ("Accept", rng.choice(("*/*", "text/html,application/xhtml+xml", "image/webp,*/*"))),
+            ("Accept-Language", "en-US,en;q=0.9"),
+            ("Accept-Encoding", "gzip, deflate, br"),
+        ]
+        if rng.random() < 0.6:
+            headers.append(("Cookie", f"_ga=GA1.2.{rng.getrandbits(32)}; sid={i:x}"))
+        if rng.random() < 0.7:
+            headers.append(("Referer", f"https://{rng.choice(hosts)}/"))
+        out.append(flow(f"https://{host}/{_label(rng)}", host, headers, (ipv4(rng), 443)))
+    return out
+
+
+TABLE_COLUMNS = {
+    "list_entry": ("entry_id", "profile_id", "list_type", "target_type", "target_value", "reason"),
+    "prefix_map": ("prefix", "asn", "source"),
+    "flow_history": ("ts", "src_ip", "dst_ip", "dst_port", "proto", "bytes", "hostname"),
+    "request_log": ("timestamp", "method", "url", "host", "ip_address", "blocked", "block_reason"),
+}
+
+
+def seed(store: Store, table: str, rows: Iterable[Sequence[Any]]) -> int:
+    """Bulk-insert generated rows into `table` (one transaction). Returns rows changed."""
+    columns = TABLE_COLUMNS[table]
+    return store.executemany(
+        f"INSERT INTO {table}({', '.join(columns)}) VALUES({', '.join('?' * len(columns))})",
+        rows,
+    )
+
+
+def browser_events(n: int, rng: random.Random, hosts: Sequence[str]) -> list[dict[str, Any]]:
+    """MCP browser sensor events ({url, host, type, initiator, method}) for a page-load mix."""
+    types = ("script", "image", "xhr", "fetch", "stylesheet", "font", "document", "ping")
+    pages = [f"https://{h}/" for h in rng.sample(list(hosts), min(len(hosts), 50))]
+    out = []
+    for i in range(n):
+        host = rng.choice(hosts)
+        event: dict[str, Any] = {
+            "url": f"https://{host}/{_label(rng)}/{i:x}.js?v={rng.getrandbits(24):x}",
+            "host": host,
+            "type": rng.choice(types),
+            "method": "GET" if rng.random() < 0.9 else "POST",
+        }
+        if rng.random() < 0.8:
+            event["initiator"] = {"type": "parser", "url": rng.choice(pages)}
+        out.append(event)
+    return out
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import ipaddress
+import random
+
+import pytest
+
+from wire_stripper.export.firewall import compact_prefixes
+
+
+def _expected(blocked, allowed=()):
+    nets = [ipaddress.ip_network(v, strict=False) for v in blocked]
+    for a in (ipaddress.ip_network(v, strict=False) for v in allowed):
+        carved = []
+        for n in nets:
+            if n.version != a.version or not n.overlaps(a):
+                carved.append(n)
+            elif n.subnet_of(a):
+                continue
+            else:
+                carved.extend(n.address_exclude(a))
+        nets = carved
+    return tuple(
+        tuple(str(n) for n in ipaddress.collapse_addresses(x for x in nets if x.version == v))
+        for v in (4, 6)
+    )
+
+
+def _plan(blocked, allowed=()):
+    plan = compact_prefixes(blocked, allowed)
+    return plan.v4, plan.v6
+
+
+@pytest.mark.parametrize(
+    "blocked",
+    [
+        # adjacent /25s merge into a /24, adjacent /24s into a /23
+        ["10.0.0.0/25", "10.0.0.128/25", "10.0.1.0/24"],
+        # covered prefixes and single IPs are dropped
+        ["10.0.0.0/8", "10.1.2.0/24", "10.9.9.9", "10.255.255.255/32"],
+        # host bits set are cleared, not rejected
+        ["192.168.1.77/24", "192.168.0.1/24", "2001:db8::1/32"],
+        # mixed families stay apart
+        ["2001:db8::/33", "2001:db8:8000::/33", "1.2.3.4", "1.2.3.5", "::/0"],
+        # not mergeable: adjacent but not aligned
+        ["10.0.1.0/24", "10.0.2.0/24"],
+    ],
+)
+def test_matches_collapse_addresses(blocked):
+    assert _plan(blocked) == _expected(blocked)
+
+
+def test_allowed_is_carved_out():
+    blocked = ["10.0.0.0/16", "2001:db8::/32"]
+    allowed = ["10.0.5.7", "10.0.128.0/17", "2001:db8:1::/48"]
+    assert _plan(blocked, allowed) == _expected(blocked, allowed)
+    assert "10.0.5.7/32" not in compact_prefixes(blocked, allowed).v4
+
+
+def test_invalid_input_is_skipped():
+    plan = compact_prefixes(["not-an-ip", "10.0.0.0/33", "", "10.0.0.1"])
+    assert plan.v4 == ("10.0.0.1/32",)
+    assert plan.input_count == 4
+
+
+def test_random_sets():
+    rng = random.Random(10)
+    for _ in range(50):
+        blocked = [
+            f"10.{rng.randrange(4)}.{rng.randrange(256)}.{rng.randrange(256)}/{rng.randint(20, 32)}"
+            for _ in range(rng.randint(1, 60))
+        ] + [
+            f"2001:db8:{rng.randrange(4):x}::{rng.randrange(65536):x}/{rng.randint(40, 128)}"
+            for _ in range(rng.randint(0, 20))
+        ]
+        allowed = [f"10.{rng.randrange(4)}.{rng.randrange(256)}.0/{rng.randint(24, 32)}"]
+        assert _plan(blocked) == _expected(blocked)
+        assert _plan(blocked, allowed) == _expected(blocked, allowed)
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from wire_stripper.db.store import Store
+from wire_stripper.enrich import dns_asn
+from wire_stripper.enrich.dns_asn import DnsCache, ResolvedIp, StubResolver, resolve_many
+from wire_stripper.enrich.lpm import PrefixIndex
+
+ANSWERS = {"a.example": ["192.0.2.1", "2001:db8::1"], "b.example": ["198.51.100.7"]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(dns_asn, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def _ips(results, domain):
+    return [r.ip for r in results[domain]]
+
+
+def test_ttl_for_clamps_record_ttls():
+    cache = DnsCache(default_ttl=300, min_ttl=30, max_ttl=3600, negative_ttl=60)
+    assert cache.ttl_for([]) == 60
+    assert cache.ttl_for([ResolvedIp("192.0.2.1", 4)]) == 300
+    assert cache.ttl_for([ResolvedIp("192.0.2.1", 4, 5)]) == 30
+    assert cache.ttl_for([ResolvedIp("192.0.2.1", 4, 900), ResolvedIp("::1", 6, 120)]) == 120
+    assert cache.ttl_for([ResolvedIp("192.0.2.1", 4, 10**6)]) == 3600
+
+
+def test_answers_are_cached_until_ttl_expires(clock):
+    resolver = StubResolver(ANSWERS, ttl=120)
+    cache = DnsCache(min_ttl=0)
+
+    first = resolve_many(["a.example", "b.example", "a.example"], resolver, cache=cache)
+    assert _ips(first, "a.example") == ["192.0.2.1", "2001:db8::1"]
+    assert resolver.calls == 2
+
+    clock[0] += 119
+    again = resolve_many(["a.example", "b.example"], resolver, cache=cache)
+    assert again == first
+    assert resolver.calls == 2
+    assert cache.hits == 2
+
+    clock[0] += 1
+    resolve_many(["a.example"], resolver, cache=cache)
+    assert resolver.calls == 3
+
+
+def test_empty_answers_are_negative_cached(clock):
+    resolver = StubResolver(ANSWERS, ttl=3600)
+    cache = DnsCache(negative_ttl=60)
+
+    assert resolve_many(["gone.example"], resolver, cache=cache) == {"gone.example": []}
+    clock[0] += 59
+    assert resolve_many(["gone.example"], resolver, cache=cache) == {"gone.example": []}
+    assert resolver.calls == 1
+
+    clock[0] += 1
+    resolve_many(["gone.example"], resolver, cache=cache)
+    assert resolver.calls == 2
+
+
+def test_resolver_errors_are_negative_cached(clock):
+    calls = []
+
+    def broken(domain):
+        calls.append(domain)
+        raise OSError("timeout")
+
+    cache = DnsCache(negative_ttl=60)
+    assert resolve_many(["a.example"], broken, cache=cache) == {"a.example": []}
+    assert resolve_many(["a.example"], broken, cache=cache) == {"a.example": []}
+    assert calls == ["a.example"]
+
+
+def test_lru_evicts_least_recently_used(clock):
+    cache = DnsCache(max_entries=2)
+    cache.put("a.example", [])
+    cache.put("b.example", [])
+    assert cache.get("a.example") == []
+    cache.put("c.example", [])
+    assert len(cache) == 2
+    assert cache.get("b.example") is None
+    assert cache.get("a.example") == []
+
+
+def test_fresh_answers_persist_to_ip_map_and_warm_a_new_cache(tmp_path):
+    store = Store(tmp_path)
+    store.init_db()
+    index: PrefixIndex[str] = PrefixIndex()
+    index.insert("192.0.2.0/24", "64500")
+    resolver = StubResolver(ANSWERS)
+
+    resolve_many(ANSWERS, resolver, cache=DnsCache(), store=store, asn_index=index)
+    with store.reader() as conn:
+        ip_map = sorted(
+            tuple(r)
+            for r in conn.execute("SELECT domain, ip, ip_version, asn, source FROM ip_map")
+        )
+        ips = dict(conn.execute("SELECT ip, asn FROM ip").fetchall())
+    assert ip_map == [
+        ("a.example", "192.0.2.1", 4, "64500", "dns"),
+        ("a.example", "2001:db8::1", 6, None, "dns"),
+        ("b.example", "198.51.100.7", 4, None, "dns"),
+    ]
+    assert ips == {"192.0.2.1": "64500", "2001:db8::1": None, "198.51.100.7": None}
+
+    # Cached answers are not written again; a new cache warms from ip_map.
+    warm = DnsCache()
+    assert warm.load_ip_map(store) == 2
+    again = resolve_many(ANSWERS, resolver, cache=warm, store=store)
+    assert resolver.calls == 2
+    assert _ips(again, "a.example") == ["192.0.2.1", "2001:db8::1"]
+    store.close()
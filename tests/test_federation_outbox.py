@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from wire_stripper.db.store import Store
+from wire_stripper.federation import outbox
+from wire_stripper.federation.inbox import import_batches
+from wire_stripper.federation.outbox import enqueue_list_delta, publish_pending
+from wire_stripper.federation.sinks import DirectorySink
+
+
+def _add(store, value):
+    store.upsert(
+        "INSERT INTO list_entry(entry_id, profile_id, list_type, target_type, target_value) "
+        "VALUES(?, 'default', 'black', 'domain', ?)",
+        (value, value),
+    )
+
+
+def _seqs(store):
+    with store.reader() as conn:
+        rows = conn.execute("SELECT payload_json FROM federation_outbox").fetchall()
+    return sorted(json.loads(h)["seq"] for (h,) in rows)
+
+
+def test_crash_before_state_file_does_not_reuse_seq(tmp_path, monkeypatch):
+    pub = Store(tmp_path / "pub")
+    pub.init_db()
+    _add(pub, "a.example")
+    enqueue_list_delta(pub)
+
+    # The outbox row for seq 2 commits, then the process dies before the
+    # state file is rewritten.
+    _add(pub, "b.example")
+    real = outbox.write_atomic
+
+    def crash(path, data, fsync=True):
+        if str(path).endswith(".state"):
+            raise KeyboardInterrupt
+        return real(path, data, fsync)
+
+    monkeypatch.setattr(outbox, "write_atomic", crash)
+    with pytest.raises(KeyboardInterrupt):
+        enqueue_list_delta(pub)
+    monkeypatch.setattr(outbox, "write_atomic", real)
+
+    _add(pub, "c.example")
+    result = enqueue_list_delta(pub)
+    assert (result.added, result.removed) == (1, 0)
+    assert _seqs(pub) == [1, 2, 3]
+
+    sink_dir = tmp_path / "out"
+    publish_pending(pub, DirectorySink(sink_dir))
+    peer = Store(tmp_path / "peer")
+    peer.init_db()
+    imported = import_batches(peer, sink_dir)
+    assert (imported.applied, imported.invalid) == (3, 0)
+    with peer.reader() as conn:
+        values = sorted(v for (v,) in conn.execute("SELECT target_value FROM list_entry"))
+    assert values == ["a.example", "b.example", "c.example"]
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import os
+import stat
+
+from wire_stripper.fsutil import _umask, write_atomic
+
+
+def _mode(path):
+    return stat.S_IMODE(path.stat().st_mode)
+
+
+def test_new_file_gets_umask_default(tmp_path):
+    path = tmp_path / "out.txt"
+    write_atomic(path, "a\n")
+    assert path.read_text() == "a\n"
+    assert _mode(path) == 0o666 & ~_umask()
+
+
+def test_replacement_keeps_existing_mode(tmp_path):
+    path = tmp_path / "out.txt"
+    path.write_text("old\n")
+    os.chmod(path, 0o640)
+    write_atomic(path, ["b", b"c\n"])
+    assert path.read_text() == "bc\n"
+    assert _mode(path) == 0o640
+    assert list(tmp_path.iterdir()) == [path]
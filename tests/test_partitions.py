@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+
+from wire_stripper.db import partitions
+from wire_stripper.db.partitions import seal_partitions
+from wire_stripper.db.store import INSERT_EVENT_SQL, Store
+
+NOW = datetime(2026, 3, 20, 12, 0, 0)
+
+
+def _events(store, ids):
+    store.conn.executemany(
+        INSERT_EVENT_SQL,
+        [
+            store.event_params(
+                {
+                    "event_id": f"privacy:request_log:{i}",
+                    "ts": f"2026-03-02T10:{i:02d}:00",
+                    "sensor": "privacy_proxy",
+                    "profile_id": "default",
+                    "hostname": "a.example",
+                }
+            )
+            for i in ids
+        ],
+    )
+    store.conn.commit()
+
+
+def _rolled_up(store):
+    row = store.conn.execute("SELECT COALESCE(SUM(events), 0) FROM event_rollup_hourly").fetchone()
+    return row[0]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = Store(tmp_path)
+    store.init_db()
+    yield store
+    store.close()
+
+
+def test_reimported_ids_are_not_rolled_up_twice(store):
+    _events(store, range(5))
+    assert seal_partitions(store, hot_days=2, now=NOW).events == 5
+    assert _rolled_up(store) == 5
+
+    # ETL --full brings the same deterministic ids back, plus one new row.
+    _events(store, range(6))
+    assert seal_partitions(store, hot_days=2, now=NOW).events == 6
+    assert _rolled_up(store) == 6
+
+
+def test_crash_after_copy_still_rolls_up_once(store, monkeypatch):
+    _events(store, range(3))
+
+    def crash(conn, bounds):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(partitions, "_rollup", crash)
+    with pytest.raises(KeyboardInterrupt):
+        seal_partitions(store, hot_days=2, now=NOW)
+    monkeypatch.undo()
+
+    assert _rolled_up(store) == 0
+    assert seal_partitions(store, hot_days=2, now=NOW).events == 3
+    assert _rolled_up(store) == 3
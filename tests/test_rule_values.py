@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import pytest
+
+from wire_stripper.db.store import Store
+from wire_stripper.export.rules import export_rules, iter_entries
+from wire_stripper.federation.inbox import _normalize_target
+
+_VALUES = [
+    "good.com",
+    "good.com.",
+    "Upper.COM",
+    "port.com:8080",
+    'evil.com"\n  local-zone: "x." transparent',
+    "a..b",
+    "-x.com",
+    "sp ace.com",
+]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    store = Store(tmp_path)
+    store.init_db()
+    with store.transaction() as c:
+        c.executemany(
+            "INSERT INTO list_entry(entry_id, profile_id, list_type, target_type, target_value) "
+            "VALUES(?, 'default', 'black', 'domain', ?)",
+            enumerate(_VALUES),
+        )
+    with store.reader() as c:
+        yield c
+    store.close()
+
+
+def test_entries_are_normalized_and_sorted(conn):
+    rejected: list[tuple[str, str]] = []
+    entries = list(iter_entries(conn, "default", ("black",), rejected))
+    assert entries == [
+        ("black", "good.com"),
+        ("black", "port.com"),
+        ("black", "upper.com"),
+    ]
+    assert sorted(v for _, v in rejected) == sorted(_VALUES[4:])
+
+
+@pytest.mark.parametrize("fmt", ["hosts", "abp", "unbound"])
+def test_export_skips_unsafe_values(conn, tmp_path, fmt):
+    result = export_rules(conn, fmt, tmp_path / f"out.{fmt}")
+    assert (result.entries, result.invalid) == (3, 4)
+    body = (tmp_path / f"out.{fmt}").read_text()
+    assert "evil" not in body and "transparent" not in body
+
+
+@pytest.mark.parametrize(
+    "target_type, value, expected",
+    [
+        ("domain", "Evil.COM:443", "evil.com"),
+        ("domain", 'x" y', None),
+        ("ip", "10.0.0.1", "10.0.0.1"),
+        ("ip", "nope", None),
+        ("prefix", "10.0.0.9/24", "10.0.0.0/24"),
+        ("asn", "AS13335", "13335"),
+        ("asn", "ASX", None),
+        ("cookie", "_ga", "_ga"),
+        ("cookie", " ", None),
+        ("weird", "a", None),
+    ],
+)
+def test_peer_values_are_validated(target_type, value, expected):
+    assert _normalize_target(target_type, value) == expected
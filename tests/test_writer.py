@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+
+from wire_stripper.db.store import PerfProfile, Store
+from wire_stripper.db.writer import BatchWriter
+
+_INSERT = "INSERT INTO cookie_strip(ts, hostname) VALUES(?, ?)"
+
+
+def _store(tmp_path):
+    store = Store(tmp_path, perf=PerfProfile(busy_timeout_ms=50))
+    store.init_db()
+    return store
+
+
+def _hosts(store):
+    return sorted(r[0] for r in store.conn.execute("SELECT hostname FROM cookie_strip"))
+
+
+def test_locked_database_is_retried_not_dropped(tmp_path):
+    store = _store(tmp_path)
+    writer = BatchWriter(store, {"c": _INSERT}, flush_interval=0.01, max_backoff=0.05).start()
+
+    other = sqlite3.connect(store.paths.db_path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")  # holds the write lock well past busy_timeout
+    writer.submit("c", ("2026-01-01T00:00:00", "a.example"))
+    time.sleep(0.5)
+    assert writer.stats.retries > 0
+    assert writer.stats.failed == 0
+    other.execute("ROLLBACK")
+
+    assert writer.flush(5)
+    assert _hosts(store) == ["a.example"]
+    assert writer.stats.written == 1
+    assert writer.close()
+
+
+def test_rejected_row_fails_alone(tmp_path):
+    store = _store(tmp_path)
+    writer = BatchWriter(store, {"c": _INSERT}, batch_size=10, flush_interval=1.0).start()
+    writer.submit_many(
+        "c",
+        [("2026-01-01T00:00:00", "a.example"), (None, "bad"), ("2026-01-01T00:00:00", "b.example")],
+    )
+    assert writer.flush(5)
+    assert _hosts(store) == ["a.example", "b.example"]
+    assert (writer.stats.written, writer.stats.failed) == (2, 1)
+    assert writer.close()
+
+
+def test_close_reports_unfinished_flush(tmp_path):
+    store = _store(tmp_path)
+    writer = BatchWriter(store, {"c": _INSERT}, flush_interval=0.01, max_backoff=0.05).start()
+    other = sqlite3.connect(store.paths.db_path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    writer.submit("c", ("2026-01-01T00:00:00", "a.example"))
+
+    assert writer.close(timeout=0.3) is False
+    assert writer._thread is not None and writer._thread.is_alive()
+
+    other.execute("ROLLBACK")
+    assert writer.close(timeout=5)
+    assert _hosts(store) == ["a.example"]
+    assert not any(t.name == "wire-stripper-writer" for t in threading.enumerate())
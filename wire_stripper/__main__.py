@@ -2,12 +2,19 @@ from __future__ import annotations
 
 import argparse
 import os
+from datetime import datetime
 from pathlib import Path
 
-from wire_stripper.db.store import Store
-from wire_stripper.etl.import_all import import_all
-from wire_stripper.etl.import_dmbt import import_dmbt
-from wire_stripper.etl.import_privacy_proxy import import_privacy_proxy
+from wire_stripper.db.archive import FORMATS as ARCHIVE_FORMATS
+from wire_stripper.db.partitions import PERIODS
+from wire_stripper.db.store import PERF_PROFILES, SCHEMA_VERSION, Store
+from wire_stripper.etl.bulk import normalize_since
+from wire_stripper.export.rules import FORMATS
+
+# Subcommand modules (ETL, enrichment, federation, sensors, telemetry) are
+# imported inside their handlers, so `--help` and any one command only pay
+# for what they use. Only what the parser itself needs (choices, argument
+# types) is imported up front.
 
 
 def _default_root() -> str:
@@ -15,46 +22,437 @@ def _default_root() -> str:
 
 
 def cmd_db_init(args: argparse.Namespace) -> int:
-    store = Store(args.root)
-    store.init_db()
+    store = Store(args.root, perf=args.perf_profile)
+    changed = store.init_db()
+    store.close()
+    state = "initialized" if changed else "already current"
+    print(f"{state} db (schema v{SCHEMA_VERSION}): {store.paths.db_path}")
+    return 0
+
+
+def cmd_db_rotate(args: argparse.Namespace) -> int:
+    from wire_stripper.db.partitions import drop_partitions, seal_partitions
+
+    store = _with_store(args)
+    stats = seal_partitions(store, hot_days=args.hot_days, period=args.period)
+    dropped = (
+        drop_partitions(store, args.keep_days, rollup_keep_days=args.rollup_keep_days)
+        if args.keep_days is not None
+        else []
+    )
     store.close()
-    print(f"initialized db: {store.paths.db_path}")
+    print(
+        {
+            "db": "rotate",
+            "partitions": stats.partitions,
+            "events": stats.events,
+            "decisions": stats.decisions,
+            "dropped": [p.name for p in dropped],
+            "unparseable_ts": list(stats.unparseable),
+            "seconds": round(stats.seconds, 3),
+        }
+    )
+    return 0
+
+
+def cmd_db_archive(args: argparse.Namespace) -> int:
+    from wire_stripper.db.archive import archive_partitions
+    from wire_stripper.db.partitions import seal_partitions
+
+    store = _with_store(args)
+    sealed = seal_partitions(store, hot_days=args.hot_days, period=args.period)
+    stats = archive_partitions(store, older_than_days=args.older_than_days, fmt=args.format)
+    store.close()
+    print(
+        {
+            "db": "archive",
+            "sealed_events": sealed.events,
+            "files": stats.files,
+            "rows": stats.rows,
+            "source_bytes": stats.source_bytes,
+            "archive_bytes": stats.archive_bytes,
+            "ratio": round(stats.ratio, 1),
+            "seconds": round(stats.seconds, 3),
+        }
+    )
     return 0
 
 
 def _with_store(args: argparse.Namespace) -> Store:
-    store = Store(args.root)
+    # init_db() is a user_version check unless the schema needs creating/upgrading.
+    store = Store(args.root, perf=args.perf_profile)
     store.init_db()
     return store
 
 
 def cmd_etl_import_dmbt(args: argparse.Namespace) -> int:
+    from wire_stripper.etl.import_dmbt import import_dmbt
+
     store = _with_store(args)
-    counts = import_dmbt(store, profile_id=args.profile)
+    counts = import_dmbt(
+        store, profile_id=args.profile, full=args.full, since=args.since
+    )
     store.close()
     print({"import": "dmbt", "counts": counts})
     return 0
 
 
 def cmd_etl_import_privacy(args: argparse.Namespace) -> int:
+    from wire_stripper.etl.import_privacy_proxy import import_privacy_proxy
+
     store = _with_store(args)
-    counts = import_privacy_proxy(store, profile_id=args.profile)
+    counts = import_privacy_proxy(
+        store, profile_id=args.profile, full=args.full, since=args.since
+    )
     store.close()
     print({"import": "privacy_proxy", "counts": counts})
     return 0
 
 
 def cmd_etl_import_all(args: argparse.Namespace) -> int:
+    from wire_stripper.etl.import_all import import_all
+    from wire_stripper.etl.parallel import import_all_parallel
+
     store = _with_store(args)
-    counts = import_all(store, profile_id=args.profile)
+    if args.jobs > 1:
+        counts = import_all_parallel(
+            store,
+            profile_id=args.profile,
+            jobs=args.jobs,
+            full=args.full,
+            since=args.since,
+        )
+    else:
+        counts = import_all(
+            store, profile_id=args.profile, full=args.full, since=args.since
+        )
     store.close()
     print({"import": "all", "counts": counts})
     return 0
 
 
+def cmd_enrich_etld1(args: argparse.Namespace) -> int:
+    from wire_stripper.enrich.etld import fill_domain_etld1
+
+    store = _with_store(args)
+    updated = fill_domain_etld1(store)
+    store.close()
+    print({"enrich": "etld1", "updated": updated})
+    return 0
+
+
+def cmd_enrich_entities(args: argparse.Namespace) -> int:
+    from wire_stripper.enrich.entities import refresh_entity_graph
+
+    store = _with_store(args)
+    stats = refresh_entity_graph(store, full=args.full)
+    store.close()
+    print({"enrich": "entities", **vars(stats)})
+    return 0
+
+
+def cmd_enrich_resolve(args: argparse.Namespace) -> int:
+    from wire_stripper.enrich.dns_asn import DnsCache, resolve_many
+    from wire_stripper.enrich.lpm import load_asn_index
+
+    store = _with_store(args)
+    cache = DnsCache()
+    warmed = cache.load_ip_map(store)
+    with store.reader() as conn:
+        domains = [
+            r[0]
+            for r in conn.execute(
+                "SELECT domain FROM domain ORDER BY last_seen DESC LIMIT ?", (args.limit,)
+            )
+        ]
+        asn_index = load_asn_index(conn)
+    results = resolve_many(
+        domains,
+        max_workers=args.workers,
+        cache=cache,
+        store=store,
+        asn_index=asn_index,
+    )
+    store.close()
+    print(
+        {
+            "enrich": "resolve",
+            "domains": len(domains),
+            "resolved": sum(1 for ips in results.values() if ips),
+            "cache_warmed": warmed,
+            "cache_hits": cache.hits,
+        }
+    )
+    return 0
+
+
+def cmd_enrich_load_pfx2as(args: argparse.Namespace) -> int:
+    from wire_stripper.enrich.pfx2as import load_pfx2as
+
+    store = _with_store(args)
+    stats = load_pfx2as(store, args.file, source=args.source)
+    store.close()
+    print(
+        {
+            "enrich": "load-pfx2as",
+            "file": args.file,
+            "prefixes": stats.prefixes,
+            "added": stats.added,
+            "changed": stats.changed,
+            "removed": stats.removed,
+            "seconds": round(stats.seconds, 3),
+            "prefixes_per_s": round(stats.prefixes_per_s),
+        }
+    )
+    return 0
+
+
+def cmd_export_firewall(args: argparse.Namespace) -> int:
+    from wire_stripper.export.firewall import load_prefix_plan, render_ipset, render_nftables
+    from wire_stripper.fsutil import write_atomic
+
+    store = _with_store(args)
+    with store.reader() as conn:
+        plan = load_prefix_plan(conn, args.profile)
+    store.close()
+    lines = render_nftables(plan) if args.format == "nft" else render_ipset(plan)
+    write_atomic(args.out, lines)
+    print(
+        {
+            "export": "firewall",
+            "format": args.format,
+            "out": args.out,
+            "input": plan.input_count,
+            "v4": len(plan.v4),
+            "v6": len(plan.v6),
+        }
+    )
+    return 0
+
+
+def cmd_export_rules(args: argparse.Namespace) -> int:
+    from wire_stripper.export.rules import export_rules
+
+    store = _with_store(args)
+    generation = store.list_generation()
+    with store.reader() as conn:
+        result = export_rules(
+            conn,
+            args.exportcmd,
+            args.out,
+            profile_id=args.profile,
+            generation=generation,
+            delta=args.delta,
+            force=args.force,
+        )
+    store.close()
+    print(
+        {
+            "export": args.exportcmd,
+            "out": str(result.path),
+            "entries": result.entries,
+            "sha256": result.sha256,
+            "skipped": result.skipped,
+            "added": result.added,
+            "removed": result.removed,
+            "invalid": result.invalid,
+            "delta": str(result.delta_path) if result.delta_path else None,
+        }
+    )
+    return 0
+
+
+def cmd_report_entities(args: argparse.Namespace) -> int:
+    from wire_stripper.enrich.entities import entity_report
+
+    store = _with_store(args)
+    rows = entity_report(store, since=args.since, profile_id=args.profile, limit=args.limit)
+    store.close()
+    if not rows:
+        print("no decisions attributed to an entity (run `wire-strip enrich entities`?)")
+        return 0
+    print(f"{'entity':<32} {'decisions':>10} {'blocked':>10} {'hosts':>6}")
+    for r in rows:
+        print(f"{r.name[:32]:<32} {r.decisions:>10} {r.blocked:>10} {r.hostnames:>6}")
+    return 0
+
+
+def cmd_federation_enqueue(args: argparse.Namespace) -> int:
+    from wire_stripper.federation.outbox import enqueue_list_delta
+
+    store = _with_store(args)
+    result = enqueue_list_delta(
+        store, profile_id=args.profile, codec_name=args.codec, force=args.force
+    )
+    store.close()
+    print({"federation": "enqueue", **vars(result)})
+    return 0
+
+
+def cmd_federation_publish(args: argparse.Namespace) -> int:
+    from wire_stripper.federation.outbox import publish_pending
+    from wire_stripper.federation.sinks import DirectorySink, HttpSink
+
+    store = _with_store(args)
+    sink = DirectorySink(args.dir) if args.dir else HttpSink(args.url)
+    result = publish_pending(
+        store, sink, limit=args.limit, max_attempts=args.max_attempts, backoff=args.backoff
+    )
+    store.close()
+    print({"federation": "publish", **vars(result)})
+    return 0 if not result.failed else 1
+
+
+def cmd_federation_import(args: argparse.Namespace) -> int:
+    from wire_stripper.federation.inbox import import_batches
+
+    store = _with_store(args)
+    result = import_batches(store, args.dir, profile_id=args.profile)
+    store.close()
+    print({"federation": "import", **vars(result)})
+    return 0
+
+
+def cmd_federation_status(args: argparse.Namespace) -> int:
+    from wire_stripper.federation.outbox import outbox_status
+
+    store = _with_store(args)
+    status = outbox_status(store)
+    with store.reader() as conn:
+        peers = [
+            {"origin": o, "profile": p, "seq": q, "state": s[:12], "updated_at": u}
+            for o, p, q, s, u in conn.execute(
+                "SELECT origin, profile_id, seq, state, updated_at FROM federation_peer "
+                "ORDER BY origin, profile_id"
+            )
+        ]
+    store.close()
+    print({"federation": "status", "outbox": status, "peers": peers})
+    return 0
+
+
+def cmd_federation_serve(args: argparse.Namespace) -> int:
+    import threading
+
+    from wire_stripper.federation.sinks import BatchReceiver
+
+    receiver = BatchReceiver(args.dir, host=args.host, port=args.port).start()
+    print(
+        f"receiving batches at http://{receiver.host}:{receiver.port}/ into {args.dir} "
+        "(Ctrl-C to stop)"
+    )
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.close()
+    print({"federation": "serve", "received": receiver.received})
+    return 0
+
+
+def cmd_proxy(args: argparse.Namespace) -> int:
+    from wire_stripper.sensors.shard import run_sharded
+
+    store = _with_store(args)
+    mitm_args = args.mitm_args[1:] if args.mitm_args[:1] == ["--"] else args.mitm_args
+    try:
+        return run_sharded(
+            store,
+            profile_id=args.profile,
+            workers=args.workers,
+            host=args.listen_host,
+            port=args.listen_port,
+            base_port=args.base_port,
+            mitmdump=args.mitmdump,
+            mitm_args=mitm_args,
+            metrics_port=args.metrics_port,
+        )
+    finally:
+        store.close()
+
+
+def cmd_sensor_mcp_browser(args: argparse.Namespace) -> int:
+    import asyncio
+    import signal
+
+    from wire_stripper.sensors.mcp_browser import McpBrowserIngest, socket_path
+
+    store = _with_store(args)
+    ingest = McpBrowserIngest(store, profile_id=args.profile)
+
+    async def serve() -> None:
+        server = await ingest.serve(args.socket, host=args.host, port=args.port)
+        where = (
+            f"{args.host}:{args.port}"
+            if args.port is not None
+            else args.socket or socket_path(args.root)
+        )
+        print(f"mcp_browser ingest listening on {where} (Ctrl-C to stop)")
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):  # pragma: no cover - Windows
+                pass
+        async with server:
+            await stop.wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ingest.close()
+        store.close()
+    print({"sensor": "mcp_browser", **vars(ingest.totals)})
+    return 0
+
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    import threading
+
+    from wire_stripper.telemetry.exposition import (
+        MetricsServer,
+        collect,
+        metrics_dir,
+        render_prometheus,
+        render_table,
+    )
+
+    directory = metrics_dir(args.root)
+
+    def source() -> list[dict]:
+        return collect(directory, registry=None, max_age=args.max_age)
+
+    if args.serve is not None:
+        server = MetricsServer(source, host=args.host, port=args.serve).start()
+        print(f"serving http://{server.host}:{server.port}/metrics (Ctrl-C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+        return 0
+    merged = source()
+    if not merged:
+        print(f"no metrics dumped under {directory} in the last {args.max_age:g}s")
+        return 1
+    print((render_prometheus(merged) if args.prometheus else render_table(merged)).rstrip("\n"))
+    return 0
+
+
 def main() -> int:
     p = argparse.ArgumentParser(prog="wire-strip")
     p.add_argument("--root", default=_default_root(), help="data root (db location)")
+    p.add_argument(
+        "--perf-profile",
+        choices=sorted(PERF_PROFILES),
+        default=None,
+        help="SQLite tuning profile (default: $WIRE_STRIPPER_PERF_PROFILE or 'default')",
+    )
 
     sub = p.add_subparsers(dest="cmd", required=True)
 
@@ -62,9 +460,55 @@ def main() -> int:
     dbsub = dbp.add_subparsers(dest="dbcmd", required=True)
     dbinit = dbsub.add_parser("init")
     dbinit.set_defaults(func=cmd_db_init)
+    dbrot = dbsub.add_parser(
+        "rotate", help="move old events/decisions into partition files, apply retention"
+    )
+    dbrot.add_argument(
+        "--hot-days", type=int, default=2, help="days of raw rows kept in the main db"
+    )
+    dbrot.add_argument("--period", choices=PERIODS, default="week", help="partition size")
+    dbrot.add_argument(
+        "--keep-days", type=int, default=None, help="drop partitions older than this"
+    )
+    dbrot.add_argument(
+        "--rollup-keep-days",
+        type=int,
+        default=None,
+        help="also prune hourly rollups older than this",
+    )
+    dbrot.set_defaults(func=cmd_db_rotate)
+    dbarc = dbsub.add_parser(
+        "archive", help="rotate, then convert aged partitions into columnar archives"
+    )
+    dbarc.add_argument("--hot-days", type=int, default=2)
+    dbarc.add_argument("--period", choices=PERIODS, default="week")
+    dbarc.add_argument(
+        "--older-than-days",
+        type=int,
+        default=30,
+        help="archive partitions that ended at least this many days ago",
+    )
+    dbarc.add_argument(
+        "--format",
+        choices=ARCHIVE_FORMATS,
+        default="auto",
+        help="parquet needs pyarrow; wsa is the built-in zstd/gzip column format",
+    )
+    dbarc.set_defaults(func=cmd_db_archive)
 
     etlp = sub.add_parser("etl", help="import legacy tables into canonical tables")
     etlp.add_argument("--profile", default="default", help="policy/profile scope")
+    etlp.add_argument(
+        "--full",
+        action="store_true",
+        help="ignore ETL watermarks and rescan every legacy row",
+    )
+    etlp.add_argument(
+        "--since",
+        default=None,
+        type=normalize_since,
+        help="only import legacy rows with timestamp >= SINCE (ISO-8601); rescans, keeps watermarks",
+    )
     etls = etlp.add_subparsers(dest="etlcmd", required=True)
 
     etd = etls.add_parser("import-dmbt")
@@ -74,8 +518,186 @@ def main() -> int:
     etp.set_defaults(func=cmd_etl_import_privacy)
 
     eta = etls.add_parser("import-all")
+    eta.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="read/transform legacy sources in N worker processes (single writer)",
+    )
     eta.set_defaults(func=cmd_etl_import_all)
 
+    enp = sub.add_parser("enrich", help="derive facts from canonical tables")
+    ens = enp.add_subparsers(dest="enrichcmd", required=True)
+
+    ene = ens.add_parser("etld1", help="fill domain.etld1 from the Public Suffix List")
+    ene.set_defaults(func=cmd_enrich_etld1)
+
+    enen = ens.add_parser(
+        "entities",
+        help="materialize the entity closure and domain/ip/asn/prefix -> root entity map",
+    )
+    enen.add_argument(
+        "--full", action="store_true", help="rebuild instead of applying queued changes"
+    )
+    enen.set_defaults(func=cmd_enrich_entities)
+
+    enr = ens.add_parser("resolve", help="resolve domain table entries into ip_map")
+    enr.add_argument("--workers", type=int, default=32, help="max concurrent lookups")
+    enr.add_argument("--limit", type=int, default=10_000, help="max domains per run")
+    enr.set_defaults(func=cmd_enrich_resolve)
+
+    enl = ens.add_parser(
+        "load-pfx2as", help="load a CAIDA pfx2as / RIB prefix dump (.gz/.bz2/plain)"
+    )
+    enl.add_argument("file")
+    enl.add_argument(
+        "--source", default="pfx2as", help="snapshot name the diff is computed against"
+    )
+    enl.set_defaults(func=cmd_enrich_load_pfx2as)
+
+    exp = sub.add_parser("export", help="render list entries for enforcers")
+    exp.add_argument("--profile", default="default", help="policy/profile scope")
+    exs = exp.add_subparsers(dest="exportcmd", required=True)
+
+    exf = exs.add_parser(
+        "firewall", help="compacted blocked prefixes as an nft/ipset batch file"
+    )
+    exf.add_argument("--format", choices=("nft", "ipset"), default="nft")
+    exf.add_argument("--out", required=True, help="output file (written atomically)")
+    exf.set_defaults(func=cmd_export_firewall)
+
+    for name in FORMATS:
+        exr = exs.add_parser(name, help=f"domain lists as a {name} rule file")
+        exr.add_argument("--out", required=True, help="output file (written atomically)")
+        exr.add_argument(
+            "--delta",
+            action="store_true",
+            help="also write OUT.delta with +/- entries since the previous export",
+        )
+        exr.add_argument(
+            "--force",
+            action="store_true",
+            help="regenerate even if the list generation is unchanged",
+        )
+        exr.set_defaults(func=cmd_export_rules)
+
+    prx = sub.add_parser(
+        "proxy", help="run N mitmdump workers behind one listener (single db writer)"
+    )
+    prx.add_argument("--profile", default="default", help="policy/profile scope")
+    prx.add_argument(
+        "--workers", type=int, default=None, help="worker processes (default: CPU count)"
+    )
+    prx.add_argument("--listen-host", default="127.0.0.1")
+    prx.add_argument("--listen-port", type=int, default=8080)
+    prx.add_argument(
+        "--base-port",
+        type=int,
+        default=18080,
+        help="workers listen on 127.0.0.1:BASE_PORT+i",
+    )
+    prx.add_argument("--mitmdump", default="mitmdump", help="mitmdump executable")
+    prx.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="serve Prometheus metrics of all workers on 127.0.0.1:PORT/metrics",
+    )
+    prx.add_argument(
+        "mitm_args", nargs=argparse.REMAINDER, help="extra mitmdump options (after --)"
+    )
+    prx.set_defaults(func=cmd_proxy)
+
+    rpp = sub.add_parser("report", help="summaries over recorded decisions")
+    rps = rpp.add_subparsers(dest="reportcmd", required=True)
+    rpe = rps.add_parser("entities", help="decisions per root entity (company)")
+    rpe.add_argument("--profile", default=None, help="only this profile")
+    rpe.add_argument(
+        "--since",
+        default=None,
+        type=lambda v: datetime.fromisoformat(v).isoformat(timespec="seconds"),
+        help="only decisions at or after SINCE (ISO-8601)",
+    )
+    rpe.add_argument("--limit", type=int, default=20)
+    rpe.set_defaults(func=cmd_report_entities)
+
+    fdp = sub.add_parser("federation", help="share list changes with peers as delta batches")
+    fds = fdp.add_subparsers(dest="federationcmd", required=True)
+    fde = fds.add_parser(
+        "enqueue", help="queue list changes since the last enqueue as one compressed batch"
+    )
+    fde.add_argument("--profile", default="default", help="policy/profile scope")
+    fde.add_argument(
+        "--codec",
+        choices=("zstd", "gzip"),
+        default=None,
+        help="body compression (default: zstd if installed, else gzip)",
+    )
+    fde.add_argument(
+        "--force", action="store_true", help="rescan even if the list generation is unchanged"
+    )
+    fde.set_defaults(func=cmd_federation_enqueue)
+    fdu = fds.add_parser("publish", help="send due outbox batches to a sink, with retry")
+    fdt = fdu.add_mutually_exclusive_group(required=True)
+    fdt.add_argument("--dir", help="write BATCH_ID.wsf files into this directory")
+    fdt.add_argument("--url", help="POST batches to this URL (see `federation serve`)")
+    fdu.add_argument("--limit", type=int, default=100, help="max batches per run")
+    fdu.add_argument("--max-attempts", type=int, default=8)
+    fdu.add_argument(
+        "--backoff", type=float, default=30.0, help="first retry delay in seconds (doubles)"
+    )
+    fdu.set_defaults(func=cmd_federation_publish)
+    fdi = fds.add_parser("import", help="apply peer batches from a directory")
+    fdi.add_argument("--dir", required=True)
+    fdi.add_argument("--profile", default="default", help="local profile to apply into")
+    fdi.set_defaults(func=cmd_federation_import)
+    fdst = fds.add_parser("status", help="outbox batches by status and peer chain positions")
+    fdst.set_defaults(func=cmd_federation_status)
+    fdv = fds.add_parser(
+        "serve", help="local HTTP stand-in for a peer: store POSTed batches in --dir"
+    )
+    fdv.add_argument("--dir", required=True)
+    fdv.add_argument("--host", default="127.0.0.1")
+    fdv.add_argument("--port", type=int, default=9470)
+    fdv.set_defaults(func=cmd_federation_serve)
+
+    snp = sub.add_parser("sensor", help="run a sensor ingest endpoint")
+    sns = snp.add_subparsers(dest="sensorcmd", required=True)
+    smb = sns.add_parser(
+        "mcp-browser", help="NDJSON event ingest for the browser (MCP/DevTools) sensor"
+    )
+    smb.add_argument("--profile", default="default", help="policy/profile scope")
+    smb.add_argument(
+        "--socket", default=None, help="Unix socket path (default: ROOT/run/mcp_browser.sock)"
+    )
+    smb.add_argument(
+        "--port", type=int, default=None, help="listen on HOST:PORT (TCP) instead of a socket"
+    )
+    smb.add_argument("--host", default="127.0.0.1")
+    smb.set_defaults(func=cmd_sensor_mcp_browser)
+
+    stp = sub.add_parser(
+        "stats", help="hot-path counters and latency percentiles of running sensors"
+    )
+    stp.add_argument(
+        "--max-age",
+        type=float,
+        default=60.0,
+        help="ignore processes whose last metrics dump is older than this (seconds)",
+    )
+    stp.add_argument(
+        "--prometheus", action="store_true", help="print Prometheus text format"
+    )
+    stp.add_argument(
+        "--serve",
+        type=int,
+        default=None,
+        metavar="PORT",
+        help="serve the merged metrics at http://HOST:PORT/metrics instead",
+    )
+    stp.add_argument("--host", default="127.0.0.1", help="bind address for --serve")
+    stp.set_defaults(func=cmd_stats)
+
     args = p.parse_args()
     return args.func(args)
 
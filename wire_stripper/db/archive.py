@@ -0,0 +1,395 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import sqlite3
+import struct
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+from wire_stripper.db.partitions import PARTITIONED, list_partitions
+from wire_stripper.db.store import Store
+from wire_stripper.fsutil import atomic_path
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except Exception:  # pragma: no cover
+    pa = None  # type: ignore
+    pq = None  # type: ignore
+
+try:
+    import zstandard  # type: ignore
+except Exception:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+# Low-cardinality or highly repetitive columns stored as file-level
+# dictionaries + uint32 indices. headers_json/cookies_json dedupe whole
+# header sets this way: each distinct JSON blob is stored once per file.
+DICT_COLUMNS = frozenset(
+    {
+        "sensor",
+        "profile_id",
+        "hostname",
+        "method",
+        "resource_type",
+        "src_ip",
+        "dst_ip",
+        "proto",
+        "headers_json",
+        "cookies_json",
+        "initiator_json",
+        "header_set_id",
+        "effective_action",
+        "matched_rule",
+        "explanation",
+    }
+)
+
+FORMATS = ("auto", "parquet", "wsa")
+
+_MAGIC = b"WSA1"
+_NULL = 0xFFFFFFFF
+_TRAILER = struct.Struct("<Q4s")
+
+
+@dataclass(frozen=True)
+class _Codec:
+    name: str
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+def _codec(name: str | None = None) -> _Codec:
+    name = name or ("zstd" if zstandard is not None else "gzip")
+    if name == "zstd":
+        if zstandard is None:
+            raise RuntimeError("archive uses zstd but the zstandard module is not installed")
+        return _Codec(
+            "zstd",
+            zstandard.ZstdCompressor(level=9).compress,
+            zstandard.ZstdDecompressor().decompress,
+        )
+    return _Codec("gzip", lambda b: gzip.compress(b, 6, mtime=0), gzip.decompress)
+
+
+def _indices_to_bytes(idx: array) -> bytes:
+    if sys.byteorder == "big":
+        idx.byteswap()
+    return idx.tobytes()
+
+
+def _bytes_to_indices(raw: bytes) -> array:
+    idx = array("I")
+    idx.frombytes(raw)
+    if sys.byteorder == "big":
+        idx.byteswap()
+    return idx
+
+
+def _batches(rows: Iterable[Sequence[Any]], size: int) -> Iterator[list[Sequence[Any]]]:
+    batch: list[Sequence[Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_wsa(
+    path: str | os.PathLike[str],
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    row_group_size: int = 65_536,
+    codec: str | None = None,
+) -> int:
+    """Write rows into the fallback column-chunked format. Returns row count.
+
+    Layout: magic, then per row group one compressed chunk per column
+    (dictionary indices for DICT_COLUMNS, a JSON array otherwise), then one
+    compressed JSON array per dictionary, then a JSON footer with offsets,
+    its length and the magic again. Readers seek to the footer and only
+    decompress the columns they ask for.
+    """
+    c = _codec(codec)
+    dicts: dict[str, dict[Any, int]] = {col: {} for col in columns if col in DICT_COLUMNS}
+    groups: list[dict[str, Any]] = []
+    total = 0
+    with open(path, "wb") as fh:
+        fh.write(_MAGIC)
+
+        def put(raw: bytes) -> list[int]:
+            payload = c.compress(raw)
+            offset = fh.tell()
+            fh.write(payload)
+            return [offset, len(payload)]
+
+        for batch in _batches(rows, row_group_size):
+            chunks: dict[str, list[Any]] = {}
+            for i, col in enumerate(columns):
+                values = [r[i] for r in batch]
+                d = dicts.get(col)
+                if d is not None:
+                    idx = array(
+                        "I",
+                        (_NULL if v is None else d.setdefault(v, len(d)) for v in values),
+                    )
+                    chunks[col] = put(_indices_to_bytes(idx)) + ["dict"]
+                else:
+                    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+                    chunks[col] = put(raw) + ["json"]
+            groups.append({"rows": len(batch), "chunks": chunks})
+            total += len(batch)
+
+        dict_chunks = {
+            col: put(json.dumps(list(d), separators=(",", ":")).encode("utf-8"))
+            for col, d in dicts.items()
+        }
+        footer = json.dumps(
+            {
+                "version": 1,
+                "codec": c.name,
+                "columns": list(columns),
+                "rows": total,
+                "groups": groups,
+                "dicts": dict_chunks,
+            },
+            separators=(",", ":"),
+        ).encode("utf-8")
+        fh.write(footer)
+        fh.write(_TRAILER.pack(len(footer), _MAGIC))
+    return total
+
+
+class WsaReader:
+    """Column-selective reader for files written by `write_wsa`."""
+
+    def __init__(self, path: str | os.PathLike[str]):
+        self.path = Path(path)
+        with open(self.path, "rb") as fh:
+            if fh.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{self.path}: not a wire_stripper archive")
+            fh.seek(-_TRAILER.size, os.SEEK_END)
+            length, magic = _TRAILER.unpack(fh.read(_TRAILER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"{self.path}: truncated archive")
+            fh.seek(-_TRAILER.size - length, os.SEEK_END)
+            self.footer = json.loads(fh.read(length))
+        self.columns: list[str] = self.footer["columns"]
+        self.rows: int = self.footer["rows"]
+        self._codec = _codec(self.footer["codec"])
+        self._dicts: dict[str, list[Any]] = {}
+
+    def _read(self, fh, offset: int, length: int) -> bytes:
+        fh.seek(offset)
+        return self._codec.decompress(fh.read(length))
+
+    def iter_batches(
+        self, columns: Sequence[str] | None = None
+    ) -> Iterator[dict[str, list[Any]]]:
+        cols = list(columns or self.columns)
+        missing = set(cols) - set(self.columns)
+        if missing:
+            raise KeyError(f"unknown archive columns: {sorted(missing)}")
+        with open(self.path, "rb") as fh:
+            for col in cols:
+                if col in self.footer["dicts"] and col not in self._dicts:
+                    self._dicts[col] = json.loads(self._read(fh, *self.footer["dicts"][col]))
+            for group in self.footer["groups"]:
+                batch: dict[str, list[Any]] = {}
+                for col in cols:
+                    offset, length, encoding = group["chunks"][col]
+                    raw = self._read(fh, offset, length)
+                    if encoding == "dict":
+                        values = self._dicts[col]
+                        batch[col] = [
+                            None if i == _NULL else values[i] for i in _bytes_to_indices(raw)
+                        ]
+                    else:
+                        batch[col] = json.loads(raw)
+                yield batch
+
+
+class ParquetReader:
+    """Same interface as WsaReader, backed by pyarrow."""
+
+    def __init__(self, path: str | os.PathLike[str]):
+        if pq is None:
+            raise RuntimeError("reading .parquet archives requires pyarrow")
+        self.path = Path(path)
+        self._file = pq.ParquetFile(self.path)
+        self.columns: list[str] = list(self._file.schema_arrow.names)
+        self.rows: int = self._file.metadata.num_rows
+
+    def iter_batches(
+        self, columns: Sequence[str] | None = None
+    ) -> Iterator[dict[str, list[Any]]]:
+        for batch in self._file.iter_batches(columns=list(columns) if columns else None):
+            yield batch.to_pydict()
+
+
+def open_archive(path: str | os.PathLike[str]) -> WsaReader | ParquetReader:
+    return ParquetReader(path) if str(path).endswith(".parquet") else WsaReader(path)
+
+
+def iter_archive(
+    path: str | os.PathLike[str], columns: Sequence[str] | None = None
+) -> Iterator[dict[str, Any]]:
+    """Rows of an archive file as dicts, without loading it into SQLite."""
+    for batch in open_archive(path).iter_batches(columns):
+        names = list(batch)
+        for values in zip(*(batch[n] for n in names)):
+            yield dict(zip(names, values))
+
+
+def _arrow_type(decl: str):
+    # SQLite affinity rules, narrowed to what the partitioned tables declare.
+    decl = decl.upper()
+    if "INT" in decl:
+        return pa.int64()
+    if any(t in decl for t in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    if "BLOB" in decl:
+        return pa.binary()
+    return pa.string()
+
+
+def _write_parquet(
+    path: Path,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    row_group_size: int,
+    types: Sequence[str] | None = None,
+) -> int:
+    # One schema for the whole file: inferring it per batch fails as soon as
+    # a later row group differs (a column that was all NULL so far, say).
+    schema = pa.schema(
+        [(col, _arrow_type(types[i] if types else "")) for i, col in enumerate(columns)]
+    )
+    total = 0
+    with pq.ParquetWriter(
+        str(path),
+        schema,
+        compression="zstd",
+        use_dictionary=[c for c in columns if c in DICT_COLUMNS],
+    ) as writer:
+        for batch in _batches(rows, row_group_size):
+            table = pa.Table.from_pydict(
+                {col: [r[i] for r in batch] for i, col in enumerate(columns)}, schema=schema
+            )
+            writer.write_table(table, row_group_size=row_group_size)
+            total += len(batch)
+    return total
+
+
+def write_archive(
+    path: str | os.PathLike[str],
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    row_group_size: int = 65_536,
+    types: Sequence[str] | None = None,
+) -> int:
+    """Atomically write rows as Parquet (`.parquet`) or the fallback format.
+
+    `types` are the columns' declared SQLite types; Parquet columns get the
+    matching Arrow type (text when omitted).
+    """
+    with atomic_path(path) as tmp:
+        if str(path).endswith(".parquet"):
+            return _write_parquet(tmp, columns, rows, row_group_size, types)
+        return write_wsa(tmp, columns, rows, row_group_size)
+
+
+@dataclass(frozen=True)
+class ArchiveStats:
+    files: int
+    rows: int
+    source_bytes: int
+    archive_bytes: int
+    seconds: float
+
+    @property
+    def ratio(self) -> float:
+        return self.source_bytes / self.archive_bytes if self.archive_bytes else 0.0
+
+
+def archive_dir(store: Store) -> Path:
+    return store.paths.root / "archive"
+
+
+def archive_files(store: Store, table: str) -> list[Path]:
+    """Every archive file of `table`, re-sealed parts (`.partN`) included."""
+    return sorted(
+        p
+        for p in archive_dir(store).glob(f"{table}-*")
+        if p.suffix[1:] in FORMATS
+    )
+
+
+def _free_name(directory: Path, stem: str, fmt: str) -> Path:
+    # A period that is sealed again after being archived (late rows) gets
+    # another part next to the first one instead of replacing it.
+    out = directory / f"{stem}.{fmt}"
+    n = 1
+    while out.exists():
+        out = directory / f"{stem}.part{n}.{fmt}"
+        n += 1
+    return out
+
+
+def archive_partitions(
+    store: Store,
+    older_than_days: int = 30,
+    fmt: str = "auto",
+    now: datetime | None = None,
+) -> ArchiveStats:
+    """Convert partition files that ended `older_than_days` ago into archives.
+
+    Each table of a partition becomes `archive/<table>-<period>-<start>.parquet`
+    (pyarrow installed, or fmt='parquet') or `.wsa`; if that period was
+    archived before, the new file is `<...>.partN.<fmt>` and readers should
+    use `archive_files`. The partition file is removed once its archives
+    are in place.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {FORMATS}")
+    if fmt == "auto":
+        fmt = "parquet" if pq is not None else "wsa"
+    if fmt == "parquet" and pq is None:
+        raise RuntimeError("fmt='parquet' requires pyarrow")
+
+    t0 = time.perf_counter()
+    horizon = (now or datetime.utcnow()).date() - timedelta(days=older_than_days)
+    files = rows = source_bytes = archive_bytes = 0
+    for part in list_partitions(store):
+        if part.end > horizon:
+            continue
+        source_bytes += part.path.stat().st_size
+        conn = sqlite3.connect(f"{part.path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            for table in PARTITIONED:
+                info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+                if not info:
+                    continue
+                columns = [c[1] for c in info]
+                out = _free_name(
+                    archive_dir(store), f"{table}-{part.period}-{part.start.isoformat()}", fmt
+                )
+                cur = conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY ts")
+                rows += write_archive(out, columns, cur, types=[c[2] for c in info])
+                archive_bytes += out.stat().st_size
+                files += 1
+        finally:
+            conn.close()
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            Path(f"{part.path}{suffix}").unlink(missing_ok=True)
+
+    return ArchiveStats(files, rows, source_bytes, archive_bytes, time.perf_counter() - t0)
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterator
+
+from wire_stripper.db.store import Store
+
+# Append-only tables that are moved out of the hot DB into partition files.
+PARTITIONED = ("event", "decision")
+# Primary key of each partitioned table.
+_KEYS = {"event": "event_id", "decision": "decision_id"}
+PERIODS = ("day", "week")
+
+# SQLite's default SQLITE_MAX_ATTACHED.
+MAX_ATTACHED = 10
+
+_NAME = re.compile(r"^events-(day|week)-(\d{4}-\d{2}-\d{2})\.sqlite$")
+
+# Period start ('YYYY-MM-DD') of a ts; works for both 'T' and ' ' separators.
+_PERIOD_SQL = {
+    "day": "substr(ts, 1, 10)",
+    "week": "date(substr(ts, 1, 10), '-6 days', 'weekday 1')",
+}
+
+
+
+def _hour_sql(col: str) -> str:
+    """SQL for the hour bucket ('YYYY-MM-DDTHH:00:00') of timestamp column `col`."""
+    return f"substr({col}, 1, 10) || 'T' || substr({col}, 12, 2) || ':00:00'"
+
+
+@dataclass(frozen=True)
+class Partition:
+    period: str
+    start: date
+    path: Path
+
+    @property
+    def end(self) -> date:
+        """First day after the partition (exclusive bound)."""
+        return _period_end(self.start, self.period)
+
+
+def _period_end(start: date, period: str) -> date:
+    return start + timedelta(days=7 if period == "week" else 1)
+
+
+@dataclass(frozen=True)
+class SealStats:
+    partitions: int
+    events: int
+    decisions: int
+    seconds: float
+    # ts prefixes (substr(ts, 1, 10)) that are not a date; those rows stay hot.
+    unparseable: tuple[str, ...] = ()
+
+
+def partition_dir(store: Store) -> Path:
+    return store.paths.root / "partitions"
+
+
+def partition_path(store: Store, period: str, start: date) -> Path:
+    return partition_dir(store) / f"events-{period}-{start.isoformat()}.sqlite"
+
+
+def list_partitions(store: Store) -> list[Partition]:
+    out = []
+    root = partition_dir(store)
+    if root.is_dir():
+        for path in root.iterdir():
+            m = _NAME.match(path.name)
+            if m:
+                out.append(Partition(m.group(1), date.fromisoformat(m.group(2)), path))
+    return sorted(out, key=lambda p: (p.start, p.period))
+
+
+def _ensure_table(conn: sqlite3.Connection, schema: str, table: str) -> list[str]:
+    """Mirror main.`table` into `schema`, adding columns main gained since. Returns columns."""
+    cols = conn.execute(f"PRAGMA main.table_info({table})").fetchall()
+    names = [c[1] for c in cols]
+    existing = {c[1] for c in conn.execute(f"PRAGMA {schema}.table_info({table})")}
+    if not existing:
+        ddl = ", ".join(
+            f"{c[1]} {c[2]}{' PRIMARY KEY' if c[5] else ''}" for c in cols
+        )
+        conn.execute(f"CREATE TABLE {schema}.{table} ({ddl})")
+        conn.execute(f"CREATE INDEX {schema}.idx_{table}_ts ON {table}(ts)")
+    else:
+        for c in cols:
+            if c[1] not in existing:
+                conn.execute(f"ALTER TABLE {schema}.{table} ADD COLUMN {c[1]} {c[2]}")
+    return names
+
+
+def _mark_new(conn: sqlite3.Connection, table: str, bounds: dict[str, str]) -> None:
+    """Record in part.seal_pending the rows of `table` in range not yet in the partition.
+
+    Runs in the copy transaction (which writes only the partition file), so
+    after a crash the partition itself says which of its rows still need
+    rolling up. Rows it already held, e.g. deterministic ETL ids imported
+    again after an earlier seal, are never counted twice.
+    """
+    key = _KEYS[table]
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS part.seal_pending "
+        "(tbl TEXT NOT NULL, id TEXT NOT NULL, PRIMARY KEY(tbl, id)) WITHOUT ROWID"
+    )
+    # Left over if a run died after its rollup commit: those rows have left main.
+    conn.execute(
+        f"DELETE FROM part.seal_pending WHERE tbl = '{table}' "
+        f"AND id NOT IN (SELECT {key} FROM main.{table})"
+    )
+    conn.execute(
+        f"INSERT OR IGNORE INTO part.seal_pending(tbl, id) SELECT '{table}', m.{key} "
+        f"FROM main.{table} m WHERE m.ts >= :lo AND m.ts < :hi AND NOT EXISTS "
+        f"(SELECT 1 FROM part.{table} p WHERE p.{key} = m.{key})",
+        bounds,
+    )
+
+
+def _rollup(conn: sqlite3.Connection, bounds: dict[str, str]) -> None:
+    """Add the rows listed in part.seal_pending to the hourly rollups."""
+    conn.execute(
+        "INSERT INTO event_rollup_hourly(hour, profile_id, hostname, asn, events, bytes) "
+        f"SELECT {_hour_sql('e.ts')}, COALESCE(e.profile_id, ''), "
+        "COALESCE(e.hostname, ''), COALESCE(ip.asn, ''), COUNT(*), COALESCE(SUM(e.bytes), 0) "
+        "FROM main.event e LEFT JOIN main.ip ip ON ip.ip = e.dst_ip "
+        "WHERE e.ts >= :lo AND e.ts < :hi "
+        "AND e.event_id IN (SELECT id FROM part.seal_pending WHERE tbl = 'event') "
+        "GROUP BY 1, 2, 3, 4 "
+        "ON CONFLICT(hour, profile_id, hostname, asn) DO UPDATE SET "
+        "events = events + excluded.events, bytes = bytes + excluded.bytes",
+        bounds,
+    )
+    conn.execute(
+        "INSERT INTO decision_rollup_hourly(hour, profile_id, hostname, effective_action, decisions) "
+        f"SELECT {_hour_sql('ts')}, COALESCE(profile_id, ''), COALESCE(hostname, ''), "
+        "COALESCE(effective_action, ''), COUNT(*) "
+        "FROM main.decision WHERE ts >= :lo AND ts < :hi "
+        "AND decision_id IN (SELECT id FROM part.seal_pending WHERE tbl = 'decision') "
+        "GROUP BY 1, 2, 3, 4 "
+        "ON CONFLICT(hour, profile_id, hostname, effective_action) DO UPDATE SET "
+        "decisions = decisions + excluded.decisions",
+        bounds,
+    )
+
+
+def seal_partitions(
+    store: Store,
+    hot_days: int = 2,
+    period: str = "week",
+    now: datetime | None = None,
+) -> SealStats:
+    """Move event/decision rows older than `hot_days` into partition files.
+
+    Rows are grouped by `period` (day, or ISO week starting Monday) into
+    `partitions/events-<period>-<start>.sqlite`. Each group is copied with
+    INSERT OR IGNORE and committed first, noting which rows were new to the
+    partition; hourly rollups of just those rows are then added and the
+    range deleted from the hot DB in a second transaction, and the note is
+    cleared in a third. Each transaction writes one file only, so a crash
+    anywhere leaves rows the next run copies idempotently and rolls up
+    once; rows the partition already held (re-imported ids) are deleted
+    from the hot DB without being counted again. The hot
+    DB never holds more than `hot_days` of raw rows, and retention
+    (`drop_partitions`) removes whole files. Rows whose ts does not start
+    with a date are left in place and reported in `unparseable`.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {PERIODS}")
+    if hot_days < 1:
+        raise ValueError("hot_days must be >= 1")
+    t0 = time.perf_counter()
+    today = (now or datetime.utcnow()).date()
+    cutoff = today - timedelta(days=hot_days - 1)
+
+    conn = store.conn
+    starts: set[date] = set()
+    unparseable: set[str] = set()
+    for table in PARTITIONED:
+        for day, start in conn.execute(
+            f"SELECT DISTINCT substr(ts, 1, 10), {_PERIOD_SQL[period]} FROM {table} WHERE ts < ?",
+            (cutoff.isoformat(),),
+        ):
+            try:
+                starts.add(date.fromisoformat(start))
+            except (TypeError, ValueError):
+                unparseable.add(day)
+
+    moved = {table: 0 for table in PARTITIONED}
+    partition_dir(store).mkdir(parents=True, exist_ok=True)
+    for start in sorted(starts):
+        end = min(_period_end(start, period), cutoff)
+        bounds = {"lo": start.isoformat(), "hi": end.isoformat()}
+        with store.lock:
+            conn.commit()
+            conn.execute(
+                "ATTACH DATABASE ? AS part",
+                (str(partition_path(store, period, start)),),
+            )
+            try:
+                with store.transaction():
+                    for table in PARTITIONED:
+                        cols = ", ".join(_ensure_table(conn, "part", table))
+                        _mark_new(conn, table, bounds)
+                        conn.execute(
+                            f"INSERT OR IGNORE INTO part.{table}({cols}) "
+                            f"SELECT {cols} FROM main.{table} WHERE ts >= :lo AND ts < :hi",
+                            bounds,
+                        )
+                with store.transaction():
+                    _rollup(conn, bounds)
+                    for table in PARTITIONED:
+                        moved[table] += conn.execute(
+                            f"DELETE FROM main.{table} WHERE ts >= :lo AND ts < :hi",
+                            bounds,
+                        ).rowcount
+                with store.transaction():
+                    conn.execute("DELETE FROM part.seal_pending")
+            finally:
+                conn.execute("DETACH DATABASE part")
+
+    return SealStats(
+        partitions=len(starts),
+        events=moved["event"],
+        decisions=moved["decision"],
+        seconds=time.perf_counter() - t0,
+        unparseable=tuple(sorted(unparseable)),
+    )
+
+
+def drop_partitions(
+    store: Store,
+    keep_days: int,
+    rollup_keep_days: int | None = None,
+    now: datetime | None = None,
+) -> list[Path]:
+    """Delete partition files that ended more than `keep_days` ago.
+
+    Dropping a file is O(1) regardless of how many rows it holds. Hourly
+    rollups are kept unless `rollup_keep_days` is given.
+    """
+    today = (now or datetime.utcnow()).date()
+    horizon = today - timedelta(days=keep_days)
+    dropped = []
+    for part in list_partitions(store):
+        if part.end <= horizon:
+            for suffix in ("", "-wal", "-shm", "-journal"):
+                Path(f"{part.path}{suffix}").unlink(missing_ok=True)
+            dropped.append(part.path)
+    if rollup_keep_days is not None:
+        limit = (today - timedelta(days=rollup_keep_days)).isoformat()
+        with store.transaction() as conn:
+            conn.execute("DELETE FROM event_rollup_hourly WHERE hour < ?", (limit,))
+            conn.execute("DELETE FROM decision_rollup_hourly WHERE hour < ?", (limit,))
+    return dropped
+
+
+@contextmanager
+def history(
+    store: Store, since: date | None = None, until: date | None = None
+) -> Iterator[sqlite3.Connection]:
+    """Read-only connection with `event_all`/`decision_all` temp views.
+
+    The views UNION ALL the hot tables with every partition overlapping
+    [since, until); at most MAX_ATTACHED partitions can be attached at once,
+    so long ranges need a narrower window (or weekly partitions).
+    """
+    parts = [
+        p
+        for p in list_partitions(store)
+        if (since is None or p.end > since) and (until is None or p.start < until)
+    ]
+    if len(parts) > MAX_ATTACHED:
+        raise ValueError(
+            f"{len(parts)} partitions in range; at most {MAX_ATTACHED} can be attached"
+        )
+    # Not query_only: the temp views live in the (writable) temp schema.
+    conn = sqlite3.connect(
+        f"{store.paths.db_path.resolve().as_uri()}?mode=ro", uri=True
+    )
+    conn.row_factory = sqlite3.Row
+    try:
+        schemas = ["main"]
+        for i, part in enumerate(parts):
+            conn.execute(
+                f"ATTACH DATABASE ? AS p{i}", (f"{part.path.resolve().as_uri()}?mode=ro",)
+            )
+            schemas.append(f"p{i}")
+        for table in PARTITIONED:
+            cols = [c[1] for c in conn.execute(f"PRAGMA main.table_info({table})")]
+            selects = []
+            for schema in schemas:
+                # Partitions sealed before a column was added read it as NULL.
+                have = {c[1] for c in conn.execute(f"PRAGMA {schema}.table_info({table})")}
+                exprs = ", ".join(c if c in have else f"NULL AS {c}" for c in cols)
+                selects.append(f"SELECT {exprs} FROM {schema}.{table}")
+            union = " UNION ALL ".join(selects)
+            conn.execute(f"CREATE TEMP VIEW {table}_all AS {union}")
+        yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Iterator, Sequence
+
+
+def connect_readonly(
+    db_path: str | os.PathLike[str],
+    pragmas: Sequence[str] = ("PRAGMA busy_timeout=5000",),
+    cached_statements: int = 128,
+) -> sqlite3.Connection:
+    """Open `db_path` read-only (`mode=ro` URI + `query_only`), usable from any thread."""
+    conn = sqlite3.connect(
+        f"{Path(db_path).resolve().as_uri()}?mode=ro",
+        uri=True,
+        check_same_thread=False,
+        isolation_level=None,
+        cached_statements=cached_statements,
+    )
+    conn.execute("PRAGMA query_only=ON")
+    for pragma in pragmas:
+        conn.execute(pragma)
+    return conn
+
+
+@dataclass
+class PoolStats:
+    size: int
+    created: int = 0
+    in_use: int = 0
+    acquired: int = 0
+    # Acquisitions that found no idle connection and had to wait for one.
+    waited: int = 0
+    timeouts: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    @property
+    def mean_wait_ms(self) -> float:
+        return 1000.0 * self.wait_seconds / self.waited if self.waited else 0.0
+
+
+class ReadPool:
+    """Bounded pool of read-only connections to one SQLite file.
+
+    Under WAL every reader sees the last committed state without blocking
+    the writer, so policy lookups, exports and reports can run alongside
+    ingest. A connection is checked out exclusively for the duration of a
+    `connection()` block, so cursors never interleave across threads or
+    tasks. Connections are opened lazily up to `size`; beyond that callers
+    wait up to `timeout` seconds and then get TimeoutError.
+    """
+
+    def __init__(
+        self,
+        db_path: str | os.PathLike[str],
+        size: int = 4,
+        timeout: float = 5.0,
+        pragmas: Sequence[str] = ("PRAGMA busy_timeout=5000",),
+        cached_statements: int = 128,
+    ):
+        if size < 1:
+            raise ValueError("pool size must be >= 1")
+        self.db_path = Path(db_path)
+        self.timeout = timeout
+        self.pragmas = tuple(pragmas)
+        self.cached_statements = cached_statements
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._stats = PoolStats(size=size)
+        self._closed = False
+
+    @property
+    def stats(self) -> PoolStats:
+        """A consistent copy of the usage/wait counters."""
+        with self._lock:
+            return replace(self._stats)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def _acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise RuntimeError("read pool is closed")
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open_or_wait()
+        with self._lock:
+            self._stats.acquired += 1
+            self._stats.in_use += 1
+        return conn
+
+    def _open_or_wait(self) -> sqlite3.Connection:
+        with self._lock:
+            grow = self._stats.created < self._stats.size
+            if grow:
+                self._stats.created += 1
+        if grow:
+            try:
+                conn = connect_readonly(
+                    self.db_path, self.pragmas, self.cached_statements
+                )
+            except BaseException:
+                with self._lock:
+                    self._stats.created -= 1
+                raise
+            conn.row_factory = sqlite3.Row
+            return conn
+
+        t0 = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self._stats.timeouts += 1
+            raise TimeoutError(
+                f"no read connection free after {self.timeout}s (pool size {self._stats.size})"
+            ) from None
+        waited = time.perf_counter() - t0
+        with self._lock:
+            self._stats.waited += 1
+            self._stats.wait_seconds += waited
+            if waited > self._stats.max_wait_seconds:
+                self._stats.max_wait_seconds = waited
+        return conn
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._stats.in_use -= 1
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        """Close idle connections now; checked-out ones close on release."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+from typing import Any
+
+from wire_stripper.db.store import Store
+from wire_stripper.db.writer import ROW_COUNTERS, BatchWriter
+
+
+class ForwardingWriter(BatchWriter):
+    """BatchWriter for proxy worker processes: batches go to the writer process.
+
+    Same queueing and batching as BatchWriter, but each flushed batch (a
+    `{kind: [params, ...]}` dict) is sent over a Unix socket to a
+    `WriterServer` instead of being written to SQLite, so only one process
+    ever holds the database write lock. A failed send reconnects and resends
+    once; if that fails too (writer process restarting), the batch is kept
+    and goes out with the next flush. Only rows beyond `max_unsent` are
+    counted as failed, so a short outage loses nothing.
+    """
+
+    def __init__(
+        self,
+        address: str | os.PathLike[str],
+        authkey: bytes,
+        max_unsent: int | None = None,
+        **kwargs: Any,
+    ):
+        super().__init__(None, **kwargs)  # type: ignore[arg-type]
+        self.address = str(address)
+        self.authkey = authkey
+        self.max_unsent = 10 * self.batch_size if max_unsent is None else max_unsent
+        self._conn: Connection | None = None
+        self._unsent: dict[str, list[tuple[Any, ...]]] = {}
+
+    def _send(self, pending: dict[str, list[tuple[Any, ...]]]) -> bool:
+        for attempt in range(2):
+            try:
+                if self._conn is None:
+                    self._conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+                self._conn.send(pending)
+                return True
+            except (OSError, EOFError, AuthenticationError):
+                self._disconnect()
+                if attempt == 0:
+                    time.sleep(0.05)
+        return False
+
+    def _write(self, pending: dict[str, list[tuple[Any, ...]]]) -> bool:
+        if self._unsent:
+            for kind, batch in pending.items():
+                self._unsent.setdefault(kind, []).extend(batch)
+            pending, self._unsent = self._unsent, {}
+        if not pending:
+            return True
+        rows = sum(len(v) for v in pending.values())
+        if self._send(pending):
+            self.stats.written += rows
+            ROW_COUNTERS["forwarded"].inc(rows)
+        elif rows <= self.max_unsent:
+            self._unsent = pending
+        else:
+            self.stats.failed += rows
+            ROW_COUNTERS["failed"].inc(rows)
+        self.stats.flushes += 1
+        return True
+
+    def _disconnect(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+            self._conn = None
+
+    def close(self, timeout: float | None = 10.0) -> bool:
+        if not super().close(timeout):
+            return False
+        rows = sum(len(v) for v in self._unsent.values())
+        if rows:
+            self.stats.failed += rows
+            ROW_COUNTERS["failed"].inc(rows)
+            self._unsent = {}
+        self._disconnect()
+        return True
+
+
+class WriterServer:
+    """The single writer: accepts ForwardingWriter connections, feeds one BatchWriter.
+
+    Each worker connection gets a receiving thread that hands batches to the
+    local BatchWriter with `submit_many`. The default writer blocks without
+    a timeout (rather than drops) when its queue is full, so backpressure
+    reaches the socket and the workers' own bounded queues; rows a custom
+    `writer` still drops are counted in `dropped`. Connections must present
+    `authkey`, since batches are unpickled.
+    """
+
+    def __init__(
+        self,
+        store: Store,
+        address: str | os.PathLike[str],
+        authkey: bytes,
+        writer: BatchWriter | None = None,
+    ):
+        self.store = store
+        self.address = str(address)
+        self.authkey = authkey
+        self.writer = writer or BatchWriter(store, block_timeout=None)
+        self.connections = 0
+        self.rejected = 0
+        self.dropped = 0
+        self._listener: Listener | None = None
+        self._thread: threading.Thread | None = None
+        self._conns: set[Connection] = set()
+
+    def start(self) -> "WriterServer":
+        Path(self.address).parent.mkdir(parents=True, exist_ok=True)
+        Path(self.address).unlink(missing_ok=True)  # stale socket from a crashed run
+        self.writer.start()
+        self._listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        self._thread = threading.Thread(
+            target=self._accept, name="wire-stripper-writer-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def _accept(self) -> None:
+        listener = self._listener
+        assert listener is not None
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, EOFError, OSError):
+                if self._listener is None:
+                    return  # closed
+                self.rejected += 1  # bad authkey or client gone mid-handshake
+                continue
+            self.connections += 1
+            self._conns.add(conn)
+            threading.Thread(
+                target=self._serve,
+                args=(conn,),
+                name="wire-stripper-writer-conn",
+                daemon=True,
+            ).start()
+
+    def _serve(self, conn: Connection) -> None:
+        with conn:
+            while True:
+                try:
+                    pending = conn.recv()
+                except (EOFError, OSError):
+                    self._conns.discard(conn)
+                    return
+                for kind, rows in pending.items():
+                    try:
+                        if not self.writer.submit_many(kind, rows):
+                            self.dropped += len(rows)
+                    except KeyError:
+                        self.writer.stats.failed += len(rows)
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        # Shut down (not close) accepted sockets: that wakes their receiving
+        # threads with EOF, and workers see the break and resend elsewhere.
+        for conn in list(self._conns):
+            try:
+                with socket.fromfd(conn.fileno(), socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._conns.clear()
+        self.writer.close()
+        Path(self.address).unlink(missing_ok=True)
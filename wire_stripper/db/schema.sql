@@ -72,7 +72,16 @@ CREATE TABLE IF NOT EXISTS event (
   bytes INTEGER,
   headers_json TEXT,
   cookies_json TEXT,
-  initiator_json TEXT
+  initiator_json TEXT,
+  header_set_id TEXT
+);
+
+-- Content-addressed request header sets; event.header_set_id points here and
+-- event.headers_json only keeps the per-request (volatile) headers.
+CREATE TABLE IF NOT EXISTS header_set (
+  header_set_id TEXT PRIMARY KEY,
+  headers_json TEXT NOT NULL,
+  first_seen DATETIME
 );
 
 CREATE TABLE IF NOT EXISTS list_entry (
@@ -101,18 +110,280 @@ CREATE TABLE IF NOT EXISTS decision (
   confidence REAL
 );
 
+-- Decisions aggregated per minute (PolicyEngine decision_mode="counters");
+-- NULL hostname/matched_rule are stored as ''.
+CREATE TABLE IF NOT EXISTS decision_counter (
+  bucket TEXT NOT NULL,
+  profile_id TEXT NOT NULL DEFAULT '',
+  hostname TEXT NOT NULL DEFAULT '',
+  effective_action TEXT NOT NULL DEFAULT '',
+  matched_rule TEXT NOT NULL DEFAULT '',
+  count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (bucket, profile_id, hostname, effective_action, matched_rule)
+);
+
+-- Cookies the live proxy stripped (sensors/mitm_addon.py). Kept apart from
+-- the legacy privacy-proxy `cookie_traffic` table, which the ETL imports as
+-- list evidence: feeding our own stripping back in would greylist every
+-- host a cookie-name rule touched.
+CREATE TABLE IF NOT EXISTS cookie_strip (
+  id INTEGER PRIMARY KEY,
+  ts DATETIME NOT NULL,
+  profile_id TEXT,
+  hostname TEXT,
+  cookie_name TEXT,
+  cookie_value TEXT,
+  dst_ip TEXT,
+  url TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_cookie_strip_ts ON cookie_strip(ts);
+
+-- Batches queued for peers (wire_stripper/federation/outbox.py): id is the
+-- batch content hash, payload_json its header, payload the compressed body.
+-- status: pending -> sent, or retry (attempts, next_attempt_at) -> failed.
 CREATE TABLE IF NOT EXISTS federation_outbox (
   id TEXT PRIMARY KEY,
   ts DATETIME,
   kind TEXT,
   payload_json TEXT,
   privacy_level TEXT,
-  status TEXT
+  status TEXT,
+  payload BLOB,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  next_attempt_at DATETIME,
+  last_error TEXT,
+  sent_at DATETIME
+);
+
+-- Last applied batch seq and state hash per peer origin/profile
+-- (federation/inbox.py).
+CREATE TABLE IF NOT EXISTS federation_peer (
+  origin TEXT NOT NULL,
+  profile_id TEXT NOT NULL,
+  state TEXT NOT NULL,
+  batches INTEGER NOT NULL DEFAULT 0,
+  updated_at DATETIME,
+  seq INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (origin, profile_id)
+);
+
+-- Bumped on every list_entry change so in-memory policy snapshots know when to reload.
+CREATE TABLE IF NOT EXISTS list_generation (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  generation INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO list_generation(id, generation) VALUES(1, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_list_entry_ins AFTER INSERT ON list_entry
+BEGIN
+  UPDATE list_generation SET generation = generation + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_list_entry_upd AFTER UPDATE ON list_entry
+BEGIN
+  UPDATE list_generation SET generation = generation + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_list_entry_del AFTER DELETE ON list_entry
+BEGIN
+  UPDATE list_generation SET generation = generation + 1 WHERE id = 1;
+END;
+
+-- Bumped when a prefix's origin ASN changes so in-memory ASN indexes reload.
+CREATE TABLE IF NOT EXISTS prefix_generation (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  generation INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO prefix_generation(id, generation) VALUES(1, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_prefix_ins AFTER INSERT ON prefix
+BEGIN
+  UPDATE prefix_generation SET generation = generation + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_prefix_upd AFTER UPDATE OF prefix, asn ON prefix
+WHEN NEW.asn IS NOT OLD.asn OR NEW.prefix IS NOT OLD.prefix
+BEGIN
+  UPDATE prefix_generation SET generation = generation + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_prefix_del AFTER DELETE ON prefix
+BEGIN
+  UPDATE prefix_generation SET generation = generation + 1 WHERE id = 1;
+END;
+
+-- Entity graph rollups (wire_stripper/enrich/entities.py). entity_closure
+-- holds every (ancestor, descendant) pair of the parent_entity_id forest,
+-- depth 0 being the entity itself; entity_root the top of each chain; and
+-- entity_attribution the flat domain/ip/asn/prefix -> entity/root mapping.
+-- Triggers queue changed entities and facts in entity_dirty so a refresh
+-- only recomputes what moved; entity_generation is bumped per refresh.
+CREATE TABLE IF NOT EXISTS entity_closure (
+  ancestor_id TEXT NOT NULL,
+  descendant_id TEXT NOT NULL,
+  depth INTEGER NOT NULL,
+  PRIMARY KEY (ancestor_id, descendant_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS entity_root (
+  entity_id TEXT PRIMARY KEY,
+  root_entity_id TEXT NOT NULL,
+  depth INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS entity_attribution (
+  target_type TEXT NOT NULL,
+  target_value TEXT NOT NULL,
+  entity_id TEXT NOT NULL,
+  root_entity_id TEXT NOT NULL,
+  PRIMARY KEY (target_type, target_value)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS entity_dirty (
+  kind TEXT NOT NULL,
+  key TEXT NOT NULL,
+  PRIMARY KEY (kind, key)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS entity_generation (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  generation INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO entity_generation(id, generation) VALUES(1, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_entity_ins AFTER INSERT ON entity
+BEGIN
+  INSERT OR IGNORE INTO entity_dirty(kind, key) VALUES('entity', NEW.entity_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_entity_upd AFTER UPDATE OF entity_id, parent_entity_id ON entity
+WHEN NEW.entity_id IS NOT OLD.entity_id OR NEW.parent_entity_id IS NOT OLD.parent_entity_id
+BEGIN
+  INSERT OR IGNORE INTO entity_dirty(kind, key) VALUES('entity', OLD.entity_id);
+  INSERT OR IGNORE INTO entity_dirty(kind, key) VALUES('entity', NEW.entity_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_entity_del AFTER DELETE ON entity
+BEGIN
+  INSERT OR IGNORE INTO entity_dirty(kind, key) VALUES('entity', OLD.entity_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_domain_entity_ins AFTER INSERT ON domain
+WHEN NEW.entity_id IS NOT NULL
+BEGIN
+  INSERT OR IGNORE INTO entity_dirty(kind, key) VALUES('domain', NEW.domain);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_domain_entity_upd AFTER UPDATE OF entity_id ON domain
+WHEN NEW.entity_id IS NOT OLD.entity_id
+BEGIN
+  INSERT OR IGNORE INTO entity_dirty(kind, key) VALUES('domain', NEW.domain);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_domain_entity_del AFTER DELETE ON domain
+WHEN OLD.entity_id IS NOT NULL
+BEGIN
+  INSERT OR IGNORE INTO entity_dirty(kind, key) VALUES('domain', OLD.domain);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ip_entity_ins AFTER INSERT ON ip
+WHEN NEW.entity_id IS NOT NULL
+BEGIN
+  INSERT OR IGNORE INTO entity_dirty(kind, key) VALUES('ip', NEW.ip);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ip_entity_upd AFTER UPDATE OF entity_id ON ip
+WHEN NEW.entity_id IS NOT OLD.entity_id
+BEGIN
+  INSERT OR IGNORE INTO entity_dirty(kind, key) VALUES('ip', NEW.ip);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ip_entity_del AFTER DELETE ON ip
+WHEN OLD.entity_id IS NOT NULL
+BEGIN
+  INSERT OR IGNORE INTO entity_dirty(kind, key) VALUES('ip', OLD.ip);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_asn_entity_ins AFTER INSERT ON asn
+WHEN NEW.entity_id IS NOT NULL
+BEGIN
+  INSERT OR IGNORE INTO entity_dirty(kind, key) VALUES('asn', NEW.asn);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_asn_entity_upd AFTER UPDATE OF entity_id ON asn
+WHEN NEW.entity_id IS NOT OLD.entity_id
+BEGIN
+  INSERT OR IGNORE INTO entity_dirty(kind, key) VALUES('asn', NEW.asn);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_asn_entity_del AFTER DELETE ON asn
+WHEN OLD.entity_id IS NOT NULL
+BEGIN
+  INSERT OR IGNORE INTO entity_dirty(kind, key) VALUES('asn', OLD.asn);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_prefix_entity_ins AFTER INSERT ON prefix
+WHEN NEW.entity_id IS NOT NULL
+BEGIN
+  INSERT OR IGNORE INTO entity_dirty(kind, key) VALUES('prefix', NEW.prefix);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_prefix_entity_upd AFTER UPDATE OF entity_id ON prefix
+WHEN NEW.entity_id IS NOT OLD.entity_id
+BEGIN
+  INSERT OR IGNORE INTO entity_dirty(kind, key) VALUES('prefix', NEW.prefix);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_prefix_entity_del AFTER DELETE ON prefix
+WHEN OLD.entity_id IS NOT NULL
+BEGIN
+  INSERT OR IGNORE INTO entity_dirty(kind, key) VALUES('prefix', OLD.prefix);
+END;
+
+-- Per-source ETL progress: legacy rows with rowid <= last_rowid have been imported.
+CREATE TABLE IF NOT EXISTS etl_watermark (
+  source TEXT NOT NULL,
+  profile_id TEXT NOT NULL,
+  last_rowid INTEGER NOT NULL DEFAULT 0,
+  last_ts DATETIME,
+  updated_at DATETIME,
+  PRIMARY KEY(source, profile_id)
+);
+
+-- Hourly aggregates of event/decision rows that were moved into sealed
+-- partition files (see wire_stripper/db/partitions.py). NULL keys are stored
+-- as '' so they stay part of the primary key.
+CREATE TABLE IF NOT EXISTS event_rollup_hourly (
+  hour TEXT NOT NULL,
+  profile_id TEXT NOT NULL DEFAULT '',
+  hostname TEXT NOT NULL DEFAULT '',
+  asn TEXT NOT NULL DEFAULT '',
+  events INTEGER NOT NULL DEFAULT 0,
+  bytes INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (hour, profile_id, hostname, asn)
+);
+
+CREATE TABLE IF NOT EXISTS decision_rollup_hourly (
+  hour TEXT NOT NULL,
+  profile_id TEXT NOT NULL DEFAULT '',
+  hostname TEXT NOT NULL DEFAULT '',
+  effective_action TEXT NOT NULL DEFAULT '',
+  decisions INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (hour, profile_id, hostname, effective_action)
 );
 
 CREATE INDEX IF NOT EXISTS idx_event_ts ON event(ts);
 CREATE INDEX IF NOT EXISTS idx_event_host ON event(hostname);
+CREATE INDEX IF NOT EXISTS idx_decision_ts ON decision(ts);
 CREATE INDEX IF NOT EXISTS idx_list_profile ON list_entry(profile_id);
+CREATE INDEX IF NOT EXISTS idx_entity_closure_desc ON entity_closure(descendant_id);
+CREATE INDEX IF NOT EXISTS idx_entity_attribution_entity ON entity_attribution(entity_id);
+CREATE INDEX IF NOT EXISTS idx_entity_attribution_root ON entity_attribution(root_entity_id);
+CREATE INDEX IF NOT EXISTS idx_federation_outbox_status ON federation_outbox(status, next_attempt_at);
 
 -- ------------------------------------------------------------------------------
 -- DMBT compatibility tables (kept as-is so the original scripts can be ported)
@@ -2,10 +2,138 @@ from __future__ import annotations
 
 import os
 import sqlite3
+import threading
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Iterable, Mapping
+from typing import Any, Iterable, Iterator, Mapping
+
+from wire_stripper.db.pool import PoolStats, ReadPool
+from wire_stripper.telemetry import metrics
+from wire_stripper.telemetry.metrics import REGISTRY, perf_ns
+
+
+EVENT_COLUMNS = (
+    "event_id",
+    "ts",
+    "sensor",
+    "profile_id",
+    "url",
+    "hostname",
+    "method",
+    "resource_type",
+    "src_ip",
+    "dst_ip",
+    "dst_port",
+    "proto",
+    "bytes",
+    "headers_json",
+    "cookies_json",
+    "initiator_json",
+    "header_set_id",
+)
+
+DECISION_COLUMNS = (
+    "decision_id",
+    "ts",
+    "profile_id",
+    "url",
+    "hostname",
+    "dst_ip",
+    "effective_action",
+    "matched_rule",
+    "explanation",
+    "confidence",
+)
+
+
+def _insert_sql(table: str, cols: tuple[str, ...]) -> str:
+    return f"INSERT INTO {table}({', '.join(cols)}) VALUES({','.join('?' for _ in cols)})"
+
+
+INSERT_EVENT_SQL = _insert_sql("event", EVENT_COLUMNS)
+_INSERT_EVENT_TIME = REGISTRY.histogram(
+    "wire_stripper_store_insert_event_seconds", "Store.insert_event latency (one commit)"
+)
+INSERT_DECISION_SQL = _insert_sql("decision", DECISION_COLUMNS)
+INSERT_DECISION_COUNTER_SQL = (
+    "INSERT INTO decision_counter(bucket, profile_id, hostname, effective_action, matched_rule, count) "
+    "VALUES(?,?,?,?,?,?) ON CONFLICT(bucket, profile_id, hostname, effective_action, matched_rule) "
+    "DO UPDATE SET count = count + excluded.count"
+)
+INSERT_HEADER_SET_SQL = (
+    "INSERT OR IGNORE INTO header_set(header_set_id, headers_json, first_seen) VALUES(?,?,?)"
+)
+INSERT_COOKIE_STRIP_SQL = (
+    "INSERT INTO cookie_strip(ts, profile_id, hostname, cookie_name, cookie_value, dst_ip, url) "
+    "VALUES(?,?,?,?,?,?,?)"
+)
+
+# Bump on every schema.sql change. schema.sql stays idempotent (IF NOT EXISTS);
+# anything it cannot express (ALTER TABLE, backfills) goes in MIGRATIONS under
+# the version it upgrades to.
+SCHEMA_VERSION = 10
+MIGRATIONS: Mapping[int, tuple[str, ...]] = {
+    3: ("ALTER TABLE event ADD COLUMN header_set_id TEXT",),
+    5: tuple(
+        f"ALTER TABLE federation_outbox ADD COLUMN {col}"
+        for col in (
+            "payload BLOB",
+            "attempts INTEGER NOT NULL DEFAULT 0",
+            "next_attempt_at DATETIME",
+            "last_error TEXT",
+            "sent_at DATETIME",
+        )
+    ),
+    7: (
+        # v5 shape, for databases upgraded from before v5 in one go.
+        "CREATE TABLE IF NOT EXISTS federation_peer (origin TEXT NOT NULL, "
+        "profile_id TEXT NOT NULL, state TEXT NOT NULL, batches INTEGER NOT NULL DEFAULT 0, "
+        "updated_at DATETIME, PRIMARY KEY (origin, profile_id))",
+        "ALTER TABLE federation_peer ADD COLUMN seq INTEGER NOT NULL DEFAULT 0",
+    ),
+    # schema.sql recreates it with a WHEN clause (IF NOT EXISTS would keep the old one).
+    10: ("DROP TRIGGER IF EXISTS trg_prefix_upd",),
+}
+
+
+@dataclass(frozen=True)
+class PerfProfile:
+    """SQLite tuning applied to every connection the Store opens."""
+
+    # Bytes of the db file to memory-map for reads (0 disables).
+    mmap_size: int = 256 * 1024 * 1024
+    # Page cache per connection; negative values are KiB (SQLite convention).
+    cache_size: int = -64 * 1024
+    # WAL pages before an automatic checkpoint.
+    wal_autocheckpoint: int = 1000
+    # Only takes effect when the database file is created.
+    page_size: int = 4096
+    synchronous: str = "NORMAL"
+    busy_timeout_ms: int = 5000
+    # Compiled statements kept per connection by the sqlite3 module.
+    cached_statements: int = 256
+
+    def connection_pragmas(self) -> tuple[str, ...]:
+        """Per-connection pragmas that are also valid on read-only connections."""
+        return (
+            f"PRAGMA mmap_size={int(self.mmap_size)}",
+            f"PRAGMA cache_size={int(self.cache_size)}",
+            f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}",
+            "PRAGMA temp_store=MEMORY",
+        )
+
+
+PERF_PROFILES: Mapping[str, PerfProfile] = {
+    "default": PerfProfile(),
+    # Large imports/loads: bigger cache, fewer checkpoints, no fsync per commit.
+    "bulk": PerfProfile(
+        cache_size=-256 * 1024, wal_autocheckpoint=10_000, synchronous="OFF"
+    ),
+    # Small devices: no mmap, modest cache.
+    "small": PerfProfile(mmap_size=0, cache_size=-8 * 1024, cached_statements=64),
+}
 
 
 @dataclass(frozen=True)
@@ -27,69 +155,158 @@ class Store:
         self,
         root: str | os.PathLike[str],
         db_name: str | None = None,
+        read_pool_size: int = 4,
+        perf: PerfProfile | str | None = None,
     ):
         # Allow hard override for legacy tools expecting a specific filename.
         db_name = (
             db_name or os.environ.get("WIRE_STRIPPER_DB_NAME") or "wire_stripper.sqlite"
         )
 
+        if perf is None or isinstance(perf, str):
+            perf = PERF_PROFILES[
+                perf or os.environ.get("WIRE_STRIPPER_PERF_PROFILE") or "default"
+            ]
+        self.perf = perf
+
         self.paths = StorePaths(root=Path(root), db_name=db_name)
         self.paths.root.mkdir(parents=True, exist_ok=True)
-        self._conn = sqlite3.connect(str(self.paths.db_path), check_same_thread=False)
+        db_path = self.paths.db_path
+        is_new = not db_path.exists() or db_path.stat().st_size == 0
+        self._conn = sqlite3.connect(
+            str(db_path),
+            check_same_thread=False,
+            cached_statements=perf.cached_statements,
+        )
         self._conn.row_factory = sqlite3.Row
+        self._configure(is_new)
+        # Serializes transactions on the shared connection (CLI, addon, BatchWriter thread).
+        self.lock = threading.RLock()
+        # Read-only connections for lookups/reports; `conn` stays the single writer.
+        self.readers = ReadPool(
+            db_path,
+            size=read_pool_size,
+            pragmas=perf.connection_pragmas(),
+            cached_statements=perf.cached_statements,
+        )
 
     @property
     def conn(self) -> sqlite3.Connection:
         return self._conn
 
-    def init_db(self) -> None:
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Check out a pooled read-only connection (sees committed data only)."""
+        with self.readers.connection() as conn:
+            yield conn
+
+    def pool_stats(self) -> PoolStats:
+        return self.readers.stats
+
+    def _configure(self, is_new: bool) -> None:
         # Concurrency + sanity defaults for a shared local SQLite backend.
+        perf = self.perf
         try:
-            self._conn.execute("PRAGMA journal_mode=WAL;")
-            self._conn.execute("PRAGMA synchronous=NORMAL;")
-            self._conn.execute("PRAGMA foreign_keys=ON;")
-            self._conn.execute("PRAGMA busy_timeout=5000;")
-            self._conn.execute("PRAGMA temp_store=MEMORY;")
-        except Exception:
+            if is_new:
+                # Must precede WAL mode and the first table.
+                self._conn.execute(f"PRAGMA page_size={int(perf.page_size)}")
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"PRAGMA synchronous={perf.synchronous}")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.execute(f"PRAGMA wal_autocheckpoint={int(perf.wal_autocheckpoint)}")
+            for pragma in perf.connection_pragmas():
+                self._conn.execute(pragma)
+        except sqlite3.Error:
             # Pragmas are best-effort; schema init should still proceed.
             pass
 
-        schema = self.paths.schema_path.read_text(encoding="utf-8")
-        self._conn.executescript(schema)
-        self._conn.commit()
+    def schema_version(self) -> int:
+        return int(self._conn.execute("PRAGMA user_version").fetchone()[0])
+
+    def init_db(self) -> bool:
+        """Create/upgrade the schema. Returns False if it was already current."""
+        version = self.schema_version()
+        if version == SCHEMA_VERSION:
+            return False
+        if version > SCHEMA_VERSION:
+            raise RuntimeError(
+                f"{self.paths.db_path} has schema v{version}, newer than this wire_stripper (v{SCHEMA_VERSION})"
+            )
+
+        with self.lock:
+            # Databases from before version tracking (0) have the v1 tables.
+            if version == 0 and self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='event'"
+            ).fetchone():
+                version = 1
+            if version:
+                with self.transaction() as conn:
+                    for v in range(version + 1, SCHEMA_VERSION + 1):
+                        for sql in MIGRATIONS.get(v, ()):
+                            conn.execute(sql)
+            schema = self.paths.schema_path.read_text(encoding="utf-8")
+            self._conn.executescript(schema)
+            self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self._conn.commit()
+        return True
 
     def upsert(self, sql: str, params: Iterable[Any]) -> None:
-        self._conn.execute(sql, tuple(params))
-        self._conn.commit()
+        with self.lock:
+            self._conn.execute(sql, tuple(params))
+            self._conn.commit()
+
+    @staticmethod
+    def event_params(row: Mapping[str, Any]) -> tuple[Any, ...]:
+        return tuple(row.get(c) for c in EVENT_COLUMNS)
 
     def insert_event(self, row: Mapping[str, Any]) -> None:
-        cols = [
-            "event_id",
-            "ts",
-            "sensor",
-            "profile_id",
-            "url",
-            "hostname",
-            "method",
-            "resource_type",
-            "src_ip",
-            "dst_ip",
-            "dst_port",
-            "proto",
-            "bytes",
-            "headers_json",
-            "cookies_json",
-            "initiator_json",
-        ]
-        values = [row.get(c) for c in cols]
-        self._conn.execute(
-            f"INSERT INTO event ({','.join(cols)}) VALUES ({','.join('?' for _ in cols)})",
-            values,
-        )
-        self._conn.commit()
+        t0 = perf_ns() if metrics.ENABLED else 0
+        self.upsert(INSERT_EVENT_SQL, self.event_params(row))
+        if t0:
+            _INSERT_EVENT_TIME.observe_ns(perf_ns() - t0)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Hold the write lock and commit (or roll back) everything done inside."""
+        with self.lock:
+            try:
+                yield self._conn
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def executemany(self, sql: str, rows: Iterable[Iterable[Any]]) -> int:
+        """Run `sql` for every row in one transaction. Returns rows changed."""
+        with self.lock:
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(sql, rows)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            return self._conn.total_changes - before
+
+    def list_generation(self) -> int:
+        """Monotonic counter bumped by triggers on every `list_entry` change."""
+        with self.reader() as conn:
+            row = conn.execute(
+                "SELECT generation FROM list_generation WHERE id=1"
+            ).fetchone()
+        return int(row[0]) if row else 0
+
+    def prefix_generation(self) -> int:
+        """Monotonic counter bumped by triggers when `prefix` -> ASN changes."""
+        with self.reader() as conn:
+            row = conn.execute(
+                "SELECT generation FROM prefix_generation WHERE id=1"
+            ).fetchone()
+        return int(row[0]) if row else 0
 
     def now(self) -> str:
         return datetime.utcnow().isoformat(timespec="seconds")
 
     def close(self) -> None:
+        self.readers.close()
         self._conn.close()
@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Mapping, NamedTuple
+
+from wire_stripper.db.store import (
+    INSERT_COOKIE_STRIP_SQL,
+    INSERT_DECISION_COUNTER_SQL,
+    INSERT_DECISION_SQL,
+    INSERT_EVENT_SQL,
+    INSERT_HEADER_SET_SQL,
+    Store,
+)
+from wire_stripper.telemetry.metrics import REGISTRY, perf_ns
+
+DEFAULT_STATEMENTS: Mapping[str, str] = {
+    "header_set": INSERT_HEADER_SET_SQL,
+    "event": INSERT_EVENT_SQL,
+    "decision": INSERT_DECISION_SQL,
+    "decision_counter": INSERT_DECISION_COUNTER_SQL,
+    "cookie_strip": INSERT_COOKIE_STRIP_SQL,
+}
+
+_STOP = object()
+
+# Result codes that mean "try again later" (another connection holds the
+# lock past busy_timeout, disk full, transient I/O): the batch stays pending
+# and is retried with backoff. Anything else is a problem with the rows
+# themselves and is isolated row by row.
+_TRANSIENT = frozenset(
+    {sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED, sqlite3.SQLITE_FULL, sqlite3.SQLITE_IOERR}
+)
+
+
+def _transient(exc: sqlite3.Error) -> bool:
+    code = getattr(exc, "sqlite_errorcode", None)
+    if code is None:
+        return isinstance(exc, sqlite3.OperationalError) and "locked" in str(exc)
+    return code & 0xFF in _TRANSIENT
+
+_FLUSH_TIME = REGISTRY.histogram(
+    "wire_stripper_writer_flush_seconds", "BatchWriter batch write latency (one transaction)"
+)
+ROW_COUNTERS = {
+    result: REGISTRY.counter(
+        "wire_stripper_writer_rows_total", "BatchWriter rows by outcome", result=result
+    )
+    for result in ("written", "failed", "dropped", "forwarded")
+}
+_RETRIES = REGISTRY.counter(
+    "wire_stripper_writer_retries_total", "BatchWriter batches retried after a busy/locked error"
+)
+
+
+class _Rows(NamedTuple):
+    kind: str
+    rows: list[tuple[Any, ...]]
+
+
+@dataclass
+class WriterStats:
+    submitted: int = 0
+    written: int = 0
+    dropped: int = 0
+    failed: int = 0
+    flushes: int = 0
+    retries: int = 0
+    max_depth: int = 0
+
+
+class BatchWriter:
+    """Background writer that keeps SQLite off the caller's request path.
+
+    `submit()` enqueues a parameter tuple for a named statement and returns
+    immediately. A daemon thread drains the bounded queue and writes each
+    batch with `executemany` in a single transaction, flushing every
+    `batch_size` rows or `flush_interval` seconds, whichever comes first.
+
+    When the queue is full the row is dropped (and counted) unless
+    `block_timeout` > 0, in which case the caller waits up to that long, or
+    None, in which case it waits for room however long that takes.
+
+    A batch that hits a busy/locked database stays pending and is retried
+    with backoff (up to `max_backoff` seconds apart); the thread stops
+    draining meanwhile, so the queue fills and `submit` applies the policy
+    above. A row the database rejects (constraint, bad parameters) fails on
+    its own; the rest of the batch is written.
+    """
+
+    def __init__(
+        self,
+        store: Store,
+        statements: Mapping[str, str] | None = None,
+        max_queue: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 0.05,
+        block_timeout: float | None = 0.0,
+        max_backoff: float = 1.0,
+    ):
+        self.store = store
+        self.statements = dict(DEFAULT_STATEMENTS if statements is None else statements)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.max_backoff = max_backoff
+        self.stats = WriterStats()
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+
+    def register(self, kind: str, sql: str) -> None:
+        self.statements[kind] = sql
+
+    def start(self) -> "BatchWriter":
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="wire-stripper-writer", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def submit(self, kind: str, params: tuple[Any, ...]) -> bool:
+        """Queue one row for `kind`. Returns False if it was dropped."""
+        if kind not in self.statements:
+            raise KeyError(f"unknown statement kind: {kind}")
+        try:
+            self._put((kind, params))
+        except queue.Full:
+            self.stats.dropped += 1
+            ROW_COUNTERS["dropped"].inc()
+            return False
+        self.stats.submitted += 1
+        return True
+
+    def submit_many(self, kind: str, rows: list[tuple[Any, ...]]) -> bool:
+        """Queue several rows for `kind` as one queue item (one lock round-trip)."""
+        if kind not in self.statements:
+            raise KeyError(f"unknown statement kind: {kind}")
+        try:
+            self._put(_Rows(kind, rows))
+        except queue.Full:
+            self.stats.dropped += len(rows)
+            ROW_COUNTERS["dropped"].inc(len(rows))
+            return False
+        self.stats.submitted += len(rows)
+        return True
+
+    def _put(self, item: Any) -> None:
+        if self.block_timeout is None:
+            self._queue.put(item)
+        elif self.block_timeout > 0:
+            self._queue.put(item, timeout=self.block_timeout)
+        else:
+            self._queue.put_nowait(item)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until everything submitted so far has been written."""
+        if self._thread is None:
+            return self._queue.empty()
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float | None = 10.0) -> bool:
+        """Flush remaining rows and stop the writer thread.
+
+        Returns False if that did not finish within `timeout` (the database
+        stayed locked); the thread keeps retrying and `close()` may be
+        called again.
+        """
+        if self._thread is None:
+            return True
+        if not self._stopping:
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                return False
+            self._stopping = True
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            return False
+        self._thread = None
+        self._stopping = False
+        return True
+
+    def _commit(self, pending: dict[str, list[tuple[Any, ...]]]) -> None:
+        delay = min(0.01, self.max_backoff)
+        while not self._write(pending):
+            self.stats.retries += 1
+            _RETRIES.inc()
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_backoff)
+
+    def _write(self, pending: dict[str, list[tuple[Any, ...]]]) -> bool:
+        """Write `pending` in one transaction; False if the database was busy.
+
+        On False nothing was written and the caller retries the same rows.
+        """
+        if not pending:
+            return True
+        t0 = perf_ns()
+        written = failed = 0
+        with self.store.lock:
+            conn = self.store.conn
+            try:
+                if not conn.in_transaction:
+                    conn.execute("BEGIN")
+                for kind, batch in pending.items():
+                    ok, bad = self._write_kind(conn, self.statements[kind], batch)
+                    written += ok
+                    failed += bad
+                conn.commit()
+            except sqlite3.Error as exc:
+                conn.rollback()
+                if _transient(exc):
+                    return False
+                written, failed = 0, sum(len(v) for v in pending.values())
+        self.stats.written += written
+        self.stats.failed += failed
+        ROW_COUNTERS["written"].inc(written)
+        ROW_COUNTERS["failed"].inc(failed)
+        _FLUSH_TIME.observe_ns(perf_ns() - t0)
+        self.stats.flushes += 1
+        return True
+
+    @staticmethod
+    def _write_kind(
+        conn: sqlite3.Connection, sql: str, batch: list[tuple[Any, ...]]
+    ) -> tuple[int, int]:
+        # One executemany per kind; if the database rejects a row, undo the
+        # kind and redo it row by row so only the offending rows are lost.
+        # Transient errors propagate and the whole transaction is retried.
+        conn.execute("SAVEPOINT writer_kind")
+        try:
+            conn.executemany(sql, batch)
+            conn.execute("RELEASE writer_kind")
+            return len(batch), 0
+        except sqlite3.Error as exc:
+            if _transient(exc):
+                raise
+            conn.execute("ROLLBACK TO writer_kind")
+            conn.execute("RELEASE writer_kind")
+        failed = 0
+        for params in batch:
+            conn.execute("SAVEPOINT writer_row")
+            try:
+                conn.execute(sql, params)
+            except sqlite3.Error as exc:
+                if _transient(exc):
+                    raise
+                conn.execute("ROLLBACK TO writer_row")
+                failed += 1
+            conn.execute("RELEASE writer_row")
+        return len(batch) - failed, failed
+
+    def _run(self) -> None:
+        pending: dict[str, list[tuple[Any, ...]]] = {}
+        count = 0
+        deadline: float | None = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            depth = self._queue.qsize()
+            if depth > self.stats.max_depth:
+                self.stats.max_depth = depth
+
+            if item is _STOP:
+                self._commit(pending)
+                return
+            if isinstance(item, threading.Event):
+                self._commit(pending)
+                pending, count, deadline = {}, 0, None
+                item.set()
+                continue
+            if item is not None:
+                if isinstance(item, _Rows):
+                    pending.setdefault(item.kind, []).extend(item.rows)
+                    count += len(item.rows)
+                else:
+                    kind, params = item
+                    pending.setdefault(kind, []).append(params)
+                    count += 1
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if count >= self.batch_size or (
+                deadline is not None and time.monotonic() >= deadline
+            ):
+                self._commit(pending)
+                pending, count, deadline = {}, 0, None
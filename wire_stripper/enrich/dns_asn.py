@@ -2,13 +2,27 @@ from __future__ import annotations
 
 import ipaddress
 import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Mapping
+
+from wire_stripper.db.store import Store
+from wire_stripper.enrich.lpm import PrefixIndex
 
 
 @dataclass(frozen=True)
 class ResolvedIp:
     ip: str
     version: int
+    # Record TTL in seconds when the resolver knows it (getaddrinfo does not).
+    ttl: int | None = None
+
+
+Resolver = Callable[[str], list[ResolvedIp]]
 
 
 def resolve_domain(domain: str) -> list[ResolvedIp]:
@@ -39,3 +53,187 @@ def is_ip(value: str) -> bool:
         return True
     except Exception:
         return False
+
+
+def asn_for_ip(index: PrefixIndex[str], ip: str) -> str | None:
+    """Map an IP to its origin ASN via the local prefix index (no whois/network)."""
+    return index.get(ip)
+
+
+class StubResolver:
+    """Offline resolver backed by a fixed {domain: [ip, ...]} mapping."""
+
+    def __init__(self, answers: Mapping[str, Iterable[str]], ttl: int | None = None):
+        self.answers = {d: list(ips) for d, ips in answers.items()}
+        self.ttl = ttl
+        self.calls = 0
+
+    def __call__(self, domain: str) -> list[ResolvedIp]:
+        self.calls += 1
+        return [
+            ResolvedIp(ip=ip, version=6 if ":" in ip else 4, ttl=self.ttl)
+            for ip in self.answers.get(domain, [])
+        ]
+
+
+class DnsCache:
+    """Thread-safe LRU of domain -> answers with per-entry expiry.
+
+    Empty answers are cached too (negative caching) for `negative_ttl`
+    seconds, so dead or blocked names are not retried on every pass.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 100_000,
+        default_ttl: int = 300,
+        min_ttl: int = 30,
+        max_ttl: int = 86_400,
+        negative_ttl: int = 60,
+    ):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, list[ResolvedIp]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def ttl_for(self, ips: list[ResolvedIp]) -> int:
+        if not ips:
+            return self.negative_ttl
+        ttls = [ip.ttl for ip in ips if ip.ttl is not None]
+        ttl = min(ttls) if ttls else self.default_ttl
+        return max(self.min_ttl, min(self.max_ttl, ttl))
+
+    def get(self, domain: str) -> list[ResolvedIp] | None:
+        """Cached answers (possibly []), or None on a miss/expiry."""
+        with self._lock:
+            entry = self._entries.get(domain)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[domain]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(domain)
+            self.hits += 1
+            return entry[1]
+
+    def put(
+        self, domain: str, ips: list[ResolvedIp], expires_at: float | None = None
+    ) -> None:
+        if expires_at is None:
+            expires_at = time.time() + self.ttl_for(ips)
+        with self._lock:
+            self._entries[domain] = (expires_at, ips)
+            self._entries.move_to_end(domain)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def load_ip_map(self, store: Store, max_age: int | None = None) -> int:
+        """Warm the cache from previously persisted `ip_map` rows (source='dns')."""
+        max_age = self.default_ttl if max_age is None else max_age
+        cutoff = (datetime.utcnow() - timedelta(seconds=max_age)).isoformat(
+            timespec="seconds"
+        )
+        grouped: dict[str, list[ResolvedIp]] = {}
+        oldest: dict[str, str] = {}
+        with store.reader() as conn:
+            rows = conn.execute(
+                "SELECT domain, ip, ip_version, seen_at FROM ip_map WHERE source='dns' AND seen_at >= ?",
+                (cutoff,),
+            ).fetchall()
+        for domain, ip, version, seen_at in rows:
+            grouped.setdefault(domain, []).append(
+                ResolvedIp(ip=ip, version=version or (6 if ":" in ip else 4))
+            )
+            if domain not in oldest or seen_at < oldest[domain]:
+                oldest[domain] = seen_at
+
+        now_wall, now_utc = time.time(), datetime.utcnow()
+        for domain, ips in grouped.items():
+            age = (now_utc - datetime.fromisoformat(oldest[domain])).total_seconds()
+            ips.sort(key=lambda x: (x.version, x.ip))
+            self.put(domain, ips, now_wall + max_age - age)
+        return len(grouped)
+
+
+default_cache = DnsCache()
+
+
+def persist_resolutions(
+    store: Store,
+    results: Mapping[str, list[ResolvedIp]],
+    asn_index: PrefixIndex[str] | None = None,
+) -> int:
+    """Write answers into `ip_map` (and the canonical `ip` table) in one transaction."""
+    now = store.now()
+    rows = []
+    for domain, ips in results.items():
+        for r in ips:
+            asn = asn_index.get(r.ip) if asn_index is not None else None
+            rows.append((domain, r.ip, r.version, asn, None, "dns", now))
+    if not rows:
+        return 0
+    with store.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO ip_map(domain, ip, ip_version, asn, asn_name, source, seen_at) VALUES(?,?,?,?,?,?,?) "
+            "ON CONFLICT(domain, ip) DO UPDATE SET asn=COALESCE(excluded.asn, ip_map.asn), "
+            "source=excluded.source, seen_at=excluded.seen_at",
+            rows,
+        )
+        conn.executemany(
+            "INSERT INTO ip(ip, ip_version, asn, first_seen, last_seen) VALUES(?,?,?,?,?) "
+            "ON CONFLICT(ip) DO UPDATE SET asn=COALESCE(excluded.asn, ip.asn), last_seen=excluded.last_seen",
+            [(r[1], r[2], r[3], now, now) for r in rows],
+        )
+    return len(rows)
+
+
+def resolve_many(
+    domains: Iterable[str],
+    resolver: Resolver = resolve_domain,
+    max_workers: int = 32,
+    cache: DnsCache | None = None,
+    store: Store | None = None,
+    asn_index: PrefixIndex[str] | None = None,
+) -> dict[str, list[ResolvedIp]]:
+    """Resolve many domains concurrently, answering repeats from the cache.
+
+    At most `max_workers` lookups are in flight. Fresh answers are cached
+    (TTL-aware, negative-cached when empty) and, when `store` is given,
+    persisted to `ip_map`/`ip` with ASNs from `asn_index`.
+    """
+    cache = default_cache if cache is None else cache
+    results: dict[str, list[ResolvedIp]] = {}
+    misses: list[str] = []
+    for domain in dict.fromkeys(d for d in domains if d):
+        cached = cache.get(domain)
+        if cached is None:
+            misses.append(domain)
+        else:
+            results[domain] = cached
+
+    def lookup(domain: str) -> list[ResolvedIp]:
+        try:
+            return resolver(domain)
+        except Exception:
+            return []
+
+    fresh: dict[str, list[ResolvedIp]] = {}
+    if misses:
+        workers = max(1, min(max_workers, len(misses)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for domain, ips in zip(misses, pool.map(lookup, misses)):
+                cache.put(domain, ips)
+                fresh[domain] = ips
+        results.update(fresh)
+
+    if store is not None and fresh:
+        persist_resolutions(store, fresh, asn_index)
+    return results
@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import sqlite3
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+
+from wire_stripper.db.store import Store
+from wire_stripper.enrich.lpm import PrefixIndex, normalize_asn
+from wire_stripper.policy.snapshot import normalize_host
+
+# Entity graph rollups. `entity.parent_entity_id` forms a forest (subsidiary
+# -> parent -> ... -> root company); facts (domain/ip/asn/prefix) point at
+# any node of it. refresh_entity_graph() materializes the closure, the root
+# of every entity and a flat fact -> (entity, root) mapping, so neither the
+# policy engine nor reports ever need recursive SQL. Schema triggers queue
+# changed entities/facts in `entity_dirty`; a refresh recomputes only the
+# subtrees under changed entities and the queued facts, and bumps
+# `entity_generation` so in-memory EntityIndex copies know to reload.
+
+# Fact kind -> (table, key column); also the entity_attribution.target_type.
+FACT_TABLES: Mapping[str, tuple[str, str]] = {
+    "domain": ("domain", "domain"),
+    "ip": ("ip", "ip"),
+    "asn": ("asn", "asn"),
+    "prefix": ("prefix", "prefix"),
+}
+
+# Deeper chains are cut (and cycles broken) at this many ancestors.
+MAX_DEPTH = 64
+
+
+def entity_generation(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT generation FROM entity_generation WHERE id=1").fetchone()
+    return int(row[0]) if row else 0
+
+
+def _chain(entity_id: str, parents: Mapping[str, str | None]) -> list[str]:
+    """entity_id, its parent, ..., its root (cycles and missing parents end it)."""
+    chain = [entity_id]
+    seen = {entity_id}
+    parent = parents.get(entity_id)
+    while parent is not None and parent not in seen and len(chain) <= MAX_DEPTH:
+        chain.append(parent)
+        seen.add(parent)
+        if parent not in parents:
+            break  # dangling parent id: treat it as the root
+        parent = parents[parent]
+    return chain
+
+
+def _closure_rows(
+    entity_ids: Iterable[str], parents: Mapping[str, str | None]
+) -> tuple[list[tuple[str, str, int]], list[tuple[str, str, int]]]:
+    closure: list[tuple[str, str, int]] = []
+    roots: list[tuple[str, str, int]] = []
+    for entity_id in entity_ids:
+        chain = _chain(entity_id, parents)
+        closure.extend((ancestor, entity_id, depth) for depth, ancestor in enumerate(chain))
+        roots.append((entity_id, chain[-1], len(chain) - 1))
+    return closure, roots
+
+
+def _attribute_sql(kind: str, where: str) -> str:
+    table, key = FACT_TABLES[kind]
+    return (
+        "INSERT OR REPLACE INTO entity_attribution(target_type, target_value, entity_id, root_entity_id) "
+        f"SELECT '{kind}', f.{key}, f.entity_id, coalesce(r.root_entity_id, f.entity_id) "
+        f"FROM {table} f LEFT JOIN entity_root r ON r.entity_id = f.entity_id "
+        f"WHERE f.entity_id IS NOT NULL AND f.{key} IS NOT NULL{where}"
+    )
+
+
+@dataclass(frozen=True)
+class EntityGraphStats:
+    full: bool
+    entities: int  # entities whose closure/root was recomputed
+    facts: int  # attribution rows rewritten or dropped
+    generation: int
+
+
+def refresh_entity_graph(store: Store, full: bool = False) -> EntityGraphStats:
+    """Bring entity_closure/entity_root/entity_attribution up to date.
+
+    The first run (generation 0) and `full=True` rebuild everything with
+    set-based SQL; afterwards only queued changes are applied. Returns
+    without writing when nothing is queued.
+    """
+    with store.transaction() as conn:
+        generation = entity_generation(conn)
+        full = full or generation == 0
+        # Taking the queue is the first write, so the transaction holds the
+        # write lock before anything is read: rows queued meanwhile by other
+        # connections wait for the next refresh instead of being lost.
+        dirty = conn.execute("DELETE FROM entity_dirty RETURNING kind, key").fetchall()
+        if not dirty and not full:
+            return EntityGraphStats(False, 0, 0, generation)
+
+        parents: dict[str, str | None] = dict(
+            conn.execute("SELECT entity_id, parent_entity_id FROM entity")
+        )
+        if full:
+            closure, roots = _closure_rows(parents, parents)
+            conn.execute("DELETE FROM entity_closure")
+            conn.execute("DELETE FROM entity_root")
+            conn.executemany("INSERT INTO entity_closure VALUES(?,?,?)", closure)
+            conn.executemany("INSERT INTO entity_root VALUES(?,?,?)", roots)
+            conn.execute("DELETE FROM entity_attribution")
+            for kind in FACT_TABLES:
+                conn.execute(_attribute_sql(kind, ""))
+            entities = len(parents)
+            facts = conn.execute("SELECT count(*) FROM entity_attribution").fetchone()[0]
+        else:
+            entities, facts = _apply_dirty(conn, dirty, parents)
+
+        conn.execute("UPDATE entity_generation SET generation = generation + 1 WHERE id = 1")
+        return EntityGraphStats(full, entities, facts, generation + 1)
+
+
+def _apply_dirty(
+    conn: sqlite3.Connection,
+    dirty: list[tuple[str, str]],
+    parents: Mapping[str, str | None],
+) -> tuple[int, int]:
+    keys: dict[str, list[str]] = defaultdict(list)
+    for kind, key in dirty:
+        keys[kind].append(key)
+
+    # A changed entity moves its whole subtree: every descendant's chain and
+    # root go through it.
+    affected: set[str] = set()
+    if keys.get("entity"):
+        children: dict[str, list[str]] = defaultdict(list)
+        for entity_id, parent in parents.items():
+            if parent is not None:
+                children[parent].append(entity_id)
+        stack = list(keys["entity"])
+        while stack:
+            entity_id = stack.pop()
+            if entity_id not in affected:
+                affected.add(entity_id)
+                stack.extend(children.get(entity_id, ()))
+        gone = [(e,) for e in affected]
+        conn.executemany("DELETE FROM entity_closure WHERE descendant_id=?", gone)
+        conn.executemany("DELETE FROM entity_root WHERE entity_id=?", gone)
+        closure, roots = _closure_rows((e for e in affected if e in parents), parents)
+        conn.executemany("INSERT INTO entity_closure VALUES(?,?,?)", closure)
+        conn.executemany("INSERT INTO entity_root VALUES(?,?,?)", roots)
+        root_of = {entity_id: root for entity_id, root, _ in roots}
+        conn.executemany(
+            "UPDATE entity_attribution SET root_entity_id=? WHERE entity_id=?",
+            [(root_of.get(e, e), e) for e in affected],
+        )
+
+    facts = 0
+    for kind in FACT_TABLES:
+        values = keys.get(kind)
+        if not values:
+            continue
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS entity_fact_stage(key TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM entity_fact_stage")
+        conn.executemany(
+            "INSERT OR IGNORE INTO entity_fact_stage(key) VALUES(?)", ((v,) for v in values)
+        )
+        conn.execute(
+            "DELETE FROM entity_attribution WHERE target_type=? "
+            "AND target_value IN (SELECT key FROM entity_fact_stage)",
+            (kind,),
+        )
+        _, key = FACT_TABLES[kind]
+        conn.execute(_attribute_sql(kind, f" AND f.{key} IN (SELECT key FROM entity_fact_stage)"))
+        facts += len(values)
+    return len(affected), facts
+
+
+class EntityIndex:
+    """In-memory fact -> entity lookup plus each entity's ancestor chain.
+
+    Loaded from the materialized tables (one scan each, no recursion).
+    Hostnames match their own entry or the closest listed parent domain, IPs
+    their own entry, then the longest covering prefix, then the ASN.
+    """
+
+    def __init__(self, generation: int = 0):
+        self.generation = generation
+        self.domains: dict[str, str] = {}
+        self.ips: dict[str, str] = {}
+        self.asns: dict[str, str] = {}
+        self.prefixes: PrefixIndex[str] = PrefixIndex()
+        # entity_id -> (entity_id, parent, ..., root)
+        self.chains: dict[str, tuple[str, ...]] = {}
+        self.names: dict[str, str] = {}
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> "EntityIndex":
+        index = cls(entity_generation(conn))
+        for target_type, value, entity_id in conn.execute(
+            "SELECT target_type, target_value, entity_id FROM entity_attribution"
+        ):
+            if target_type == "prefix":
+                try:
+                    index.prefixes.insert(value, entity_id)
+                except ValueError:
+                    pass
+            elif target_type == "domain":
+                index.domains[normalize_host(value)] = entity_id
+            elif target_type == "asn":
+                index.asns[normalize_asn(value) or value] = entity_id
+            elif target_type == "ip":
+                index.ips[value] = entity_id
+
+        chains: dict[str, list[tuple[int, str]]] = defaultdict(list)
+        for ancestor, descendant, depth in conn.execute(
+            "SELECT ancestor_id, descendant_id, depth FROM entity_closure"
+        ):
+            chains[descendant].append((depth, ancestor))
+        index.chains = {e: tuple(a for _, a in sorted(c)) for e, c in chains.items()}
+        index.names = {
+            entity_id: name
+            for entity_id, name in conn.execute("SELECT entity_id, name FROM entity")
+        }
+        return index
+
+    def __len__(self) -> int:
+        return len(self.domains) + len(self.ips) + len(self.asns) + len(self.prefixes)
+
+    @property
+    def has_asns(self) -> bool:
+        return bool(self.asns)
+
+    def entity_for(
+        self, hostname: str | None, dst_ip: str | None = None, asn: str | None = None
+    ) -> str | None:
+        """The most specific entity a flow is attributed to, if any."""
+        if hostname and self.domains:
+            name = normalize_host(hostname)
+            while name:
+                hit = self.domains.get(name)
+                if hit is not None:
+                    return hit
+                dot = name.find(".")
+                if dot < 0:
+                    break
+                name = name[dot + 1 :]
+        if dst_ip:
+            hit = self.ips.get(dst_ip)
+            if hit is None and len(self.prefixes):
+                hit = self.prefixes.get(dst_ip)
+            if hit is not None:
+                return hit
+        if asn:
+            return self.asns.get(normalize_asn(asn) or asn)
+        return None
+
+    def chain(self, entity_id: str) -> tuple[str, ...]:
+        """entity_id and its ancestors, nearest first (just itself if unknown)."""
+        return self.chains.get(entity_id) or (entity_id,)
+
+    def root(self, entity_id: str) -> str:
+        return self.chain(entity_id)[-1]
+
+    def attribute(
+        self, hostname: str | None, dst_ip: str | None = None, asn: str | None = None
+    ) -> str | None:
+        """Root entity ("which company") of a flow, if attributed."""
+        entity_id = self.entity_for(hostname, dst_ip, asn)
+        return self.root(entity_id) if entity_id is not None else None
+
+    def name(self, entity_id: str | None) -> str | None:
+        if entity_id is None:
+            return None
+        return self.names.get(entity_id, entity_id)
+
+
+def load_entity_index(store: Store) -> EntityIndex:
+    with store.reader() as conn:
+        return EntityIndex.load(conn)
+
+
+@dataclass(frozen=True)
+class EntityUsage:
+    root_entity_id: str
+    name: str
+    decisions: int
+    blocked: int
+    hostnames: int
+
+
+def entity_report(
+    store: Store,
+    since: str | None = None,
+    profile_id: str | None = None,
+    limit: int = 20,
+    index: EntityIndex | None = None,
+) -> list[EntityUsage]:
+    """Decisions per root entity, most decisions first.
+
+    Counts both `decision` rows (decision_mode="rows") and `decision_counter`
+    buckets ("counters"); each decision is recorded in exactly one of them.
+    Hostnames are attributed in memory (subdomains of a listed domain
+    included), so this is one grouped scan per table.
+    """
+    index = index or load_entity_index(store)
+    parts = []
+    params: list[str] = []
+    for table, count, ts in (
+        ("decision", "count(*)", "ts"),
+        ("decision_counter", "sum(count)", "bucket"),
+    ):
+        sql = (
+            f"SELECT hostname, effective_action, {count} FROM {table} "
+            "WHERE hostname IS NOT NULL AND hostname != ''"
+        )
+        if since:
+            sql += f" AND {ts} >= ?"
+            params.append(since)
+        if profile_id:
+            sql += " AND profile_id = ?"
+            params.append(profile_id)
+        parts.append(sql + " GROUP BY hostname, effective_action")
+    sql = " UNION ALL ".join(parts)
+
+    totals: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+    hosts: dict[str, set[str]] = defaultdict(set)
+    with store.reader() as conn:
+        for hostname, action, n in conn.execute(sql, params):
+            root = index.attribute(hostname)
+            if root is None:
+                continue
+            t = totals[root]
+            t[0] += n
+            if action == "block":
+                t[1] += n
+            hosts[root].add(hostname)
+    ranked = sorted(totals.items(), key=lambda kv: kv[1][0], reverse=True)[:limit]
+    return [
+        EntityUsage(root, index.name(root) or root, n, blocked, len(hosts[root]))
+        for root, (n, blocked) in ranked
+    ]
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from functools import lru_cache
+
+from wire_stripper.db.store import Store
+
+try:
+    from publicsuffix2 import PublicSuffixList  # type: ignore
+except Exception:  # pragma: no cover
+    PublicSuffixList = None  # type: ignore
+
+
+@lru_cache(maxsize=1)
+def _psl():
+    return PublicSuffixList() if PublicSuffixList is not None else None
+
+
+@lru_cache(maxsize=65536)
+def etld1(domain: str | None) -> str | None:
+    """Registrable domain (eTLD+1) for `domain`, e.g. stats.g.doubleclick.net -> doubleclick.net.
+
+    Uses the Public Suffix List via publicsuffix2; without it, falls back to the
+    last two labels.
+    """
+    if not domain:
+        return None
+    name = domain.strip().lower().rstrip(".")
+    if not name or name.replace(".", "").isdigit() or ":" in name:
+        return None
+    psl = _psl()
+    if psl is not None:
+        return psl.get_sld(name, strict=True)
+    labels = name.split(".")
+    return ".".join(labels[-2:]) if len(labels) >= 2 else None
+
+
+def fill_domain_etld1(store: Store, batch_size: int = 5000) -> int:
+    """Populate `domain.etld1` wherever it is still NULL. Returns rows updated."""
+    updated = 0
+    last = ""
+    while True:
+        names = [
+            r[0]
+            for r in store.conn.execute(
+                "SELECT domain FROM domain WHERE etld1 IS NULL AND domain > ? ORDER BY domain LIMIT ?",
+                (last, batch_size),
+            )
+        ]
+        if not names:
+            return updated
+        last = names[-1]
+        rows = [(etld1(n), n) for n in names]
+        store.conn.executemany(
+            "UPDATE domain SET etld1=? WHERE domain=?",
+            [r for r in rows if r[0] is not None],
+        )
+        store.conn.commit()
+        updated += sum(1 for r in rows if r[0] is not None)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import ipaddress
+import socket
+import sqlite3
+from typing import Generic, Iterator, TypeVar
+
+V = TypeVar("V")
+
+_FAMILIES = {4: (socket.AF_INET, 32), 6: (socket.AF_INET6, 128)}
+
+
+def ip_to_int(ip: str) -> tuple[int, int] | None:
+    """Parse an IP literal into (version, integer) without building ipaddress objects."""
+    try:
+        if ":" in ip:
+            return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), "big")
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+    except (OSError, TypeError, ValueError):
+        return None
+
+
+def normalize_asn(asn: str | int | None) -> str | None:
+    if asn is None:
+        return None
+    s = str(asn).strip().upper()
+    if s.startswith("AS"):
+        s = s[2:]
+    return s or None
+
+
+class PrefixIndex(Generic[V]):
+    """Longest-prefix-match index over IPv4/IPv6 CIDRs.
+
+    Each address family keeps one hash table per populated prefix length,
+    keyed by the network bits. A lookup probes the populated lengths from most
+    to least specific, so it is bounded by 32 (v4) / 128 (v6) dict hits and in
+    practice touches only the handful of lengths real tables use.
+    """
+
+    def __init__(self) -> None:
+        # version -> {length: {network_bits: (prefix, value)}}
+        self._tables: dict[int, dict[int, dict[int, tuple[str, V]]]] = {4: {}, 6: {}}
+        # version -> populated lengths, most specific first
+        self._lengths: dict[int, list[int]] = {4: [], 6: []}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _parse(prefix: str) -> tuple[int, int, int, str]:
+        net = ipaddress.ip_network(prefix.strip(), strict=False)
+        bits = _FAMILIES[net.version][1]
+        length = net.prefixlen
+        return net.version, length, int(net.network_address) >> (bits - length), str(net)
+
+    def insert(self, prefix: str, value: V) -> None:
+        version, length, key, canonical = self._parse(prefix)
+        tables = self._tables[version]
+        table = tables.get(length)
+        if table is None:
+            table = tables[length] = {}
+            self._lengths[version] = sorted(tables, reverse=True)
+        if key not in table:
+            self._size += 1
+        table[key] = (canonical, value)
+
+    def remove(self, prefix: str) -> bool:
+        version, length, key, _ = self._parse(prefix)
+        tables = self._tables[version]
+        table = tables.get(length)
+        if table is None or key not in table:
+            return False
+        del table[key]
+        self._size -= 1
+        if not table:
+            del tables[length]
+            self._lengths[version] = sorted(tables, reverse=True)
+        return True
+
+    def lookup(self, ip: str) -> tuple[str, V] | None:
+        """Return (matched_prefix, value) for the most specific covering prefix."""
+        parsed = ip_to_int(ip)
+        if parsed is None:
+            return None
+        version, addr = parsed
+        bits = _FAMILIES[version][1]
+        tables = self._tables[version]
+        for length in self._lengths[version]:
+            hit = tables[length].get(addr >> (bits - length))
+            if hit is not None:
+                return hit
+        return None
+
+    def get(self, ip: str) -> V | None:
+        hit = self.lookup(ip)
+        return hit[1] if hit else None
+
+    def items(self) -> Iterator[tuple[str, V]]:
+        for version in (4, 6):
+            for length in self._lengths[version]:
+                yield from self._tables[version][length].values()
+
+
+def load_asn_index(conn: sqlite3.Connection) -> PrefixIndex[str]:
+    """Build prefix -> origin ASN from the canonical `prefix` table."""
+    index: PrefixIndex[str] = PrefixIndex()
+    for prefix, asn in conn.execute(
+        "SELECT prefix, asn FROM prefix WHERE asn IS NOT NULL"
+    ):
+        try:
+            index.insert(prefix, normalize_asn(asn) or asn)
+        except ValueError:
+            continue
+    return index
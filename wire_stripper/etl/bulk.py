@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Iterable, Mapping
+
+from wire_stripper.db.store import Store
+from wire_stripper.enrich.etld import etld1
+from wire_stripper.telemetry.metrics import REGISTRY, Counter, Histogram
+
+
+@dataclass(frozen=True)
+class Step:
+    """One legacy -> canonical mapping, expressed as a single INSERT ... SELECT.
+
+    `select` reads from `source` and must end in a WHERE clause (SQLite needs it
+    to tell the upsert's ON CONFLICT apart from a join constraint, and the
+    incremental rowid/timestamp bounds are appended to it). It may use the
+    named parameters :now and :profile_id. `ts_column` is the source column
+    `--since` filters on.
+    """
+
+    count_key: str
+    source: str
+    target: str
+    columns: tuple[str, ...]
+    select: str
+    conflict: str = "ON CONFLICT DO NOTHING"
+    ts_column: str | None = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.source}->{self.target}"
+
+    def bounded_select(self, since: str | None = None) -> str:
+        sql = f"{self.select} AND {self.source}.rowid > :lo AND {self.source}.rowid <= :hi"
+        if since is not None and self.ts_column:
+            # Legacy tables mix 'T' and ' ' separators; compare in one canonical form.
+            sql += f" AND replace({self.source}.{self.ts_column}, 'T', ' ') >= :since"
+        return sql
+
+    def insert_select_sql(self, since: str | None = None) -> str:
+        return (
+            f"INSERT INTO {self.target}({', '.join(self.columns)}) "
+            f"{self.bounded_select(since)} {self.conflict}"
+        )
+
+    def insert_values_sql(self) -> str:
+        """Row-at-a-time form of the same upsert, for rows produced elsewhere."""
+        return (
+            f"INSERT INTO {self.target}({', '.join(self.columns)}) "
+            f"VALUES({','.join('?' for _ in self.columns)}) {self.conflict}"
+        )
+
+
+def step_metrics(step: Step) -> tuple[Histogram, Counter]:
+    """(duration histogram, rows counter) for one ETL step."""
+    return (
+        REGISTRY.histogram("wire_stripper_etl_step_seconds", "ETL step duration", step=step.name),
+        REGISTRY.counter("wire_stripper_etl_rows_total", "Rows written by ETL step", step=step.name),
+    )
+
+
+def normalize_since(since: str) -> str:
+    """ISO-8601 date/datetime -> 'YYYY-MM-DD HH:MM:SS' (raises ValueError)."""
+    return datetime.fromisoformat(since).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def register_functions(conn: sqlite3.Connection) -> None:
+    """SQL functions the step SELECTs may call."""
+    conn.create_function("etld1", 1, etld1, deterministic=True)
+
+
+def read_watermark(conn: sqlite3.Connection, source: str, profile_id: str) -> int:
+    row = conn.execute(
+        "SELECT last_rowid FROM etl_watermark WHERE source=? AND profile_id=?",
+        (source, profile_id),
+    ).fetchone()
+    return int(row[0]) if row else 0
+
+
+def source_bounds(
+    conn: sqlite3.Connection,
+    sources: Iterable[str],
+    profile_id: str,
+    full: bool = False,
+) -> dict[str, tuple[int, int]]:
+    """(lo, hi] rowid window per source table for this run.
+
+    `hi` is fixed up front so every step reading the same source sees the same
+    rows, even if the legacy writer keeps appending while we import.
+    """
+    bounds: dict[str, tuple[int, int]] = {}
+    for source in dict.fromkeys(sources):
+        hi = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {source}").fetchone()[0]
+        lo = 0 if full else read_watermark(conn, source, profile_id)
+        bounds[source] = (lo, int(hi))
+    return bounds
+
+
+def write_watermarks(
+    conn: sqlite3.Connection,
+    bounds: Mapping[str, tuple[int, int]],
+    profile_id: str,
+    now: str,
+    steps: Iterable[Step],
+) -> None:
+    """Advance each source's watermark to the `hi` rowid of this run.
+
+    `last_ts` is the newest `ts_column` value among the rows this run read,
+    (lo, hi], in the 'YYYY-MM-DD HH:MM:SS' form `--since` takes: the data
+    time the import reached, not the wall-clock time it ran. A source with
+    no new rows keeps its previous `last_ts`.
+    """
+    ts_columns = {s.source: s.ts_column for s in steps if s.ts_column}
+    rows = []
+    for source, (lo, hi) in bounds.items():
+        last_ts = None
+        column = ts_columns.get(source)
+        if column and hi > lo:
+            last_ts = conn.execute(
+                f"SELECT MAX(replace({column}, 'T', ' ')) FROM {source} "
+                "WHERE rowid > ? AND rowid <= ?",
+                (lo, hi),
+            ).fetchone()[0]
+        rows.append((source, profile_id, hi, last_ts, now))
+    conn.executemany(
+        "INSERT INTO etl_watermark(source, profile_id, last_rowid, last_ts, updated_at) VALUES(?,?,?,?,?) "
+        "ON CONFLICT(source, profile_id) DO UPDATE SET last_rowid=excluded.last_rowid, "
+        "last_ts=COALESCE(excluded.last_ts, etl_watermark.last_ts), updated_at=excluded.updated_at",
+        rows,
+    )
+
+
+def run_steps(
+    store: Store,
+    steps: Iterable[Step],
+    params: Mapping[str, Any],
+    full: bool = False,
+    since: str | None = None,
+) -> dict[str, int]:
+    """Apply every step set-based, inside one transaction.
+
+    Only legacy rows added since the previous run (per-source rowid watermark
+    in `etl_watermark`) are read, unless `full` is set. `since` additionally
+    restricts each source to rows whose timestamp column is >= since and
+    implies rescanning from rowid 0; such a run leaves the watermarks where
+    they were, since rows older than `since` were skipped, not imported.
+    In-place UPDATEs to already-imported legacy rows are only picked up by a
+    full run.
+
+    Counts are rows actually inserted/updated per `count_key` (from changes()).
+    """
+    steps = tuple(steps)
+    if since is not None:
+        since = normalize_since(since)
+    profile_id = params["profile_id"]
+    counts: dict[str, int] = {}
+    with store.transaction() as conn:
+        register_functions(conn)
+        bounds = source_bounds(
+            conn, (s.source for s in steps), profile_id, full=full or since is not None
+        )
+        for step in steps:
+            counts.setdefault(step.count_key, 0)
+            lo, hi = bounds[step.source]
+            if hi <= lo:
+                continue
+            duration, written = step_metrics(step)
+            with duration.time():
+                conn.execute(
+                    step.insert_select_sql(since),
+                    {**params, "lo": lo, "hi": hi, "since": since},
+                )
+            changed = conn.execute("SELECT changes()").fetchone()[0]
+            written.inc(changed)
+            counts[step.count_key] += changed
+        if since is None:
+            write_watermarks(conn, bounds, profile_id, params["now"], steps)
+    return counts
@@ -5,8 +5,15 @@ from wire_stripper.etl.import_dmbt import import_dmbt
 from wire_stripper.etl.import_privacy_proxy import import_privacy_proxy
 
 
-def import_all(store: Store, profile_id: str = "default") -> dict[str, dict[str, int]]:
+def import_all(
+    store: Store,
+    profile_id: str = "default",
+    full: bool = False,
+    since: str | None = None,
+) -> dict[str, dict[str, int]]:
     return {
-        "dmbt": import_dmbt(store, profile_id=profile_id),
-        "privacy_proxy": import_privacy_proxy(store, profile_id=profile_id),
+        "dmbt": import_dmbt(store, profile_id=profile_id, full=full, since=since),
+        "privacy_proxy": import_privacy_proxy(
+            store, profile_id=profile_id, full=full, since=since
+        ),
     }
@@ -1,30 +1,143 @@
 from __future__ import annotations
 
 from wire_stripper.db.store import Store
-
-
-def _upsert_domain(
-    store: Store,
-    domain: str,
-    category: str | None = None,
-    confidence: float | None = None,
-) -> None:
-    store.upsert(
-        "INSERT INTO domain(domain, etld1, category, confidence, first_seen, last_seen) VALUES(?,?,?,?,?,?) "
-        "ON CONFLICT(domain) DO UPDATE SET category=COALESCE(excluded.category, domain.category), confidence=COALESCE(excluded.confidence, domain.confidence), last_seen=excluded.last_seen",
-        (domain, None, category, confidence, store.now(), store.now()),
-    )
-
-
-def _upsert_ip(store: Store, ip: str) -> None:
-    store.upsert(
-        "INSERT INTO ip(ip, ip_version, first_seen, last_seen) VALUES(?,?,?,?) "
+from wire_stripper.etl.bulk import Step, run_steps
+
+_EVENT_COLUMNS = (
+    "event_id",
+    "ts",
+    "sensor",
+    "profile_id",
+    "url",
+    "hostname",
+    "method",
+    "resource_type",
+    "dst_ip",
+    "proto",
+)
+
+_LIST_ENTRY_COLUMNS = (
+    "entry_id",
+    "profile_id",
+    "list_type",
+    "target_type",
+    "target_value",
+    "reason",
+    "created_at",
+    "created_by",
+)
+
+STEPS: tuple[Step, ...] = (
+    # whitelist -> list_entry white domain
+    Step(
+        "list_entry",
+        "whitelist",
+        "list_entry",
+        _LIST_ENTRY_COLUMNS,
+        "SELECT 'privacy:whitelist:' || domain, :profile_id, 'white', 'domain', domain, "
+        "COALESCE(reason, 'whitelist'), COALESCE(added, :now), 'privacy_proxy' "
+        "FROM whitelist WHERE domain IS NOT NULL",
+        ts_column="added",
+    ),
+    # tracking_domains -> domain
+    Step(
+        "domain",
+        "tracking_domains",
+        "domain",
+        ("domain", "etld1", "category", "confidence", "first_seen", "last_seen"),
+        "SELECT domain, etld1(domain), category, NULL, :now, :now FROM tracking_domains WHERE domain IS NOT NULL",
+        "ON CONFLICT(domain) DO UPDATE SET etld1=COALESCE(domain.etld1, excluded.etld1), "
+        "category=COALESCE(excluded.category, domain.category), "
+        "confidence=COALESCE(excluded.confidence, domain.confidence), last_seen=excluded.last_seen",
+        ts_column="last_seen",
+    ),
+    # tracking_domains -> list_entry black (if blocked)
+    Step(
+        "list_entry",
+        "tracking_domains",
+        "list_entry",
+        _LIST_ENTRY_COLUMNS,
+        "SELECT 'privacy:tracking_domain:' || domain, :profile_id, 'black', 'domain', domain, "
+        "'tracking_domains blocked (hit_count=' || COALESCE(hit_count, 'None') || ')', "
+        "COALESCE(last_seen, :now), 'privacy_proxy' "
+        "FROM tracking_domains WHERE blocked AND domain IS NOT NULL",
+        ts_column="last_seen",
+    ),
+    # tracking_ips -> ip
+    Step(
+        "ip",
+        "tracking_ips",
+        "ip",
+        ("ip", "ip_version", "first_seen", "last_seen"),
+        "SELECT ip_address, CASE WHEN instr(ip_address, ':') > 0 THEN 6 ELSE 4 END, :now, :now "
+        "FROM tracking_ips WHERE ip_address IS NOT NULL AND ip_address <> ''",
         "ON CONFLICT(ip) DO UPDATE SET last_seen=excluded.last_seen",
-        (ip, 6 if ":" in ip else 4, store.now(), store.now()),
-    )
-
-
-def import_privacy_proxy(store: Store, profile_id: str = "default") -> dict[str, int]:
+        ts_column="last_seen",
+    ),
+    # tracking_ips -> list_entry black (if blocked)
+    Step(
+        "list_entry",
+        "tracking_ips",
+        "list_entry",
+        _LIST_ENTRY_COLUMNS,
+        "SELECT 'privacy:tracking_ip:' || ip_address, :profile_id, 'black', 'ip', ip_address, "
+        "'tracking_ips blocked (hit_count=' || COALESCE(hit_count, 'None') || ', associated_domain=' "
+        "|| COALESCE(associated_domain, 'None') || ')', COALESCE(last_seen, :now), 'privacy_proxy' "
+        "FROM tracking_ips WHERE blocked AND ip_address IS NOT NULL",
+        ts_column="last_seen",
+    ),
+    # request_log -> event
+    Step(
+        "event",
+        "request_log",
+        "event",
+        _EVENT_COLUMNS,
+        "SELECT 'privacy:request_log:' || id, COALESCE(timestamp, :now), 'privacy_proxy', :profile_id, "
+        "url, host, method, NULL, ip_address, 'tcp' FROM request_log WHERE true",
+        ts_column="timestamp",
+    ),
+    # If the proxy already decided to block, carry that into canonical list entries
+    Step(
+        "list_entry",
+        "request_log",
+        "list_entry",
+        _LIST_ENTRY_COLUMNS,
+        "SELECT 'privacy:blocked_host:' || host, :profile_id, 'black', 'domain', host, "
+        "COALESCE(block_reason, 'request_log blocked'), COALESCE(timestamp, :now), 'privacy_proxy' "
+        "FROM request_log WHERE blocked AND host IS NOT NULL AND host <> ''",
+        ts_column="timestamp",
+    ),
+    # cookie_traffic -> event
+    Step(
+        "event",
+        "cookie_traffic",
+        "event",
+        _EVENT_COLUMNS,
+        "SELECT 'privacy:cookie_traffic:' || id, COALESCE(timestamp, :now), 'privacy_proxy', :profile_id, "
+        "request_url, domain, NULL, 'cookie', ip_address, NULL FROM cookie_traffic WHERE true",
+        ts_column="timestamp",
+    ),
+    # cookie_traffic -> list_entry grey (if blocked)
+    Step(
+        "list_entry",
+        "cookie_traffic",
+        "list_entry",
+        _LIST_ENTRY_COLUMNS,
+        "SELECT 'privacy:cookie_block:' || domain || ':' || COALESCE(cookie_name, ''), :profile_id, "
+        "'grey', 'domain', domain, 'cookie traffic blocked (cookie_name=' || COALESCE(cookie_name, 'None') || ')', "
+        "COALESCE(timestamp, :now), 'privacy_proxy' "
+        "FROM cookie_traffic WHERE blocked AND domain IS NOT NULL AND domain <> ''",
+        ts_column="timestamp",
+    ),
+)
+
+
+def import_privacy_proxy(
+    store: Store,
+    profile_id: str = "default",
+    full: bool = False,
+    since: str | None = None,
+) -> dict[str, int]:
     """Import browser-privacy-proxy tables into canonical wire_stripper tables.
 
     Reads:
@@ -35,176 +148,14 @@ def import_privacy_proxy(store: Store, profile_id: str = "default") -> dict[str,
 
     Notes:
     - This is co-location/ETL mode: we do not change the original proxy code yet.
+    - Each mapping is one set-based INSERT ... SELECT; the whole import runs in
+      a single transaction. Counts are rows changed.
+    - Incremental by default: see `etl.bulk.run_steps` for `full` / `since`.
     """
-
-    counts = {"domain": 0, "ip": 0, "event": 0, "list_entry": 0}
-
-    # whitelist -> list_entry white domain
-    for row in store.conn.execute(
-        "SELECT domain, added, reason FROM whitelist"
-    ).fetchall():
-        domain, added, reason = row
-        entry_id = f"privacy:whitelist:{domain}"
-        store.upsert(
-            "INSERT OR IGNORE INTO list_entry(entry_id, profile_id, list_type, target_type, target_value, reason, created_at, created_by) VALUES(?,?,?,?,?,?,?,?)",
-            (
-                entry_id,
-                profile_id,
-                "white",
-                "domain",
-                domain,
-                reason or "whitelist",
-                added or store.now(),
-                "privacy_proxy",
-            ),
-        )
-        counts["list_entry"] += 1
-
-    # tracking_domains -> domain + list_entry black (if blocked)
-    for row in store.conn.execute(
-        "SELECT domain, category, blocked, first_seen, last_seen, hit_count FROM tracking_domains"
-    ).fetchall():
-        domain, category, blocked, first_seen, last_seen, hit_count = row
-        _upsert_domain(store, domain, category=category, confidence=None)
-        counts["domain"] += 1
-
-        if blocked:
-            entry_id = f"privacy:tracking_domain:{domain}"
-            store.upsert(
-                "INSERT OR IGNORE INTO list_entry(entry_id, profile_id, list_type, target_type, target_value, reason, created_at, created_by) VALUES(?,?,?,?,?,?,?,?)",
-                (
-                    entry_id,
-                    profile_id,
-                    "black",
-                    "domain",
-                    domain,
-                    f"tracking_domains blocked (hit_count={hit_count})",
-                    last_seen or store.now(),
-                    "privacy_proxy",
-                ),
-            )
-            counts["list_entry"] += 1
-
-    # tracking_ips -> ip + list_entry black (if blocked)
-    for row in store.conn.execute(
-        "SELECT ip_address, blocked, last_seen, associated_domain, hit_count FROM tracking_ips"
-    ).fetchall():
-        ip, blocked, last_seen, assoc_domain, hit_count = row
-        if ip:
-            _upsert_ip(store, ip)
-            counts["ip"] += 1
-
-        if blocked:
-            entry_id = f"privacy:tracking_ip:{ip}"
-            store.upsert(
-                "INSERT OR IGNORE INTO list_entry(entry_id, profile_id, list_type, target_type, target_value, reason, created_at, created_by) VALUES(?,?,?,?,?,?,?,?)",
-                (
-                    entry_id,
-                    profile_id,
-                    "black",
-                    "ip",
-                    ip,
-                    f"tracking_ips blocked (hit_count={hit_count}, associated_domain={assoc_domain})",
-                    last_seen or store.now(),
-                    "privacy_proxy",
-                ),
-            )
-            counts["list_entry"] += 1
-
-    # request_log -> event
-    for row in store.conn.execute(
-        "SELECT id, timestamp, method, url, host, ip_address, blocked, block_reason FROM request_log"
-    ).fetchall():
-        rid, ts, method, url, host, ip_address, blocked, block_reason = row
-        event_id = f"privacy:request_log:{rid}"
-        store.upsert(
-            "INSERT OR IGNORE INTO event(event_id, ts, sensor, profile_id, url, hostname, method, resource_type, src_ip, dst_ip, dst_port, proto, bytes, headers_json, cookies_json, initiator_json) "
-            "VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
-            (
-                event_id,
-                ts or store.now(),
-                "privacy_proxy",
-                profile_id,
-                url,
-                host,
-                method,
-                None,
-                None,
-                ip_address,
-                None,
-                "tcp",
-                None,
-                None,
-                None,
-                None,
-            ),
-        )
-        counts["event"] += 1
-
-        # If the proxy already decided to block, carry that into canonical list entries
-        if blocked:
-            if host:
-                entry_id = f"privacy:blocked_host:{host}"
-                store.upsert(
-                    "INSERT OR IGNORE INTO list_entry(entry_id, profile_id, list_type, target_type, target_value, reason, created_at, created_by) VALUES(?,?,?,?,?,?,?,?)",
-                    (
-                        entry_id,
-                        profile_id,
-                        "black",
-                        "domain",
-                        host,
-                        block_reason or "request_log blocked",
-                        ts or store.now(),
-                        "privacy_proxy",
-                    ),
-                )
-                counts["list_entry"] += 1
-
-    # cookie_traffic -> event
-    for row in store.conn.execute(
-        "SELECT id, timestamp, domain, cookie_name, ip_address, request_url, blocked FROM cookie_traffic"
-    ).fetchall():
-        rid, ts, domain, cookie_name, ip_address, request_url, blocked = row
-        event_id = f"privacy:cookie_traffic:{rid}"
-        store.upsert(
-            "INSERT OR IGNORE INTO event(event_id, ts, sensor, profile_id, url, hostname, method, resource_type, src_ip, dst_ip, dst_port, proto, bytes, headers_json, cookies_json, initiator_json) "
-            "VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
-            (
-                event_id,
-                ts or store.now(),
-                "privacy_proxy",
-                profile_id,
-                request_url,
-                domain,
-                None,
-                "cookie",
-                None,
-                ip_address,
-                None,
-                None,
-                None,
-                None,
-                None,
-                None,
-            ),
-        )
-        counts["event"] += 1
-
-        if blocked and domain:
-            entry_id = f"privacy:cookie_block:{domain}:{cookie_name or ''}"
-            store.upsert(
-                "INSERT OR IGNORE INTO list_entry(entry_id, profile_id, list_type, target_type, target_value, reason, created_at, created_by) VALUES(?,?,?,?,?,?,?,?)",
-                (
-                    entry_id,
-                    profile_id,
-                    "grey",
-                    "domain",
-                    domain,
-                    f"cookie traffic blocked (cookie_name={cookie_name})",
-                    ts or store.now(),
-                    "privacy_proxy",
-                ),
-            )
-            counts["list_entry"] += 1
-
-    return counts
+    return run_steps(
+        store,
+        STEPS,
+        {"now": store.now(), "profile_id": profile_id},
+        full=full,
+        since=since,
+    )
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+import queue
+import time
+from dataclasses import dataclass
+from typing import Any, Mapping, Sequence
+
+from wire_stripper.db.pool import connect_readonly
+from wire_stripper.db.store import Store
+from wire_stripper.etl import import_dmbt, import_privacy_proxy
+from wire_stripper.etl.bulk import (
+    Step,
+    normalize_since,
+    register_functions,
+    source_bounds,
+    step_metrics,
+    write_watermarks,
+)
+
+SOURCES: Mapping[str, Sequence[Step]] = {
+    "dmbt": import_dmbt.STEPS,
+    "privacy_proxy": import_privacy_proxy.STEPS,
+}
+
+# Per-task chunk queues, handed to pool workers by the initializer.
+_QUEUES: Sequence[Any] = ()
+
+
+@dataclass(frozen=True)
+class _Failed:
+    message: str
+
+
+def _init_worker(queues: Sequence[Any]) -> None:
+    global _QUEUES
+    _QUEUES = queues
+
+
+def _read_step(task: tuple[int, str, Step, dict[str, Any], str | None, int]) -> None:
+    """Worker: run one step's SELECT on a read-only connection, stream rows out."""
+    task_id, db_path, step, params, since, chunk_size = task
+    out = _QUEUES[task_id]
+    try:
+        conn = connect_readonly(db_path)
+        register_functions(conn)
+        cur = conn.execute(step.bounded_select(since), params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            out.put(rows)
+        conn.close()
+        out.put(None)
+    except Exception as exc:  # surfaced to the writer, which raises it
+        out.put(_Failed(f"{step.source}->{step.target}: {exc!r}"))
+
+
+def import_all_parallel(
+    store: Store,
+    profile_id: str = "default",
+    jobs: int = 2,
+    full: bool = False,
+    since: str | None = None,
+    chunk_size: int = 5000,
+    queue_depth: int = 8,
+    stall_timeout: float = 600.0,
+) -> dict[str, dict[str, int]]:
+    """`import_all` with reads/transforms fanned out over `jobs` processes.
+
+    Every step's SELECT (including Python-side transforms such as etld1) runs
+    in a worker with its own read-only connection. The calling process is the
+    only writer: it applies the streamed chunks with executemany, one
+    transaction per chunk, in step order, so the result matches the serial
+    import. Watermarks only advance once every step has been applied, and
+    not at all for a `since` run (see `run_steps`).
+
+    Unlike `import_all` (one transaction), readers can see a partially
+    applied import while this runs, and a failure leaves the chunks
+    committed so far in place (the next run re-reads them, the upserts
+    are idempotent). Committing per chunk also makes the write side slower
+    than the serial import; this only pays off when the Python transforms
+    dominate and there are spare cores. A worker that stops producing for
+    `stall_timeout` seconds (killed, say) aborts the import.
+    """
+    if since is not None:
+        since = normalize_since(since)
+    now = store.now()
+    bounds = source_bounds(
+        store.conn,
+        (step.source for steps in SOURCES.values() for step in steps),
+        profile_id,
+        full=full or since is not None,
+    )
+
+    tasks: list[tuple[str, Step, tuple[int, int]]] = [
+        (name, step, bounds[step.source])
+        for name, steps in SOURCES.items()
+        for step in steps
+        if bounds[step.source][1] > bounds[step.source][0]
+    ]
+    counts: dict[str, dict[str, int]] = {
+        name: {step.count_key: 0 for step in steps} for name, steps in SOURCES.items()
+    }
+
+    ctx = mp.get_context()
+    queues = [ctx.Queue(maxsize=queue_depth) for _ in tasks]
+    db_path = str(store.paths.db_path.resolve())
+    with ctx.Pool(
+        max(1, jobs), initializer=_init_worker, initargs=(queues,)
+    ) as pool:
+        pending = pool.map_async(
+            _read_step,
+            [
+                (
+                    i,
+                    db_path,
+                    step,
+                    {"now": now, "profile_id": profile_id, "lo": lo, "hi": hi, "since": since},
+                    since,
+                    chunk_size,
+                )
+                for i, (_, step, (lo, hi)) in enumerate(tasks)
+            ],
+            chunksize=1,
+        )
+        # Consume in task order; workers pick tasks up in the same order, so
+        # the task being drained is always running and bounded queues cannot
+        # deadlock the pool.
+        for i, (name, step, _) in enumerate(tasks):
+            sql = step.insert_values_sql()
+            duration, written = step_metrics(step)
+            last = time.monotonic()
+            while True:
+                try:
+                    chunk = queues[i].get(timeout=1.0)
+                except queue.Empty:
+                    if pending.ready() and not pending.successful():
+                        pending.get()  # re-raises the worker's exception
+                    if time.monotonic() - last > stall_timeout:
+                        pool.terminate()
+                        raise RuntimeError(
+                            f"parallel import stalled: no rows from {step.source} "
+                            f"for {stall_timeout:.0f}s"
+                        )
+                    continue
+                last = time.monotonic()
+                if chunk is None:
+                    break
+                if isinstance(chunk, _Failed):
+                    pool.terminate()
+                    raise RuntimeError(f"parallel import failed: {chunk.message}")
+                with duration.time(), store.transaction() as conn:
+                    cur = conn.executemany(sql, chunk)
+                    counts[name][step.count_key] += max(cur.rowcount, 0)
+                    written.inc(max(cur.rowcount, 0))
+        pending.get()
+
+    if since is None:
+        with store.transaction() as conn:
+            write_watermarks(
+                conn,
+                bounds,
+                profile_id,
+                now,
+                (step for steps in SOURCES.values() for step in steps),
+            )
+    return counts
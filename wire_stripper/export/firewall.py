@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import socket
+import sqlite3
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+_BITS = {4: 32, 6: 128}
+
+
+def _parse(value: str) -> tuple[int, int, int] | None:
+    """'a.b.c.d[/len]' or IPv6 -> (version, first, last) as integers."""
+    addr, _, length = value.strip().partition("/")
+    version, family = (6, socket.AF_INET6) if ":" in addr else (4, socket.AF_INET)
+    bits = _BITS[version]
+    try:
+        n = int(length) if length else bits
+        packed = socket.inet_pton(family, addr)
+    except (OSError, ValueError):
+        return None
+    if not 0 <= n <= bits:
+        return None
+    host = bits - n
+    first = int.from_bytes(packed, "big") >> host << host
+    return version, first, first | ((1 << host) - 1)
+
+
+def _merge(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Sort and merge overlapping/adjacent [first, last] integer ranges."""
+    ranges.sort()
+    out: list[tuple[int, int]] = []
+    for first, last in ranges:
+        if out and first <= out[-1][1] + 1:
+            if last > out[-1][1]:
+                out[-1] = (out[-1][0], last)
+        else:
+            out.append((first, last))
+    return out
+
+
+def _subtract(
+    keep: list[tuple[int, int]], drop: list[tuple[int, int]]
+) -> list[tuple[int, int]]:
+    """keep minus drop; both sorted and merged."""
+    out: list[tuple[int, int]] = []
+    j = 0
+    for first, last in keep:
+        while j < len(drop) and drop[j][1] < first:
+            j += 1
+        k = j
+        cur = first
+        while k < len(drop) and drop[k][0] <= last:
+            if drop[k][0] > cur:
+                out.append((cur, drop[k][0] - 1))
+            cur = max(cur, drop[k][1] + 1)
+            k += 1
+        if cur <= last:
+            out.append((cur, last))
+    return out
+
+
+def _range_to_cidrs(first: int, last: int, bits: int) -> Iterator[tuple[int, int]]:
+    """Minimal CIDR cover of [first, last] as (network, prefixlen)."""
+    while first <= last:
+        # Largest block aligned at `first` that does not run past `last`.
+        size = (first & -first).bit_length() - 1 if first else bits
+        span = (last - first + 1).bit_length() - 1
+        host = min(size, span)
+        yield first, bits - host
+        first += 1 << host
+
+
+def _format(version: int, network: int, length: int) -> str:
+    family = socket.AF_INET6 if version == 6 else socket.AF_INET
+    addr = socket.inet_ntop(family, network.to_bytes(_BITS[version] // 8, "big"))
+    return f"{addr}/{length}"
+
+
+@dataclass(frozen=True)
+class PrefixPlan:
+    """Minimal covering set of blocked prefixes, per address family."""
+
+    v4: tuple[str, ...]
+    v6: tuple[str, ...]
+    input_count: int
+
+    def __len__(self) -> int:
+        return len(self.v4) + len(self.v6)
+
+
+def compact_prefixes(
+    blocked: Iterable[str], allowed: Iterable[str] = ()
+) -> PrefixPlan:
+    """Collapse `blocked` prefixes/IPs into a minimal CIDR set minus `allowed`.
+
+    Adjacent and overlapping prefixes are merged, covered ones dropped, and
+    whitelisted IPs/prefixes carved out. Work is done on integer ranges
+    (sort + linear merge), so 500k inputs take seconds rather than the
+    minutes ipaddress objects would; the output equals
+    ipaddress.collapse_addresses() of the same set.
+    """
+    block: dict[int, list[tuple[int, int]]] = {4: [], 6: []}
+    allow: dict[int, list[tuple[int, int]]] = {4: [], 6: []}
+    count = 0
+    for value in blocked:
+        count += 1
+        parsed = _parse(value)
+        if parsed is not None:
+            block[parsed[0]].append(parsed[1:])
+    for value in allowed:
+        parsed = _parse(value)
+        if parsed is not None:
+            allow[parsed[0]].append(parsed[1:])
+
+    out: dict[int, tuple[str, ...]] = {}
+    for version in (4, 6):
+        ranges = _subtract(_merge(block[version]), _merge(allow[version]))
+        bits = _BITS[version]
+        out[version] = tuple(
+            _format(version, net, length)
+            for first, last in ranges
+            for net, length in _range_to_cidrs(first, last, bits)
+        )
+    return PrefixPlan(v4=out[4], v6=out[6], input_count=count)
+
+
+def load_prefix_plan(conn: sqlite3.Connection, profile_id: str) -> PrefixPlan:
+    """Compact the profile's black ip/prefix entries minus white ip/prefix entries."""
+
+    def values(list_type: str) -> Iterator[str]:
+        for (value,) in conn.execute(
+            "SELECT target_value FROM list_entry WHERE profile_id=? AND list_type=? AND target_type IN ('ip', 'prefix')",
+            (profile_id, list_type),
+        ):
+            yield value
+
+    return compact_prefixes(values("black"), values("white"))
+
+
+def render_nftables(
+    plan: PrefixPlan, table: str = "wire_stripper", family: str = "inet"
+) -> Iterator[str]:
+    """nft -f script: flush + refill both sets in one atomic transaction."""
+    yield f"table {family} {table} {{\n"
+    yield "  set blocked_v4 { type ipv4_addr; flags interval; }\n"
+    yield "  set blocked_v6 { type ipv6_addr; flags interval; }\n"
+    yield "}\n"
+    yield f"flush set {family} {table} blocked_v4\n"
+    yield f"flush set {family} {table} blocked_v6\n"
+    for name, prefixes in (("blocked_v4", plan.v4), ("blocked_v6", plan.v6)):
+        for i in range(0, len(prefixes), 1000):
+            chunk = ", ".join(prefixes[i : i + 1000])
+            yield f"add element {family} {table} {name} {{ {chunk} }}\n"
+
+
+def render_ipset(plan: PrefixPlan, name: str = "wire_stripper") -> Iterator[str]:
+    """`ipset restore` script: build temp sets, then swap them in atomically."""
+    for suffix, family, prefixes in (("v4", "inet", plan.v4), ("v6", "inet6", plan.v6)):
+        live, tmp = f"{name}_{suffix}", f"{name}_{suffix}_tmp"
+        maxelem = max(65536, len(prefixes))
+        yield f"create {live} hash:net family {family} maxelem {maxelem} -exist\n"
+        yield f"create {tmp} hash:net family {family} maxelem {maxelem} -exist\n"
+        yield f"flush {tmp}\n"
+        for prefix in prefixes:
+            yield f"add {tmp} {prefix}\n"
+        yield f"swap {tmp} {live}\n"
+        yield f"destroy {tmp}\n"
+
+
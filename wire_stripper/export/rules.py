@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import os
+import sqlite3
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from wire_stripper.fsutil import write_atomic
+from wire_stripper.policy.snapshot import is_hostname, normalize_host
+
+Entry = tuple[str, str]  # (list_type, domain)
+
+
+@dataclass(frozen=True)
+class RuleFormat:
+    name: str
+    list_types: tuple[str, ...]
+    # One enforcer line per entry; also used for +/- lines in deltas.
+    entry_line: Callable[[str, str], str]
+    # Header lines given (sha256, entry count, list generation).
+    header: Callable[[str, int, int], list[str]]
+    # Full body from the sorted entry stream; defaults to one entry_line per entry.
+    body: Callable[[Iterator[Entry]], Iterator[str]] | None = None
+
+
+def _comment_header(prefix: str, fmt: str) -> Callable[[str, int, int], list[str]]:
+    def header(sha: str, count: int, generation: int) -> list[str]:
+        return [
+            f"{prefix} wire_stripper {fmt} export\n",
+            f"{prefix} sha256={sha} entries={count} generation={generation}\n",
+        ]
+
+    return header
+
+
+def _abp_header(sha: str, count: int, generation: int) -> list[str]:
+    return ["[Adblock Plus 2.0]\n"] + _comment_header("!", "abp")(sha, count, generation)
+
+
+def _unbound_header(sha: str, count: int, generation: int) -> list[str]:
+    return _comment_header("#", "unbound")(sha, count, generation) + ["server:\n"]
+
+
+_CHROME_KEYS = {"black": "URLBlocklist", "white": "URLAllowlist"}
+
+
+def _chrome_header(sha: str, count: int, generation: int) -> list[str]:
+    meta = {"sha256": sha, "entries": count, "generation": generation}
+    return ["{\n", f'  "wire_stripper": {json.dumps(meta)},\n']
+
+
+def _chrome_body(entries: Iterator[Entry]) -> Iterator[str]:
+    current: str | None = None
+    for list_type, domain in entries:
+        if list_type != current:
+            if current is not None:
+                yield "\n  ],\n"
+            yield f'  "{_CHROME_KEYS[list_type]}": [\n    {json.dumps(domain)}'
+            current = list_type
+        else:
+            yield f",\n    {json.dumps(domain)}"
+    if current is not None:
+        yield "\n  ],\n"
+    yield '  "wire_stripper_end": true\n}\n'
+
+
+FORMATS: dict[str, RuleFormat] = {
+    "hosts": RuleFormat(
+        "hosts",
+        ("black",),
+        lambda _, d: f"0.0.0.0 {d}\n",
+        _comment_header("#", "hosts"),
+    ),
+    "abp": RuleFormat(
+        "abp",
+        ("black", "white"),
+        lambda t, d: f"@@||{d}^\n" if t == "white" else f"||{d}^\n",
+        _abp_header,
+    ),
+    "unbound": RuleFormat(
+        "unbound",
+        ("black", "white"),
+        lambda t, d: f'  local-zone: "{d}." {"transparent" if t == "white" else "always_nxdomain"}\n',
+        _unbound_header,
+    ),
+    "chrome": RuleFormat(
+        "chrome",
+        ("black", "white"),
+        lambda t, d: f"{_CHROME_KEYS[t]}\t{d}\n",
+        _chrome_header,
+        _chrome_body,
+    ),
+}
+
+
+@dataclass(frozen=True)
+class ExportResult:
+    path: Path
+    sha256: str
+    entries: int
+    added: int
+    removed: int
+    skipped: bool = False
+    delta_path: Path | None = None
+    invalid: int = 0  # entries that are not hostnames, left out
+
+
+# Values normalize_host might still change (case, :port, brackets, spaces,
+# trailing dot). Everything else is either a clean hostname or rejected as is.
+_UNNORMALIZED = "(target_value GLOB '*[^a-z0-9._-]*' OR target_value GLOB '*.')"
+
+
+def iter_entries(
+    conn: sqlite3.Connection,
+    profile_id: str,
+    list_types: Iterable[str],
+    rejected: list[Entry] | None = None,
+) -> Iterator[Entry]:
+    """Domain entries ordered by (list_type, domain), streamed off the UNIQUE index.
+
+    Domains are pasted verbatim into enforcer lines, so each one must pass
+    `is_hostname` after `normalize_host`. The few rows that need
+    normalizing are read first, fixed, sorted and merged into the stream;
+    rows that still are not hostnames are skipped and appended to
+    `rejected`.
+    """
+    types = tuple(list_types)
+    where = (
+        f"profile_id=? AND target_type='domain' "
+        f"AND list_type IN ({','.join('?' for _ in types)})"
+    )
+    params = (profile_id, *types)
+    fixed: set[Entry] = set()
+    for list_type, value in conn.execute(
+        f"SELECT list_type, target_value FROM list_entry WHERE {where} AND {_UNNORMALIZED}",
+        params,
+    ):
+        host = normalize_host(value)
+        if is_hostname(host):
+            fixed.add((list_type, host))
+        elif rejected is not None:
+            rejected.append((list_type, value))
+
+    def clean() -> Iterator[Entry]:
+        cur = conn.execute(
+            f"SELECT list_type, target_value FROM list_entry WHERE {where} "
+            f"AND NOT {_UNNORMALIZED} ORDER BY list_type, target_value",
+            params,
+        )
+        for list_type, value in cur:
+            if is_hostname(value):
+                yield list_type, value
+            elif rejected is not None:
+                rejected.append((list_type, value))
+
+    prev = None
+    for entry in heapq.merge(clean(), sorted(fixed)):
+        if entry != prev:
+            yield entry
+            prev = entry
+
+
+def _manifest_path(out: Path) -> Path:
+    return out.with_name(out.name + ".manifest")
+
+
+def _read_manifest_header(path: Path) -> dict[str, str]:
+    try:
+        with path.open("r", encoding="utf-8") as fh:
+            first = fh.readline()
+    except OSError:
+        return {}
+    if not first.startswith("#"):
+        return {}
+    return dict(kv.split("=", 1) for kv in first[1:].split() if "=" in kv)
+
+
+def _iter_manifest(path: Path) -> Iterator[Entry]:
+    try:
+        fh = path.open("r", encoding="utf-8")
+    except OSError:
+        return
+    with fh:
+        for line in fh:
+            if line.startswith("#"):
+                continue
+            list_type, _, domain = line.rstrip("\n").partition("\t")
+            yield list_type, domain
+
+
+def _diff(old: Iterator[Entry], new: Iterator[Entry]) -> Iterator[tuple[str, Entry]]:
+    """Merge-join two sorted entry streams into ('+'|'-', entry) changes."""
+    sentinel = ("\uffff", "")
+    a, b = next(old, sentinel), next(new, sentinel)
+    while a != sentinel or b != sentinel:
+        if a == b:
+            a, b = next(old, sentinel), next(new, sentinel)
+        elif b == sentinel or (a != sentinel and a < b):
+            yield "-", a
+            a = next(old, sentinel)
+        else:
+            yield "+", b
+            b = next(new, sentinel)
+
+
+def export_rules(
+    conn: sqlite3.Connection,
+    fmt: str,
+    out: str | os.PathLike[str],
+    profile_id: str = "default",
+    generation: int | None = None,
+    delta: bool = False,
+    force: bool = False,
+) -> ExportResult:
+    """Stream the profile's domain lists into `out` in enforcer format `fmt`.
+
+    Entries come straight off a sorted cursor; the body is hashed while it is
+    spooled to a temp file, then header + body are renamed into place. A
+    sorted `<out>.manifest` of the exported entries is kept next to it, so a
+    later run with `delta=True` can merge-diff old vs new in constant memory
+    and write `<out>.delta` (+/- lines in the same format). When `generation`
+    matches the one recorded in the manifest and `out` exists, nothing is
+    regenerated unless `force` is set.
+    """
+    spec = FORMATS[fmt]
+    out = Path(out)
+    manifest = _manifest_path(out)
+    prev = _read_manifest_header(manifest)
+    if (
+        not force
+        and generation is not None
+        and out.exists()
+        and prev.get("generation") == str(generation)
+        and prev.get("format") == fmt
+        and prev.get("profile") == profile_id
+    ):
+        return ExportResult(
+            out,
+            prev.get("sha256", ""),
+            int(prev.get("entries", 0)),
+            0,
+            0,
+            True,
+            invalid=int(prev.get("invalid", 0)),
+        )
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    count = 0
+    rejected: list[Entry] = []
+    with tempfile.TemporaryFile("w+", encoding="utf-8", dir=out.parent) as body_tmp, \
+            tempfile.TemporaryFile("w+", encoding="utf-8", dir=out.parent) as manifest_tmp:
+
+        def counted() -> Iterator[Entry]:
+            nonlocal count
+            for entry in iter_entries(conn, profile_id, spec.list_types, rejected):
+                count += 1
+                manifest_tmp.write(f"{entry[0]}\t{entry[1]}\n")
+                yield entry
+
+        lines = (
+            spec.body(counted())
+            if spec.body is not None
+            else (spec.entry_line(t, d) for t, d in counted())
+        )
+        for line in lines:
+            digest.update(line.encode("utf-8"))
+            body_tmp.write(line)
+        sha = digest.hexdigest()
+
+        added = removed = 0
+        delta_path = None
+        if delta and prev.get("sha256") and prev.get("format") == fmt:
+            delta_path = out.with_name(out.name + ".delta")
+            manifest_tmp.seek(0)
+            new_entries = (
+                (t, d)
+                for t, _, d in (ln.rstrip("\n").partition("\t") for ln in manifest_tmp)
+            )
+            with tempfile.TemporaryFile("w+", encoding="utf-8", dir=out.parent) as delta_tmp:
+                for op, (t, d) in _diff(_iter_manifest(manifest), new_entries):
+                    if op == "+":
+                        added += 1
+                    else:
+                        removed += 1
+                    delta_tmp.write(op + spec.entry_line(t, d))
+                delta_tmp.seek(0)
+                head = (
+                    f"# wire_stripper {fmt} delta base={prev['sha256']} sha256={sha} "
+                    f"added={added} removed={removed}\n"
+                )
+                write_atomic(delta_path, _chain([head], _blocks(delta_tmp)))
+
+        body_tmp.seek(0)
+        write_atomic(
+            out, _chain(spec.header(sha, count, generation or 0), _blocks(body_tmp))
+        )
+        manifest_tmp.seek(0)
+        manifest_head = (
+            f"# sha256={sha} entries={count} generation={generation or 0} "
+            f"format={fmt} profile={profile_id} invalid={len(rejected)}\n"
+        )
+        write_atomic(manifest, _chain([manifest_head], _blocks(manifest_tmp)))
+
+    return ExportResult(out, sha, count, added, removed, False, delta_path, len(rejected))
+
+
+def _blocks(fh) -> Iterator[str]:
+    while True:
+        block = fh.read(1 << 16)
+        if not block:
+            return
+        yield block
+
+
+def _chain(*parts: Iterable[str]) -> Iterator[str]:
+    for part in parts:
+        yield from part
+
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator
+
+try:
+    import zstandard  # type: ignore
+except Exception:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+# Federation batch file (`<id>.wsf`):
+#
+#   {"v":2,"kind":"list_delta","origin":...,"profile":...,"seq":N,
+#    "base":...,"state":...,"added":N,"removed":M,"codec":"zstd","sha256":...}\n
+#   <compressed body>
+#
+# The body is the batch's changes sorted by key, one per line, front-coded
+# against the previous key:
+#
+#   <op><shared>\t<suffix>\n      op is + or -, shared is a decimal count
+#
+# where key = list_type \t target_type \t value and domain values are
+# label-reversed (com.example.ads) so neighbours share their suffix too.
+# `seq` numbers an origin/profile's batches 1, 2, 3, ...; peers apply them
+# strictly in seq order. `base`/`state` are sha256 hashes of the sorted
+# entry set before and after the batch and serve as a consistency check
+# only: a list can return to an earlier state, so they cannot order
+# batches. The header carries no timestamps, so re-deriving a batch after a
+# crash reproduces the same bytes; the batch id (sha256 of the whole file,
+# seq included) is its content hash.
+
+VERSION = 2
+KIND_LIST_DELTA = "list_delta"
+
+Key = tuple[str, str, str]  # (list_type, target_type, target_value)
+Change = tuple[str, Key]  # ('+'|'-', key)
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+def codec(name: str | None = None) -> Codec:
+    name = name or ("zstd" if zstandard is not None else "gzip")
+    if name == "zstd":
+        if zstandard is None:
+            raise RuntimeError("batch uses zstd but the zstandard module is not installed")
+        return Codec(
+            "zstd",
+            zstandard.ZstdCompressor(level=19).compress,
+            zstandard.ZstdDecompressor().decompress,
+        )
+    if name != "gzip":
+        raise ValueError(f"unknown codec {name!r}")
+    return Codec("gzip", lambda b: gzip.compress(b, 9, mtime=0), gzip.decompress)
+
+
+def _wire_value(target_type: str, value: str) -> str:
+    return ".".join(reversed(value.split("."))) if target_type == "domain" else value
+
+
+def encode_changes(changes: Iterable[Change]) -> bytes:
+    """Sort and front-code `changes` into the uncompressed batch body."""
+    keyed = sorted(
+        (f"{t}\t{tt}\t{_wire_value(tt, v)}", op) for op, (t, tt, v) in changes
+    )
+    out: list[str] = []
+    prev = ""
+    for key, op in keyed:
+        shared = 0
+        limit = min(len(prev), len(key))
+        while shared < limit and prev[shared] == key[shared]:
+            shared += 1
+        out.append(f"{op}{shared}\t{key[shared:]}\n")
+        prev = key
+    return "".join(out).encode("utf-8")
+
+
+def decode_changes(body: bytes) -> Iterator[Change]:
+    prev = ""
+    for line in body.decode("utf-8").split("\n"):
+        if not line:
+            continue
+        head, _, suffix = line.partition("\t")
+        key = prev[: int(head[1:])] + suffix
+        list_type, target_type, value = key.split("\t", 2)
+        yield head[0], (list_type, target_type, _wire_value(target_type, value))
+        prev = key
+
+
+@dataclass(frozen=True)
+class Batch:
+    batch_id: str
+    header: dict[str, Any]
+    payload: bytes  # compressed body
+
+    @property
+    def blob(self) -> bytes:
+        return header_line(self.header) + self.payload
+
+    def changes(self) -> Iterator[Change]:
+        body = codec(self.header["codec"]).decompress(self.payload)
+        if hashlib.sha256(body).hexdigest() != self.header["sha256"]:
+            raise ValueError(f"batch {self.batch_id}: body hash mismatch")
+        return decode_changes(body)
+
+
+def header_line(header: dict[str, Any]) -> bytes:
+    return json.dumps(header, sort_keys=True, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def build_batch(
+    changes: list[Change],
+    origin: str,
+    profile_id: str,
+    seq: int,
+    base: str,
+    state: str,
+    codec_name: str | None = None,
+) -> Batch:
+    c = codec(codec_name)
+    body = encode_changes(changes)
+    added = sum(1 for op, _ in changes if op == "+")
+    header = {
+        "v": VERSION,
+        "kind": KIND_LIST_DELTA,
+        "origin": origin,
+        "profile": profile_id,
+        "seq": seq,
+        "base": base,
+        "state": state,
+        "added": added,
+        "removed": len(changes) - added,
+        "codec": c.name,
+        "sha256": hashlib.sha256(body).hexdigest(),
+    }
+    payload = c.compress(body)
+    return Batch(hashlib.sha256(header_line(header) + payload).hexdigest(), header, payload)
+
+
+def parse_batch(blob: bytes, batch_id: str | None = None) -> Batch:
+    """Split a `.wsf` blob; `batch_id`, if given, must be its content hash."""
+    digest = hashlib.sha256(blob).hexdigest()
+    if batch_id is not None and batch_id != digest:
+        raise ValueError(f"batch {batch_id}: content hash is {digest}")
+    head, sep, payload = blob.partition(b"\n")
+    if not sep:
+        raise ValueError("batch has no header line")
+    header = json.loads(head)
+    if header.get("v") != VERSION or header.get("kind") != KIND_LIST_DELTA:
+        raise ValueError(f"unsupported batch v={header.get('v')} kind={header.get('kind')}")
+    return Batch(digest, header, payload)
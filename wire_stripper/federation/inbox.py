@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import ipaddress
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from wire_stripper.db.store import Store
+from wire_stripper.enrich.lpm import normalize_asn
+from wire_stripper.federation.batch import Batch, parse_batch
+from wire_stripper.federation.outbox import CREATED_BY_PREFIX, EMPTY_STATE, node_id
+from wire_stripper.federation.sinks import BATCH_SUFFIX
+from wire_stripper.policy.snapshot import is_hostname, normalize_host
+
+# Importer side of federation. Batches from one origin/profile are applied
+# strictly in `seq` order; federation_peer remembers the last applied seq
+# (and the state hash it led to, checked against the next batch's base), so
+# re-running over the same directory is a header scan. A batch is applied
+# in a single transaction: adds as one executemany upsert that leaves
+# existing local entries alone, removes as one executemany DELETE
+# restricted to rows this origin created, plus the new position.
+
+INSERT_PEER_ENTRY_SQL = (
+    "INSERT INTO list_entry(entry_id, profile_id, list_type, target_type, target_value, "
+    "reason, created_at, created_by) VALUES(?,?,?,?,?,?,?,?) "
+    "ON CONFLICT(profile_id, list_type, target_type, target_value) DO NOTHING"
+)
+DELETE_PEER_ENTRY_SQL = (
+    "DELETE FROM list_entry WHERE profile_id=? AND list_type=? AND target_type=? "
+    "AND target_value=? AND created_by=?"
+)
+UPSERT_PEER_SQL = (
+    "INSERT INTO federation_peer(origin, profile_id, seq, state, batches, updated_at) "
+    "VALUES(?,?,?,?,1,?) ON CONFLICT(origin, profile_id) DO UPDATE SET "
+    "seq=excluded.seq, state=excluded.state, batches=batches+1, "
+    "updated_at=excluded.updated_at"
+)
+
+
+@dataclass
+class ImportResult:
+    applied: int = 0
+    added: int = 0
+    removed: int = 0
+    waiting: int = 0  # a batch with a lower seq is missing
+    invalid: int = 0  # unreadable, or its base does not match the applied state
+    rejected: int = 0  # changes inside applied batches with an unknown type or bad value
+
+
+def _read_header(path: Path) -> dict[str, Any] | None:
+    try:
+        with path.open("rb") as fh:
+            header = json.loads(fh.readline())
+    except (OSError, ValueError):
+        return None
+    return header if isinstance(header, dict) else None
+
+
+LIST_TYPES = frozenset({"white", "black", "grey"})
+# Longest rule name / entity id accepted from a peer.
+_MAX_NAME = 256
+
+
+def _is_name(value: str) -> bool:
+    return 0 < len(value) <= _MAX_NAME and value.isprintable() and not value.isspace()
+
+
+def _normalize_target(target_type: str, value: str) -> str | None:
+    """Canonical form of a peer's target value, or None if it is not valid.
+
+    Peer values end up in snapshots and enforcer exports, so they get the
+    same checks local entries are held to.
+    """
+    if target_type == "domain":
+        host = normalize_host(value)
+        return host if is_hostname(host) else None
+    if target_type == "ip":
+        try:
+            return str(ipaddress.ip_address(value))
+        except ValueError:
+            return None
+    if target_type == "prefix":
+        try:
+            return str(ipaddress.ip_network(value, strict=False))
+        except ValueError:
+            return None
+    if target_type == "asn":
+        asn = normalize_asn(value)
+        return asn if asn is not None and asn.isdigit() and int(asn) < 2**32 else None
+    if target_type in ("entity", "cookie", "header"):
+        return value if _is_name(value) else None
+    return None
+
+
+def apply_batch(
+    store: Store, batch: Batch, profile_id: str = "default"
+) -> tuple[int, int, int]:
+    """Apply one peer batch to `profile_id`'s lists. Returns (added, removed, rejected)."""
+    origin = batch.header["origin"]
+    created_by = CREATED_BY_PREFIX + origin
+    reason = f"peer {origin} ({batch.header['profile']})"
+    now = store.now()
+    adds: list[tuple[Any, ...]] = []
+    removes: list[tuple[Any, ...]] = []
+    rejected = 0
+    for op, (list_type, target_type, raw) in batch.changes():
+        value = _normalize_target(target_type, raw) if list_type in LIST_TYPES else None
+        if value is None:
+            rejected += 1
+            continue
+        if op == "+":
+            adds.append(
+                (
+                    f"fed:{batch.batch_id[:16]}:{len(adds)}",
+                    profile_id,
+                    list_type,
+                    target_type,
+                    value,
+                    reason,
+                    now,
+                    created_by,
+                )
+            )
+        else:
+            removes.append((profile_id, list_type, target_type, value, created_by))
+    with store.transaction() as conn:
+        # rowcount, not total_changes: the list_generation triggers count there.
+        removed = conn.executemany(DELETE_PEER_ENTRY_SQL, removes).rowcount if removes else 0
+        added = conn.executemany(INSERT_PEER_ENTRY_SQL, adds).rowcount if adds else 0
+        conn.execute(
+            UPSERT_PEER_SQL,
+            (origin, batch.header["profile"], batch.header["seq"], batch.header["state"], now),
+        )
+    return added, removed, rejected
+
+
+def import_batches(
+    store: Store, directory: str | os.PathLike[str], profile_id: str = "default"
+) -> ImportResult:
+    """Apply the `.wsf` batches in `directory` that follow each peer's last applied seq.
+
+    Entries land in the local `profile_id` with created_by
+    'federation:<origin>'. Our own batches (same node id) are ignored.
+    """
+    result = ImportResult()
+    me = node_id(store)
+    chains: dict[tuple[str, str], dict[int, Path]] = {}
+    for path in sorted(Path(directory).glob(f"*{BATCH_SUFFIX}")):
+        header = _read_header(path)
+        if (
+            header is None
+            or not {"origin", "profile", "seq", "base", "state"} <= header.keys()
+            or type(header["seq"]) is not int
+        ):
+            result.invalid += 1
+            continue
+        if header["origin"] == me:
+            continue
+        chains.setdefault((header["origin"], header["profile"]), {})[header["seq"]] = path
+
+    with store.reader() as conn:
+        positions = {
+            (origin, profile): (seq, state)
+            for origin, profile, seq, state in conn.execute(
+                "SELECT origin, profile_id, seq, state FROM federation_peer"
+            )
+        }
+
+    for chain_key, by_seq in chains.items():
+        seq, state = positions.get(chain_key, (0, EMPTY_STATE))
+        while seq + 1 in by_seq:
+            path = by_seq[seq + 1]
+            try:
+                batch = parse_batch(path.read_bytes(), path.name[: -len(BATCH_SUFFIX)])
+                if batch.header["base"] != state:
+                    raise ValueError(f"seq {seq + 1} does not follow the applied state")
+                added, removed, rejected = apply_batch(store, batch, profile_id)
+            except (OSError, ValueError, KeyError):
+                result.invalid += 1
+                break
+            result.applied += 1
+            result.added += added
+            result.removed += removed
+            result.rejected += rejected
+            seq, state = seq + 1, batch.header["state"]
+        # Lower seqs were applied on earlier runs; higher ones wait for a gap.
+        result.waiting += sum(1 for s in by_seq if s > seq)
+    return result
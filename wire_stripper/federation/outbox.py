@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import sqlite3
+import tempfile
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator
+
+from wire_stripper.db.store import Store
+from wire_stripper.federation.batch import KIND_LIST_DELTA, Batch, Change, Key, build_batch
+from wire_stripper.federation.sinks import Sink
+from wire_stripper.fsutil import write_atomic
+
+# Publisher side of federation. `enqueue_list_delta` merge-diffs the
+# profile's current list entries (streamed in UNIQUE-index order) against a
+# sorted state file of what was last published, and queues only the
+# difference as one batch, so any number of edits between runs coalesce
+# into one delta and an unchanged list generation costs nothing. Entries a
+# peer gave us (created_by 'federation:*') are never re-published.
+# `publish_pending` hands due batches to a Sink and tracks status/retries
+# in federation_outbox.
+#
+# The outbox row is the source of truth for the publisher's position: the
+# state file is rewritten after the row commits, so a crash in between
+# leaves the file one batch behind. `_roll_forward` replays the committed
+# batches onto the file before the next diff, so a later list change never
+# produces a second, different batch under the same seq.
+
+PRIVACY_LEVEL = "lists"
+EMPTY_STATE = hashlib.sha256(b"").hexdigest()
+CREATED_BY_PREFIX = "federation:"
+
+_SENTINEL: Key = ("\uffff", "", "")
+
+
+def federation_dir(store: Store) -> Path:
+    return store.paths.root / "federation"
+
+
+def node_id(store: Store) -> str:
+    """Stable id of this publisher (the `origin` of its batches)."""
+    path = federation_dir(store) / "node_id"
+    try:
+        return path.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        write_atomic(path, [uuid.uuid4().hex + "\n"])
+        return path.read_text(encoding="utf-8").strip()
+
+
+def _state_path(store: Store, profile_id: str) -> Path:
+    return federation_dir(store) / f"{profile_id}.state"
+
+
+def _read_state_header(path: Path) -> dict[str, str]:
+    try:
+        with path.open("r", encoding="utf-8") as fh:
+            first = fh.readline()
+    except OSError:
+        return {}
+    if not first.startswith("#"):
+        return {}
+    return dict(kv.split("=", 1) for kv in first[1:].split() if "=" in kv)
+
+
+def _iter_state(path: Path) -> Iterator[Key]:
+    try:
+        fh = path.open("r", encoding="utf-8")
+    except OSError:
+        return
+    with fh:
+        for line in fh:
+            if line.startswith("#"):
+                continue
+            t, tt, v = line.rstrip("\n").split("\t", 2)
+            yield t, tt, v
+
+
+def _roll_forward(store: Store, path: Path, profile_id: str) -> None:
+    """Apply outbox batches newer than the state file's seq to the state file."""
+    prev = _read_state_header(path)
+    seq = int(prev.get("seq", 0))
+    state = prev.get("state", EMPTY_STATE)
+    with store.reader() as conn:
+        rows = conn.execute(
+            "SELECT id, payload_json, payload FROM federation_outbox WHERE kind=? "
+            "AND json_extract(payload_json, '$.origin')=? "
+            "AND json_extract(payload_json, '$.profile')=? "
+            "AND json_extract(payload_json, '$.seq')>? "
+            "ORDER BY json_extract(payload_json, '$.seq')",
+            (KIND_LIST_DELTA, node_id(store), profile_id, seq),
+        ).fetchall()
+    for batch_id, header_json, payload in rows:
+        batch = Batch(batch_id, json.loads(header_json), payload)
+        if batch.header["seq"] != seq + 1 or batch.header["base"] != state:
+            raise RuntimeError(
+                f"federation state {path} (seq {seq}) does not lead to outbox batch "
+                f"{batch_id} (seq {batch.header['seq']})"
+            )
+        removed: set[Key] = set()
+        added: list[Key] = []
+        for op, key in batch.changes():
+            (added.append if op == "+" else removed.add)(key)
+        added.sort()
+        digest = hashlib.sha256()
+        count = 0
+        with tempfile.TemporaryFile("w+", encoding="utf-8", dir=path.parent) as state_tmp:
+            for key in heapq.merge(
+                (k for k in _iter_state(path) if k not in removed), added
+            ):
+                line = "\t".join(key) + "\n"
+                digest.update(line.encode("utf-8"))
+                state_tmp.write(line)
+                count += 1
+            state = digest.hexdigest() if count else EMPTY_STATE
+            if state != batch.header["state"]:
+                raise RuntimeError(f"replaying outbox batch {batch_id} onto {path} gave {state}")
+            seq += 1
+            state_tmp.seek(0)
+            # No generation: the next enqueue rescans instead of skipping.
+            head = f"# state={state} seq={seq} entries={count} profile={profile_id}\n"
+            write_atomic(path, _chain(head, state_tmp))
+
+
+def iter_published_entries(
+    conn: sqlite3.Connection, profile_id: str, now: str
+) -> Iterator[Key]:
+    """Publishable entries ordered by (list_type, target_type, target_value)."""
+    cur = conn.execute(
+        "SELECT list_type, target_type, target_value FROM list_entry WHERE profile_id=? "
+        "AND (created_by IS NULL OR created_by NOT LIKE ?) "
+        "AND (expires_at IS NULL OR expires_at > ?) "
+        "ORDER BY list_type, target_type, target_value",
+        (profile_id, CREATED_BY_PREFIX + "%", now),
+    )
+    for list_type, target_type, value in cur:
+        # Tabs/newlines would break the line formats; such values are not
+        # domains, IPs or rule names anyway.
+        if "\t" in value or "\n" in value:
+            continue
+        yield list_type, target_type, value
+
+
+def _diff(old: Iterator[Key], new: Iterator[Key]) -> Iterator[Change]:
+    """Merge-join two sorted key streams into ('+'|'-', key) changes."""
+    a, b = next(old, _SENTINEL), next(new, _SENTINEL)
+    while a != _SENTINEL or b != _SENTINEL:
+        if a == b:
+            a, b = next(old, _SENTINEL), next(new, _SENTINEL)
+        elif b == _SENTINEL or (a != _SENTINEL and a < b):
+            yield "-", a
+            a = next(old, _SENTINEL)
+        else:
+            yield "+", b
+            b = next(new, _SENTINEL)
+
+
+@dataclass(frozen=True)
+class EnqueueResult:
+    batch_id: str | None
+    entries: int
+    added: int = 0
+    removed: int = 0
+    payload_bytes: int = 0
+    skipped: bool = False
+
+
+def enqueue_list_delta(
+    store: Store,
+    profile_id: str = "default",
+    codec_name: str | None = None,
+    force: bool = False,
+) -> EnqueueResult:
+    """Queue the changes to `profile_id`'s lists since the last enqueue as one batch.
+
+    The first run publishes the whole list (seq 1, base = EMPTY_STATE);
+    later runs only the delta, under the next seq. Skipped without scanning
+    when the list generation has not moved, unless `force`. The state file
+    is only replaced after the batch is committed to the outbox; if a crash
+    came in between, the committed batch is replayed onto the file first.
+    """
+    generation = store.list_generation()
+    path = _state_path(store, profile_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _roll_forward(store, path, profile_id)
+    prev = _read_state_header(path)
+    if not force and prev.get("generation") == str(generation):
+        return EnqueueResult(None, int(prev.get("entries", 0)), skipped=True)
+
+    base = prev.get("state", EMPTY_STATE)
+    seq = int(prev.get("seq", 0))
+    digest = hashlib.sha256()
+    count = 0
+    with tempfile.TemporaryFile("w+", encoding="utf-8", dir=path.parent) as state_tmp:
+
+        def counted(keys: Iterator[Key]) -> Iterator[Key]:
+            nonlocal count
+            for key in keys:
+                line = "\t".join(key) + "\n"
+                digest.update(line.encode("utf-8"))
+                state_tmp.write(line)
+                count += 1
+                yield key
+
+        with store.reader() as conn:
+            changes = list(
+                _diff(
+                    _iter_state(path),
+                    counted(iter_published_entries(conn, profile_id, store.now())),
+                )
+            )
+        state = digest.hexdigest() if count else EMPTY_STATE
+
+        batch: Batch | None = None
+        if changes:
+            seq += 1
+            batch = build_batch(
+                changes, node_id(store), profile_id, seq, base, state, codec_name
+            )
+            with store.transaction() as conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO federation_outbox"
+                    "(id, ts, kind, payload_json, privacy_level, status, payload) "
+                    "VALUES(?,?,?,?,?,'pending',?)",
+                    (
+                        batch.batch_id,
+                        store.now(),
+                        batch.header["kind"],
+                        json.dumps(batch.header, sort_keys=True),
+                        PRIVACY_LEVEL,
+                        batch.payload,
+                    ),
+                )
+
+        state_tmp.seek(0)
+        head = (
+            f"# state={state} seq={seq} generation={generation} entries={count} "
+            f"profile={profile_id}\n"
+        )
+        write_atomic(path, _chain(head, state_tmp))
+
+    if batch is None:
+        return EnqueueResult(None, count)
+    return EnqueueResult(
+        batch.batch_id,
+        count,
+        batch.header["added"],
+        batch.header["removed"],
+        len(batch.payload),
+    )
+
+
+def _chain(head: str, fh) -> Iterator[str]:
+    yield head
+    while True:
+        block = fh.read(1 << 16)
+        if not block:
+            return
+        yield block
+
+
+@dataclass(frozen=True)
+class PublishResult:
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+def publish_pending(
+    store: Store,
+    sink: Sink,
+    limit: int = 100,
+    max_attempts: int = 8,
+    backoff: float = 30.0,
+) -> PublishResult:
+    """Send due outbox batches (oldest first) to `sink`.
+
+    A failed send is retried after `backoff * 2**(attempts-1)` seconds
+    (capped at one hour) and marked 'failed' after `max_attempts`.
+    """
+    now = store.now()
+    with store.reader() as conn:
+        due = conn.execute(
+            "SELECT id, payload_json, payload, attempts FROM federation_outbox "
+            "WHERE status IN ('pending', 'retry') "
+            "AND (next_attempt_at IS NULL OR next_attempt_at <= ?) "
+            "ORDER BY ts, rowid LIMIT ?",
+            (now, limit),
+        ).fetchall()
+
+    sent: list[tuple[str, str]] = []
+    retry: list[tuple[str, int, str | None, str, str]] = []
+    failed = 0
+    for batch_id, header_json, payload, attempts in due:
+        batch = Batch(batch_id, json.loads(header_json), payload)
+        try:
+            sink.send(batch)
+        except Exception as e:
+            attempts += 1
+            if attempts >= max_attempts:
+                status, next_at = "failed", None
+                failed += 1
+            else:
+                delay = min(backoff * 2 ** (attempts - 1), 3600.0)
+                status = "retry"
+                next_at = (datetime.utcnow() + timedelta(seconds=delay)).isoformat(
+                    timespec="seconds"
+                )
+            retry.append((status, attempts, next_at, f"{type(e).__name__}: {e}", batch_id))
+            continue
+        sent.append((store.now(), batch_id))
+
+    with store.transaction() as conn:
+        conn.executemany(
+            "UPDATE federation_outbox SET status='sent', sent_at=?, last_error=NULL WHERE id=?",
+            sent,
+        )
+        conn.executemany(
+            "UPDATE federation_outbox SET status=?, attempts=?, next_attempt_at=?, last_error=? "
+            "WHERE id=?",
+            retry,
+        )
+    return PublishResult(len(sent), len(retry) - failed, failed)
+
+
+def outbox_status(store: Store) -> dict[str, dict[str, int]]:
+    """{status: {"batches": n, "bytes": payload bytes}}."""
+    with store.reader() as conn:
+        rows = conn.execute(
+            "SELECT status, count(*), coalesce(sum(length(payload)), 0) "
+            "FROM federation_outbox GROUP BY status"
+        ).fetchall()
+    return {status: {"batches": n, "bytes": size} for status, n, size in rows}
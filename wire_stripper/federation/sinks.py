@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import os
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Protocol
+
+from wire_stripper.federation.batch import Batch, parse_batch
+from wire_stripper.fsutil import write_atomic
+
+BATCH_SUFFIX = ".wsf"
+BATCH_ID_HEADER = "X-Wire-Stripper-Batch"
+MAX_BATCH_BYTES = 64 << 20
+
+
+class Sink(Protocol):
+    """Where published batches go. `send` raises to have the batch retried."""
+
+    def send(self, batch: Batch) -> None: ...
+
+
+class DirectorySink:
+    """Drops each batch as `<directory>/<batch_id>.wsf` (a shared or synced dir)."""
+
+    def __init__(self, directory: str | os.PathLike[str]):
+        self.directory = Path(directory)
+
+    def send(self, batch: Batch) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{batch.batch_id}{BATCH_SUFFIX}"
+        if not path.exists():  # content-addressed: same name, same bytes
+            write_atomic(path, batch.blob)
+
+
+class HttpSink:
+    """POSTs each batch to `url` (e.g. a peer's `federation serve`)."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, batch: Batch) -> None:
+        req = urllib.request.Request(
+            self.url,
+            data=batch.blob,
+            method="POST",
+            headers={
+                "Content-Type": "application/octet-stream",
+                BATCH_ID_HEADER: batch.batch_id,
+            },
+        )
+        # Non-2xx responses raise HTTPError.
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            resp.read()
+
+
+class BatchReceiver:
+    """Local HTTP stand-in for a peer: verified POSTed batches land in `directory`.
+
+    `wire-strip federation import --dir DIRECTORY` then applies them.
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike[str],
+        host: str = "127.0.0.1",
+        port: int = 9470,
+    ):
+        self.sink = DirectorySink(directory)
+        self.host = host
+        self.port = port
+        self.received = 0
+        self._httpd: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                if length <= 0 or length > MAX_BATCH_BYTES:
+                    self.send_error(413 if length > 0 else 411)
+                    return
+                blob = self.rfile.read(length)
+                try:
+                    batch = parse_batch(blob, self.headers.get(BATCH_ID_HEADER))
+                except ValueError as e:
+                    self.send_error(400, str(e))
+                    return
+                receiver.sink.send(batch)
+                receiver.received += 1
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def start(self) -> "BatchReceiver":
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]  # resolves port 0
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="wire-stripper-federation-http", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
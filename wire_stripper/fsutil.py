@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from functools import cache
+from pathlib import Path
+from typing import Iterable, Iterator
+
+# Every file other processes read while we may be rewriting it (exports,
+# snapshots, archives, federation batches, metrics dumps) is written to a
+# temp file in the same directory and renamed over the target, so readers
+# see the old file or the new one, never a prefix.
+
+
+@cache
+def _umask() -> int:
+    # os.umask can only be read by setting it; done once, at the first write.
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+def _target_mode(target: Path) -> int:
+    """Mode the renamed file should get: the old file's, else 0o666 & ~umask.
+
+    mkstemp creates 0600 files and os.replace keeps that, which would hide
+    exports and snapshots from readers running as another user.
+    """
+    try:
+        return stat.S_IMODE(target.stat().st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_umask()
+
+
+@contextmanager
+def atomic_path(path: str | os.PathLike[str]) -> Iterator[Path]:
+    """Yield a temp path next to `path`; it replaces `path` if the block succeeds.
+
+    For writers that open the file themselves (pyarrow, sqlite); the temp
+    file is removed if the block raises. The result keeps the mode of the
+    file it replaces, or gets the umask default for a new file.
+    """
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{target.name}.", dir=target.parent)
+    os.close(fd)
+    try:
+        yield Path(tmp)
+        os.chmod(tmp, _target_mode(target))
+        os.replace(tmp, target)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def write_atomic(
+    path: str | os.PathLike[str],
+    data: str | bytes | Iterable[str | bytes],
+    fsync: bool = True,
+) -> None:
+    """Write `data` (text is UTF-8, newlines untranslated) and rename it over `path`.
+
+    `data` may be one str/bytes or an iterable of chunks, so large exports
+    stream. `fsync=False` skips the flush to disk for files that only need
+    to be consistent, not durable (e.g. metrics dumps).
+    """
+    chunks = (data,) if isinstance(data, (str, bytes)) else data
+    with atomic_path(path) as tmp, open(tmp, "wb") as fh:
+        for chunk in chunks:
+            fh.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        if fsync:
+            fh.flush()
+            os.fsync(fh.fileno())
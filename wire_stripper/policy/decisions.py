@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Iterable, TypeVar
+
+V = TypeVar("V")
+
+# (bucket, profile_id, hostname, effective_action, matched_rule); NULLs as ''.
+CounterKey = tuple[str, str, str, str, str]
+
+
+class DecisionCache(Generic[V]):
+    """Bounded LRU of evaluation results with a TTL, tied to one list generation.
+
+    Entries are only valid for the snapshot generation they were computed
+    against; `get()` with a different generation empties the cache first, so
+    list changes are never served stale. `max_entries=0` disables caching.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation: int | None = None
+        self._entries: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self, generation: int | None = None) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.generation = generation
+
+    def get(self, key: Hashable, generation: int) -> V | None:
+        with self._lock:
+            if generation != self.generation:
+                self._entries.clear()
+                self.generation = generation
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: V, generation: int) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def minute_bucket(ts: str) -> str:
+    """'YYYY-MM-DDTHH:MM:SS' -> 'YYYY-MM-DDTHH:MM:00'."""
+    return ts[:16] + ":00"
+
+
+class DecisionCounters:
+    """Aggregates decisions into per-minute counters instead of one row each.
+
+    Counts for the current minute accumulate in memory; as soon as a decision
+    for a later minute arrives, every older bucket is handed to
+    `emit(rows)` as `(bucket, profile_id, hostname, action, rule, count)`
+    tuples for an additive upsert. `flush_stale(now)` does the same on a
+    clock tick, so a quiet sensor's last minute is not held back until the
+    next decision; `flush()` emits everything (shutdown).
+    """
+
+    def __init__(self, emit: Callable[[list[tuple[Any, ...]]], Any]):
+        self.emit = emit
+        self.recorded = 0
+        self.emitted_rows = 0
+        self._counts: dict[CounterKey, int] = {}
+        self._bucket: str | None = None
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        ts: str,
+        profile_id: str,
+        hostname: str | None,
+        action: str,
+        matched_rule: str | None,
+        count: int = 1,
+    ) -> None:
+        bucket = minute_bucket(ts)
+        key = (bucket, profile_id or "", hostname or "", action or "", matched_rule or "")
+        ready: list[tuple[Any, ...]] = []
+        with self._lock:
+            if self._bucket is not None and bucket > self._bucket:
+                ready = self._drain(lambda k: k[0] < bucket)
+            if self._bucket is None or bucket > self._bucket:
+                self._bucket = bucket
+            self._counts[key] = self._counts.get(key, 0) + count
+            self.recorded += count
+        if ready:
+            self._emit(ready)
+
+    def flush_stale(self, ts: str) -> None:
+        """Emit every bucket older than the minute of `ts`."""
+        bucket = minute_bucket(ts)
+        with self._lock:
+            ready = self._drain(lambda k: k[0] < bucket)
+        if ready:
+            self._emit(ready)
+
+    def flush(self) -> None:
+        with self._lock:
+            ready = self._drain(lambda k: True)
+        if ready:
+            self._emit(ready)
+
+    def _drain(self, pick: Callable[[CounterKey], bool]) -> list[tuple[Any, ...]]:
+        keys = [k for k in self._counts if pick(k)]
+        return [(*k, self._counts.pop(k)) for k in keys]
+
+    def _emit(self, rows: Iterable[tuple[Any, ...]]) -> None:
+        rows = list(rows)
+        self.emitted_rows += len(rows)
+        self.emit(rows)
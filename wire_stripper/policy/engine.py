@@ -1,11 +1,22 @@
 from __future__ import annotations
 
-import json
+import os
+import threading
+import time
 import uuid
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Mapping
 
-from wire_stripper.db.store import Store
+from wire_stripper.db.store import INSERT_DECISION_COUNTER_SQL, INSERT_DECISION_SQL, Store
+from wire_stripper.db.writer import BatchWriter
+from wire_stripper.enrich.entities import EntityIndex, entity_generation
+from wire_stripper.enrich.lpm import PrefixIndex, load_asn_index
+from wire_stripper.policy.decisions import DecisionCache, DecisionCounters
+from wire_stripper.policy.mapped import SnapshotFile
+from wire_stripper.policy.snapshot import PolicySnapshot, normalize_host
+from wire_stripper.policy.stripping import StripRules
+from wire_stripper.telemetry import metrics
+from wire_stripper.telemetry.metrics import REGISTRY, perf_ns
 
 
 @dataclass(frozen=True)
@@ -16,60 +27,298 @@ class DecisionResult:
     confidence: float
 
 
+DECISION_MODES = ("rows", "counters")
+
+_DOMAIN_ACTIONS = {
+    "white": ("allow", "whitelisted domain", 1.0),
+    "black": ("block", "blocked domain", 0.95),
+    "grey": ("quarantine", "greylisted domain", 0.7),
+}
+
+# Entity rules apply to the flow's entity and all its ancestors (nearest
+# first); at the same entity whitelist overrides blacklist overrides greylist.
+_ENTITY_ACTIONS = {
+    "white": ("allow", "whitelisted entity", 0.9),
+    "black": ("block", "blocked entity", 0.75),
+    "grey": ("quarantine", "greylisted entity", 0.6),
+}
+
+_EVALUATE_TIME = REGISTRY.histogram(
+    "wire_stripper_policy_evaluate_seconds", "PolicyEngine.evaluate latency"
+)
+_RECORD_TIME = REGISTRY.histogram(
+    "wire_stripper_policy_record_decision_seconds", "PolicyEngine.record_decision latency"
+)
+_DECISIONS = {
+    action: REGISTRY.counter(
+        "wire_stripper_decisions_total", "Recorded decisions by effective action", action=action
+    )
+    for action in ("allow", "block", "quarantine")
+}
+
+
 class PolicyEngine:
-    def __init__(self, store: Store, profile_id: str = "default"):
+    def __init__(
+        self,
+        store: Store,
+        profile_id: str = "default",
+        refresh_interval: float = 1.0,
+        writer: BatchWriter | None = None,
+        decision_cache_size: int = 10_000,
+        decision_cache_ttl: float = 60.0,
+        decision_mode: str = "rows",
+        auto_refresh: bool = True,
+        snapshot_file: str | os.PathLike[str] | None = None,
+    ):
+        if decision_mode not in DECISION_MODES:
+            raise ValueError(f"decision_mode must be one of {DECISION_MODES}")
         self.store = store
         self.profile_id = profile_id
+        # When set, decisions are queued for the background writer instead of committed inline.
+        self.writer = writer
+        # How often (seconds) evaluate() may poll the list generation counter.
+        self.refresh_interval = refresh_interval
+        # False: evaluate() never touches SQLite once warm; the host calls
+        # poll() itself (e.g. from an executor in async code).
+        self.auto_refresh = auto_refresh
+        # Sharded proxy workers map the snapshot the writer process compiles
+        # (policy.mapped) instead of loading list_entry from SQLite themselves.
+        self.snapshot_file = SnapshotFile(snapshot_file) if snapshot_file else None
+        self._snapshot: PolicySnapshot | None = None
+        self._strip_rules: StripRules | None = None
+        self._asn_index: PrefixIndex[str] | None = None
+        self._asn_generation = -1
+        self._asn_loader: threading.Thread | None = None
+        self._entity_index: EntityIndex | None = None
+        self._next_check = 0.0
+        self._reload_lock = threading.Lock()
+        # (hostname, dst_ip) -> DecisionResult for the current list generation.
+        self.decisions: DecisionCache[DecisionResult] = DecisionCache(
+            decision_cache_size, decision_cache_ttl
+        )
+        # "rows": one `decision` row per request; "counters": per-minute
+        # `decision_counter` increments.
+        self.decision_mode = decision_mode
+        self.counters = DecisionCounters(self._emit_counters)
 
-    def _match_list(
-        self, list_type: str, target_type: str, target_value: str
-    ) -> Optional[str]:
-        row = self.store.conn.execute(
-            "SELECT entry_id FROM list_entry WHERE profile_id=? AND list_type=? AND target_type=? AND target_value=?",
-            (self.profile_id, list_type, target_type, target_value),
-        ).fetchone()
-        return row[0] if row else None
+    @property
+    def snapshot(self) -> PolicySnapshot:
+        snap = self._snapshot
+        if snap is None or (self.auto_refresh and time.monotonic() >= self._next_check):
+            snap = self._maybe_reload()
+        return snap
 
-    def evaluate(self, hostname: str | None, dst_ip: str | None) -> DecisionResult:
-        # Precedence: whitelist overrides everything.
-        if hostname:
-            wl = self._match_list("white", "domain", hostname)
-            if wl:
-                return DecisionResult("allow", wl, "whitelisted domain", 1.0)
+    def _maybe_reload(self, force: bool = False) -> PolicySnapshot:
+        with self._reload_lock:
+            snap = self._snapshot
+            if self.snapshot_file is not None:
+                loaded = self.snapshot_file.poll(force)
+            else:
+                generation = self.store.list_generation()
+                loaded = None
+                if force or snap is None or snap.generation != generation:
+                    with self.store.reader() as conn:
+                        loaded = PolicySnapshot.load(conn, self.profile_id, generation)
+            if loaded is not None and loaded is not snap:
+                snap = loaded
+                self._strip_rules = StripRules.compile(snap)
+                # Single reference assignment: readers see the old or new snapshot, never a mix.
+                self._snapshot = snap
+            if (
+                self._asn_index is not None
+                and self._asn_loader is None
+                and self.store.prefix_generation() != self._asn_generation
+            ):
+                if force:
+                    self.reload_asn_index()
+                else:
+                    # A full load takes seconds on a large prefix table and
+                    # this may be running inside evaluate(): build the new
+                    # index on a thread and keep using the old one until then.
+                    self._asn_loader = threading.Thread(
+                        target=self._rebuild_asn_index,
+                        name="wire-stripper-asn-index",
+                        daemon=True,
+                    )
+                    self._asn_loader.start()
+            # Loaded here rather than on first use, so evaluate() never reads
+            # SQLite for it when the host polls from an executor.
+            if snap.has_entity_rules:
+                index = self._entity_index
+                if index is None:
+                    self.reload_entity_index()
+                else:
+                    with self.store.reader() as conn:
+                        moved = entity_generation(conn) != index.generation
+                    if moved:
+                        self.reload_entity_index()
+            # Polls double as the clock for counters of minutes that are over.
+            self.counters.flush_stale(self.store.now())
+            self._next_check = time.monotonic() + self.refresh_interval
+            return snap
 
-            bl = self._match_list("black", "domain", hostname)
-            if bl:
-                return DecisionResult("block", bl, "blocked domain", 0.95)
+    @property
+    def strip_rules(self) -> StripRules:
+        """Cookie/header stripping matcher compiled for the current snapshot."""
+        snap = self.snapshot
+        rules = self._strip_rules
+        if rules is None or rules.snapshot is not snap:
+            rules = self._strip_rules = StripRules.compile(snap)
+        return rules
 
-            gl = self._match_list("grey", "domain", hostname)
-            if gl:
-                return DecisionResult("quarantine", gl, "greylisted domain", 0.7)
+    def refresh(self) -> PolicySnapshot:
+        """Rebuild the snapshot now, regardless of the polling interval."""
+        return self._maybe_reload(force=True)
+
+    def poll(self) -> PolicySnapshot:
+        """Reload the snapshot if the list generation moved (blocking I/O)."""
+        return self._maybe_reload()
+
+    def warm(self) -> None:
+        """Load the snapshot and indexes up front so evaluate() stays in memory."""
+        self.poll()
+        _ = self.asn_index
+
+    @property
+    def asn_index(self) -> PrefixIndex[str]:
+        """prefix -> origin ASN, built lazily from the `prefix` table.
+
+        Once built, poll() rebuilds it on a background thread whenever
+        `prefix_generation` moves and swaps it in when done; refresh()
+        rebuilds it inline.
+        """
+        index = self._asn_index
+        if index is None:
+            index = self.reload_asn_index()
+        return index
+
+    def reload_asn_index(self) -> PrefixIndex[str]:
+        # Generation first: a change racing the load is picked up next poll.
+        generation = self.store.prefix_generation()
+        with self.store.reader() as conn:
+            self._asn_index = load_asn_index(conn)
+        self._asn_generation = generation
+        self.decisions.clear()
+        return self._asn_index
+
+    def _rebuild_asn_index(self) -> None:
+        try:
+            self.reload_asn_index()
+        finally:
+            self._asn_loader = None
+
+    @property
+    def entity_index(self) -> EntityIndex:
+        """domain/ip/asn/prefix -> entity and ancestor chains (enrich.entities)."""
+        index = self._entity_index
+        if index is None:
+            index = self.reload_entity_index()
+        return index
+
+    def reload_entity_index(self) -> EntityIndex:
+        with self.store.reader() as conn:
+            self._entity_index = EntityIndex.load(conn)
+        self.decisions.clear()
+        return self._entity_index
+
+    def evaluate(self, hostname: str | None, dst_ip: str | None) -> DecisionResult:
+        t0 = perf_ns() if metrics.ENABLED else 0
+        snap = self.snapshot
+        key = (hostname, dst_ip)
+        result = self.decisions.get(key, snap.generation)
+        if result is None:
+            result = self._evaluate(snap, hostname, dst_ip)
+            self.decisions.put(key, result, snap.generation)
+        if t0:
+            _EVALUATE_TIME.observe_ns(perf_ns() - t0)
+        return result
+
+    def _evaluate(
+        self, snap: PolicySnapshot, hostname: str | None, dst_ip: str | None
+    ) -> DecisionResult:
+        # Precedence: the most specific listed domain wins; at equal specificity
+        # whitelist overrides blacklist overrides greylist.
+        if hostname:
+            hit = snap.match_domain(hostname)
+            if hit:
+                list_type, entry_id, matched = hit
+                action, label, confidence = _DOMAIN_ACTIONS[list_type]
+                if matched != normalize_host(hostname):
+                    label = f"{label} ({matched})"
+                return DecisionResult(action, entry_id, label, confidence)
 
         if dst_ip:
-            wl = self._match_list("white", "ip", dst_ip)
+            wl = snap.match("white", "ip", dst_ip)
             if wl:
                 return DecisionResult("allow", wl, "whitelisted ip", 1.0)
 
-            bl = self._match_list("black", "ip", dst_ip)
+            wl = snap.match_prefix("white", dst_ip)
+            if wl:
+                return DecisionResult("allow", wl, "whitelisted prefix", 1.0)
+
+            asn = self.asn_index.get(dst_ip) if snap.has_asn_rules else None
+            if asn:
+                wl = snap.match("white", "asn", asn)
+                if wl:
+                    return DecisionResult("allow", wl, "whitelisted asn", 1.0)
+
+            bl = snap.match("black", "ip", dst_ip)
             if bl:
                 return DecisionResult("block", bl, "blocked ip", 0.9)
 
+            bl = snap.match_prefix("black", dst_ip)
+            if bl:
+                return DecisionResult("block", bl, "blocked prefix", 0.85)
+
+            if asn:
+                bl = snap.match("black", "asn", asn)
+                if bl:
+                    return DecisionResult("block", bl, "blocked asn", 0.8)
+
+        if snap.has_entity_rules:
+            hit = self._match_entity(snap, hostname, dst_ip)
+            if hit is not None:
+                return hit
+
         return DecisionResult("allow", None, "no matching rule", 0.5)
 
+    def _match_entity(
+        self, snap: PolicySnapshot, hostname: str | None, dst_ip: str | None
+    ) -> DecisionResult | None:
+        index = self.entity_index
+        asn = self.asn_index.get(dst_ip) if dst_ip and index.has_asns else None
+        entity_id = index.entity_for(hostname, dst_ip, asn)
+        if entity_id is None:
+            return None
+        for listed in index.chain(entity_id):
+            for list_type, (action, label, confidence) in _ENTITY_ACTIONS.items():
+                entry_id = snap.match(list_type, "entity", listed)
+                if entry_id:
+                    return DecisionResult(
+                        action, entry_id, f"{label} ({index.name(listed)})", confidence
+                    )
+        return None
+
     def record_decision(
         self,
         url: str | None,
         hostname: str | None,
         dst_ip: str | None,
         result: DecisionResult,
-    ) -> str:
-        decision_id = str(uuid.uuid4())
-        self.store.upsert(
-            "INSERT INTO decision(decision_id, ts, profile_id, url, hostname, dst_ip, effective_action, matched_rule, explanation, confidence) "
-            "VALUES(?,?,?,?,?,?,?,?,?,?)",
-            (
+    ) -> str | None:
+        """Persist one decision; returns its id, or None in counters mode."""
+        t0 = perf_ns() if metrics.ENABLED else 0
+        now = self.store.now()
+        decision_id: str | None = None
+        if self.decision_mode == "counters":
+            self.counters.add(
+                now, self.profile_id, hostname, result.action, result.matched_rule
+            )
+        else:
+            decision_id = str(uuid.uuid4())
+            params = (
                 decision_id,
-                self.store.now(),
+                now,
                 self.profile_id,
                 url,
                 hostname,
@@ -78,10 +327,43 @@ class PolicyEngine:
                 result.matched_rule,
                 result.explanation,
                 result.confidence,
-            ),
-        )
+            )
+            if self.writer is not None:
+                self.writer.submit("decision", params)
+            else:
+                self.store.upsert(INSERT_DECISION_SQL, params)
+        if t0:
+            _DECISIONS[result.action].inc()
+            _RECORD_TIME.observe_ns(perf_ns() - t0)
         return decision_id
 
+    def record_decision_counts(
+        self, counts: Mapping[tuple[str | None, DecisionResult], int]
+    ) -> None:
+        """Add a batch of pre-aggregated decisions ((hostname, result) -> n).
+
+        Always goes to the per-minute counters, whatever `decision_mode` is:
+        batch sensors aggregate before recording, so there is no per-request
+        row to write.
+        """
+        now = self.store.now()
+        for (hostname, result), n in counts.items():
+            self.counters.add(
+                now, self.profile_id, hostname, result.action, result.matched_rule, n
+            )
+            _DECISIONS[result.action].inc(n)
+
+    def _emit_counters(self, rows: list[tuple[Any, ...]]) -> None:
+        if self.writer is not None:
+            for row in rows:
+                self.writer.submit("decision_counter", row)
+        else:
+            self.store.executemany(INSERT_DECISION_COUNTER_SQL, rows)
+
+    def flush_decisions(self) -> None:
+        """Write out in-memory decision counters (call before shutdown)."""
+        self.counters.flush()
+
     def add_list_entry(
         self,
         list_type: str,
@@ -105,4 +387,7 @@ class PolicyEngine:
                 created_by,
             ),
         )
+        # Make the new entry visible to this engine immediately.
+        self._next_check = 0.0
+        self.decisions.clear()
         return entry_id
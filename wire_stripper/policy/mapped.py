@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from types import MappingProxyType
+from typing import Iterator, Mapping
+
+from wire_stripper.db.store import Store
+from wire_stripper.enrich.lpm import PrefixIndex
+from wire_stripper.fsutil import write_atomic
+from wire_stripper.policy.snapshot import PolicySnapshot
+
+# Compiled policy snapshot shared by proxy worker processes.
+#
+# Layout (little-endian):
+#   header  magic "WSP1", generation, slot count, domain count,
+#           slots/heap/meta offsets, meta length
+#   slots   open-addressing table (linear probing, load <= 0.5) keyed by
+#           crc32 of the normalized domain: hash, key offset/length, entry id
+#           offset/length, list code; key length 0 marks an empty slot
+#   heap    utf-8 domain names and entry ids
+#   meta    JSON: profile_id plus the small non-domain tables and prefixes
+#
+# Workers mmap the file read-only, so every process shares the same pages
+# and domain lookups probe the table in place instead of unpickling a dict.
+_MAGIC = b"WSP1"
+_HEADER = struct.Struct("<4sqIIQQQQ")
+_SLOT = struct.Struct("<IIHHIB3x")
+_LISTS = ("white", "black", "grey")
+_CODES = {name: i for i, name in enumerate(_LISTS)}
+
+
+def snapshot_path(root: str | os.PathLike[str], profile_id: str) -> Path:
+    return Path(root) / "policy" / f"{profile_id}.wsp"
+
+
+def write_snapshot_file(snapshot: PolicySnapshot, path: str | os.PathLike[str]) -> int:
+    """Atomically write `snapshot` for mapping by workers. Returns bytes written."""
+    domains = snapshot.domains
+    nslots = 8
+    while nslots < 2 * len(domains):
+        nslots *= 2
+    mask = nslots - 1
+
+    heap = bytearray()
+    slots = bytearray(nslots * _SLOT.size)
+    used = [False] * nslots
+    heap_off = _HEADER.size + len(slots)
+    for name, (list_type, entry_id) in domains.items():
+        key = name.encode("utf-8")
+        value = entry_id.encode("utf-8")
+        h = zlib.crc32(key)
+        i = h & mask
+        while used[i]:
+            i = (i + 1) & mask
+        used[i] = True
+        key_off = heap_off + len(heap)
+        heap += key
+        _SLOT.pack_into(
+            slots,
+            i * _SLOT.size,
+            h,
+            key_off,
+            len(key),
+            len(value),
+            key_off + len(key),
+            _CODES[list_type],
+        )
+        heap += value
+
+    meta = json.dumps(
+        {
+            "profile_id": snapshot.profile_id,
+            "tables": [
+                [list_type, target_type, dict(values)]
+                for (list_type, target_type), values in snapshot.tables.items()
+                if target_type != "domain"
+            ],
+            "prefixes": {lt: list(index.items()) for lt, index in snapshot.prefixes.items()},
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+    meta_off = heap_off + len(heap)
+    header = _HEADER.pack(
+        _MAGIC,
+        snapshot.generation,
+        nslots,
+        len(domains),
+        _HEADER.size,
+        heap_off,
+        meta_off,
+        len(meta),
+    )
+
+    write_atomic(path, (header, slots, heap, meta), fsync=False)
+    return meta_off + len(meta)
+
+
+def publish_snapshot(store: Store, profile_id: str) -> tuple[Path, int]:
+    """Compile the profile's current lists into its snapshot file.
+
+    Returns (path, generation). Run by the single writer process.
+    """
+    generation = store.list_generation()
+    with store.reader() as conn:
+        snapshot = PolicySnapshot.load(conn, profile_id, generation)
+    path = snapshot_path(store.paths.root, profile_id)
+    write_snapshot_file(snapshot, path)
+    return path, generation
+
+
+class MappedDomains(Mapping[str, tuple[str, str]]):
+    """Read-only domain -> (list_type, entry_id) view over a mapped snapshot."""
+
+    def __init__(self, buf: mmap.mmap, slots_off: int, nslots: int, count: int):
+        self._buf = buf
+        self._slots_off = slots_off
+        self._mask = nslots - 1
+        self._nslots = nslots
+        self._count = count
+
+    def get(  # type: ignore[override]
+        self, name: str, default: tuple[str, str] | None = None
+    ) -> tuple[str, str] | None:
+        if not self._count:
+            return default
+        key = name.encode("utf-8")
+        h = zlib.crc32(key)
+        buf, base, size, mask = self._buf, self._slots_off, _SLOT.size, self._mask
+        i = h & mask
+        while True:
+            sh, key_off, key_len, val_len, val_off, code = _SLOT.unpack_from(
+                buf, base + i * size
+            )
+            if key_len == 0:
+                return default
+            if sh == h and buf[key_off : key_off + key_len] == key:
+                return _LISTS[code], buf[val_off : val_off + val_len].decode("utf-8")
+            i = (i + 1) & mask
+
+    def __getitem__(self, name: str) -> tuple[str, str]:
+        hit = self.get(name)
+        if hit is None:
+            raise KeyError(name)
+        return hit
+
+    def __iter__(self) -> Iterator[str]:
+        buf, base, size = self._buf, self._slots_off, _SLOT.size
+        for i in range(self._nslots):
+            _, key_off, key_len, _, _, _ = _SLOT.unpack_from(buf, base + i * size)
+            if key_len:
+                yield buf[key_off : key_off + key_len].decode("utf-8")
+
+    def __len__(self) -> int:
+        return self._count
+
+
+def load_snapshot_file(path: str | os.PathLike[str]) -> PolicySnapshot:
+    """Map a file written by `write_snapshot_file` as a PolicySnapshot."""
+    with open(path, "rb") as fh:
+        buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, generation, nslots, count, slots_off, _heap_off, meta_off, meta_len = (
+        _HEADER.unpack_from(buf, 0)
+    )
+    if magic != _MAGIC:
+        raise ValueError(f"{path}: not a wire_stripper policy snapshot")
+    meta = json.loads(buf[meta_off : meta_off + meta_len])
+    prefixes: dict[str, PrefixIndex[str]] = {}
+    for list_type, items in meta["prefixes"].items():
+        index: PrefixIndex[str] = PrefixIndex()
+        for prefix, entry_id in items:
+            index.insert(prefix, entry_id)
+        prefixes[list_type] = index
+    return PolicySnapshot(
+        profile_id=meta["profile_id"],
+        generation=generation,
+        tables=MappingProxyType(
+            {(lt, tt): MappingProxyType(values) for lt, tt, values in meta["tables"]}
+        ),
+        prefixes=MappingProxyType(prefixes),
+        domains=MappedDomains(buf, slots_off, nslots, count),
+    )
+
+
+class SnapshotFile:
+    """Reloads a mapped snapshot when the file at `path` is replaced.
+
+    `poll()` costs one stat(); the writer process replaces the file
+    atomically, so a worker maps either the old or the new version.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]):
+        self.path = Path(path)
+        self._stamp: tuple[int, int, int] | None = None
+        self._snapshot: PolicySnapshot | None = None
+
+    def poll(self, force: bool = False) -> PolicySnapshot:
+        st = os.stat(self.path)
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if force or self._snapshot is None or stamp != self._stamp:
+            self._snapshot = load_snapshot_file(self.path)
+            self._stamp = stamp
+        return self._snapshot
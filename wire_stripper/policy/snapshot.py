@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Mapping
+
+from wire_stripper.enrich.lpm import PrefixIndex, normalize_asn
+
+# Same-name precedence when a domain sits on several lists.
+_DOMAIN_PRECEDENCE = {"white": 0, "black": 1, "grey": 2}
+
+
+def normalize_host(hostname: str) -> str:
+    """Lowercase, drop a trailing dot and any :port (bracketed IPv6 kept as-is)."""
+    host = hostname.strip().lower()
+    if host.startswith("["):
+        return host[1:].split("]", 1)[0]
+    if host.count(":") == 1:
+        host = host.split(":", 1)[0]
+    return host.rstrip(".")
+
+
+# Normalized DNS name: LDH labels of 1-63 chars, 253 total. '_' is allowed
+# because service names (_dmarc, _tcp) do turn up in lists.
+_HOSTNAME_RE = re.compile(
+    r"(?=.{1,253}\Z)(?!-)[a-z0-9_-]{1,63}(?<!-)(?:\.(?!-)[a-z0-9_-]{1,63}(?<!-))*"
+)
+
+
+def is_hostname(name: str) -> bool:
+    """True if `name` is already normalized and safe to write into rule files."""
+    return _HOSTNAME_RE.fullmatch(name) is not None
+
+
+@dataclass(frozen=True)
+class PolicySnapshot:
+    """Immutable, compiled view of one profile's white/grey/black lists.
+
+    Built once from `list_entry` and replaced wholesale when the list generation
+    changes, so evaluation is pure dict lookups with no SQLite round-trips.
+    """
+
+    profile_id: str
+    generation: int
+    # (list_type, target_type) -> {target_value: entry_id}
+    tables: Mapping[tuple[str, str], Mapping[str, str]] = field(
+        default_factory=dict
+    )
+    # list_type -> LPM index of `prefix` targets (value: entry_id)
+    prefixes: Mapping[str, PrefixIndex[str]] = field(default_factory=dict)
+    # domain -> (list_type, entry_id), precedence already resolved per name
+    domains: Mapping[str, tuple[str, str]] = field(default_factory=dict)
+
+    @classmethod
+    def load(
+        cls, conn: sqlite3.Connection, profile_id: str, generation: int
+    ) -> "PolicySnapshot":
+        tables: dict[tuple[str, str], dict[str, str]] = {}
+        prefixes: dict[str, PrefixIndex[str]] = {}
+        domains: dict[str, tuple[str, str]] = {}
+        for entry_id, list_type, target_type, target_value in conn.execute(
+            "SELECT entry_id, list_type, target_type, target_value FROM list_entry WHERE profile_id=?",
+            (profile_id,),
+        ):
+            if target_type == "prefix":
+                try:
+                    prefixes.setdefault(list_type, PrefixIndex()).insert(
+                        target_value, entry_id
+                    )
+                except ValueError:
+                    pass
+                continue
+            if target_type == "asn":
+                target_value = normalize_asn(target_value) or target_value
+            elif target_type == "domain" and list_type in _DOMAIN_PRECEDENCE:
+                name = normalize_host(target_value)
+                prev = domains.get(name)
+                if (
+                    prev is None
+                    or _DOMAIN_PRECEDENCE[list_type] < _DOMAIN_PRECEDENCE[prev[0]]
+                ):
+                    domains[name] = (list_type, entry_id)
+            tables.setdefault((list_type, target_type), {})[target_value] = entry_id
+
+        frozen = {k: MappingProxyType(v) for k, v in tables.items()}
+        return cls(
+            profile_id=profile_id,
+            generation=generation,
+            tables=MappingProxyType(frozen),
+            prefixes=MappingProxyType(prefixes),
+            domains=MappingProxyType(domains),
+        )
+
+    def match(self, list_type: str, target_type: str, target_value: str) -> str | None:
+        table = self.tables.get((list_type, target_type))
+        if table is None:
+            return None
+        return table.get(target_value)
+
+    def match_domain(self, hostname: str) -> tuple[str, str, str] | None:
+        """Most specific list hit for `hostname` or any parent domain.
+
+        Walks the label suffixes (a.b.example.com, b.example.com, ...) and
+        returns (list_type, entry_id, matched_domain) for the first one present.
+        """
+        domains = self.domains
+        if not domains:
+            return None
+        name = normalize_host(hostname)
+        while name:
+            hit = domains.get(name)
+            if hit is not None:
+                return hit[0], hit[1], name
+            dot = name.find(".")
+            if dot < 0:
+                return None
+            name = name[dot + 1 :]
+        return None
+
+    @property
+    def has_asn_rules(self) -> bool:
+        return ("white", "asn") in self.tables or ("black", "asn") in self.tables
+
+    @property
+    def has_entity_rules(self) -> bool:
+        return any((t, "entity") in self.tables for t in _DOMAIN_PRECEDENCE)
+
+    def match_prefix(self, list_type: str, ip: str) -> str | None:
+        index = self.prefixes.get(list_type)
+        if index is None:
+            return None
+        return index.get(ip)
+
+    def __len__(self) -> int:
+        return sum(len(t) for t in self.tables.values()) + sum(
+            len(i) for i in self.prefixes.values()
+        )
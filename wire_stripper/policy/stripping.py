@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import fnmatch
+import re
+from dataclasses import dataclass
+
+from wire_stripper.policy.snapshot import PolicySnapshot
+
+# Client hints and vendor headers that identify the browser/device beyond
+# what the request needs, plus the response headers that ask for them.
+# Removed for greylisted hosts, on top of any grey `header` list entries
+# (which apply to every non-whitelisted host).
+FINGERPRINT_HEADERS = frozenset(
+    {
+        "accept-ch",
+        "critical-ch",
+        "sec-ch-ua",
+        "sec-ch-ua-arch",
+        "sec-ch-ua-bitness",
+        "sec-ch-ua-full-version",
+        "sec-ch-ua-full-version-list",
+        "sec-ch-ua-mobile",
+        "sec-ch-ua-model",
+        "sec-ch-ua-platform",
+        "sec-ch-ua-platform-version",
+        "sec-ch-ua-wow64",
+        "device-memory",
+        "dpr",
+        "viewport-width",
+        "x-client-data",
+    }
+)
+
+Cookie = tuple[str, str]
+
+
+@dataclass(frozen=True)
+class StripPlan:
+    """What to remove from one flow; shared by every host it applies to."""
+
+    all_cookies: bool
+    cookie_names: frozenset[str]
+    cookie_pattern: re.Pattern[str] | None
+    headers: frozenset[str]  # lowercase names
+
+    def strips_cookie(self, name: str) -> bool:
+        if self.all_cookies or name in self.cookie_names:
+            return True
+        return self.cookie_pattern is not None and self.cookie_pattern.match(name) is not None
+
+    def strip_cookie_header(self, value: str) -> tuple[str | None, list[Cookie]]:
+        """Split a Cookie header into (remaining header or None, stripped pairs)."""
+        kept: list[str] = []
+        stripped: list[Cookie] = []
+        for part in value.split(";"):
+            part = part.strip()
+            if not part:
+                continue
+            name, _, val = part.partition("=")
+            name = name.strip()
+            if self.strips_cookie(name):
+                stripped.append((name, val))
+            else:
+                kept.append(part)
+        return ("; ".join(kept) if kept else None), stripped
+
+    def strip_set_cookies(self, values: list[str]) -> tuple[list[str], list[Cookie]]:
+        """Filter Set-Cookie header values into (kept, stripped (name, value))."""
+        kept: list[str] = []
+        stripped: list[Cookie] = []
+        for value in values:
+            name, _, rest = value.partition("=")
+            name = name.strip()
+            if self.strips_cookie(name):
+                stripped.append((name, rest.split(";", 1)[0]))
+            else:
+                kept.append(value)
+        return kept, stripped
+
+
+def _compile_names(values: list[str]) -> tuple[frozenset[str], re.Pattern[str] | None]:
+    exact = frozenset(v for v in values if not any(c in v for c in "*?["))
+    globs = [fnmatch.translate(v) for v in values if v not in exact]
+    return exact, re.compile("|".join(f"(?:{g})" for g in globs)) if globs else None
+
+
+@dataclass(frozen=True)
+class StripRules:
+    """Per-profile stripping matcher compiled from one policy snapshot.
+
+    Grey `cookie` entries (names or globs such as `_ga*`) and grey `header`
+    entries are compiled once into two shared plans: `grey` for greylisted
+    hosts (every cookie, Set-Cookie and FINGERPRINT_HEADERS go) and `named`
+    for other hosts (only the listed cookies and headers). Whitelisted hosts
+    are never touched. `plan()` is a suffix walk over the snapshot's domain
+    map, so there is no regex compilation or database access per flow.
+    """
+
+    snapshot: PolicySnapshot
+    grey: StripPlan
+    named: StripPlan | None
+
+    @classmethod
+    def compile(cls, snapshot: PolicySnapshot) -> "StripRules":
+        cookies, pattern = _compile_names(list(snapshot.tables.get(("grey", "cookie"), {})))
+        headers = frozenset(h.lower() for h in snapshot.tables.get(("grey", "header"), {}))
+        named = (
+            StripPlan(False, cookies, pattern, headers)
+            if cookies or pattern is not None or headers
+            else None
+        )
+        grey = StripPlan(True, cookies, pattern, headers | FINGERPRINT_HEADERS)
+        return cls(snapshot, grey, named)
+
+    def plan(self, hostname: str | None) -> StripPlan | None:
+        if hostname:
+            hit = self.snapshot.match_domain(hostname)
+            if hit is not None:
+                if hit[0] == "white":
+                    return None
+                if hit[0] == "grey":
+                    return self.grey
+        return self.named
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from json.encoder import encode_basestring_ascii
+from typing import Any, Callable, Iterable, Mapping
+
+# Headers that change per request; kept on the event row instead of in the
+# shared set so they don't defeat deduplication.
+VOLATILE_HEADERS = frozenset(
+    {"cookie", "referer", "content-length", "if-none-match", "if-modified-since"}
+)
+# HTTP/2 sends lowercase names, HTTP/1.1 clients Title-Case; matching both
+# spellings directly avoids lowercasing every header on the request path.
+# Other spellings are rare and just land in the (still correct) stable set.
+_VOLATILE_SPELLINGS = VOLATILE_HEADERS | {
+    "-".join(part.capitalize() for part in name.split("-")) for name in VOLATILE_HEADERS
+}
+
+HeaderKey = tuple[tuple[str, str], ...]
+
+
+def split_headers(headers: Iterable[tuple[str, str]]) -> tuple[HeaderKey, dict[str, str]]:
+    """Split into (stable headers as sent, volatile headers keyed lowercase)."""
+    pairs = list(headers)
+    stable = tuple([p for p in pairs if p[0] not in _VOLATILE_SPELLINGS])
+    if len(stable) == len(pairs):
+        return stable, {}
+    return stable, {n.lower(): v for n, v in pairs if n in _VOLATILE_SPELLINGS}
+
+
+def _encode_volatile(volatile: dict[str, str]) -> str:
+    # Same output as json.dumps(volatile), without its per-call setup cost,
+    # which dominates for a two-entry dict on the request path.
+    enc = encode_basestring_ascii
+    return "{" + ", ".join([f"{enc(k)}: {enc(v)}" for k, v in volatile.items()]) + "}"
+
+
+def encode_header_set(stable: HeaderKey) -> str:
+    """Canonical JSON of a header set: the same headers in any order encode identically."""
+    return json.dumps(
+        dict(sorted((name.lower(), value) for name, value in stable)),
+        separators=(",", ":"),
+    )
+
+
+def header_set_id(headers_json: str) -> str:
+    """Content address of a normalized header set (128-bit BLAKE2b, hex)."""
+    return hashlib.blake2b(headers_json.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def expand_headers(
+    set_json: str | None, residual_json: str | None
+) -> dict[str, str]:
+    """Rebuild an event's headers from its header_set row and event.headers_json."""
+    headers = dict(json.loads(set_json)) if set_json else {}
+    if residual_json:
+        headers.update(json.loads(residual_json))
+    return headers
+
+
+class HeaderInterner:
+    """Maps request header sets to `header_set` ids, remembering recent ones.
+
+    `intern()` splits off the volatile headers and looks the rest up in an
+    LRU keyed by the headers as sent; on a hit neither JSON encoding nor
+    hashing nor an insert happens. On a miss the set is canonicalized
+    (sorted), encoded once, hashed, and handed to `emit(id, json)`
+    (normally a BatchWriter submit of INSERT OR IGNORE), so a set evicted
+    and seen again is harmless. If `emit` returns False the set is not
+    remembered, so it is offered again next time.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[str, str], Any],
+        max_entries: int = 4096,
+    ):
+        self.emit = emit
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._ids: OrderedDict[HeaderKey, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def intern(
+        self, headers: Mapping[str, str] | Iterable[tuple[str, str]]
+    ) -> tuple[str | None, str | None]:
+        """Return (header_set_id, volatile headers as JSON or None)."""
+        items = getattr(headers, "items", None)
+        key, volatile = split_headers(items() if items is not None else headers)
+        residual = _encode_volatile(volatile) if volatile else None
+        if not key:
+            return None, residual
+        with self._lock:
+            set_id = self._ids.get(key)
+            if set_id is not None:
+                self._ids.move_to_end(key)
+                self.hits += 1
+                return set_id, residual
+            self.misses += 1
+
+        encoded = encode_header_set(key)
+        set_id = header_set_id(encoded)
+        if self.emit(set_id, encoded) is False:
+            # Not persisted (e.g. writer queue full): retry on the next sighting.
+            return set_id, residual
+        with self._lock:
+            self._ids[key] = set_id
+            while len(self._ids) > self.max_entries:
+                self._ids.popitem(last=False)
+        return set_id, residual
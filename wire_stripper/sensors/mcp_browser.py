@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from wire_stripper.db.store import Store
+from wire_stripper.db.writer import BatchWriter
+from wire_stripper.policy.engine import DecisionResult, PolicyEngine
+from wire_stripper.telemetry.exposition import MetricsDump, metrics_dir
+from wire_stripper.telemetry.metrics import REGISTRY, perf_ns
+
+# Ingest endpoint for the browser (MCP / DevTools) sensor.
+#
+# Wire format: newline-delimited JSON over a Unix socket (or localhost TCP),
+# one event per line:
+#   {"url": "...", "host": "...", "type": "script", "initiator": {...},
+#    "method": "GET", "ts": "2026-01-01T00:00:00", "ip": "...", "port": 443}
+# Only `url` is required. `ts` must be ISO 8601 (the event is rejected
+# otherwise) and is stored as naive UTC like every other sensor's rows.
+# Whatever arrived in one read is one batch: it is parsed with a single
+# json.loads, each distinct host is evaluated once, decisions are added to
+# the per-minute counters, and the events go to the BatchWriter as one
+# queue item. A line {"op": "sync"} flushes the writer and is answered with
+# one JSON line of per-connection totals, e.g.
+#   {"accepted": 1000, "rejected": 2, "dropped": 0, "blocked": 40}
+# so a client can wait for its events to be durable. `dropped` counts
+# events that were valid but did not fit the writer queue in time.
+
+MAX_URL = 8192
+READ_SIZE = 1 << 20
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+_BATCH_TIME = REGISTRY.histogram(
+    "wire_stripper_mcp_batch_seconds", "MCP browser ingest: parse + decide + queue, per batch"
+)
+_EVENTS = {
+    result: REGISTRY.counter(
+        "wire_stripper_mcp_events_total", "MCP browser events by outcome", result=result
+    )
+    for result in ("accepted", "rejected", "dropped")
+}
+
+
+def socket_path(root: str | os.PathLike[str]) -> Path:
+    return Path(root) / "run" / "mcp_browser.sock"
+
+
+def _host(url: str) -> str | None:
+    # urlparse costs ~2 us per call; this is the only part of it needed here.
+    rest = url.partition("://")[2] or url
+    authority = rest.split("/", 1)[0].split("?", 1)[0].split("#", 1)[0]
+    authority = authority.rpartition("@")[2]
+    if authority.startswith("["):
+        return authority[1:].partition("]")[0] or None
+    return authority.partition(":")[0].lower() or None
+
+
+def _str(value: Any) -> str | None:
+    return value if type(value) is str else None
+
+
+def _ts(value: str) -> str | None:
+    """`value` as the store's naive-UTC ISO timestamp, or None if unparseable."""
+    try:
+        ts = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts.isoformat(timespec="seconds")
+
+
+@dataclass
+class BatchResult:
+    accepted: int = 0
+    rejected: int = 0
+    dropped: int = 0
+    blocked: int = 0
+
+    def add(self, other: BatchResult) -> None:
+        self.accepted += other.accepted
+        self.rejected += other.rejected
+        self.dropped += other.dropped
+        self.blocked += other.blocked
+
+
+class McpBrowserIngest:
+    """Turns NDJSON event batches into `event` rows and counted decisions.
+
+    Policy state is loaded and re-polled in an executor (as in
+    AsyncWireStripperAddon), so handling a batch never reads SQLite. The
+    writer blocks (for up to `block_timeout`) instead of dropping when its
+    queue is full; on a connection that wait happens in a separate thread
+    (`ingest_async`), which stalls that connection's reads and pushes back
+    on the sensor without stalling the event loop.
+    """
+
+    def __init__(
+        self,
+        store: Store,
+        profile_id: str = "default",
+        writer: BatchWriter | None = None,
+        refresh_interval: float = 1.0,
+    ):
+        self.store = store
+        self.writer = writer or BatchWriter(
+            store, max_queue=64, batch_size=5000, block_timeout=5.0
+        )
+        self.writer.start()
+        self.policy = PolicyEngine(
+            store,
+            profile_id=profile_id,
+            writer=self.writer,
+            decision_mode="counters",
+            auto_refresh=False,
+        )
+        self.refresh_interval = refresh_interval
+        self.totals = BatchResult()
+        self._prefix = uuid.uuid4().hex
+        self._seq = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="wire-stripper-mcp-policy"
+        )
+        # One thread keeps batches in arrival order on the writer queue.
+        self._submitter = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="wire-stripper-mcp-submit"
+        )
+        self._refresher: asyncio.Task[None] | None = None
+        self._metrics = MetricsDump(metrics_dir(store.paths.root))
+
+    def ingest(self, lines: list[bytes]) -> BatchResult:
+        """Normalize, decide and queue one batch of NDJSON lines (no blank lines).
+
+        Waits here while the writer queue is full; on an event loop use
+        `ingest_async`.
+        """
+        t0 = perf_ns()
+        out, rows, counts = self._decide(lines)
+        queued = self.writer.submit_many("event", rows) if rows else True
+        return self._account(out, rows, counts, queued, t0)
+
+    async def ingest_async(self, lines: list[bytes]) -> BatchResult:
+        """`ingest`, with the writer handoff awaited in the submit thread."""
+        t0 = perf_ns()
+        out, rows, counts = self._decide(lines)
+        queued = True
+        if rows:
+            queued = await asyncio.get_running_loop().run_in_executor(
+                self._submitter, self.writer.submit_many, "event", rows
+            )
+        return self._account(out, rows, counts, queued, t0)
+
+    def _decide(
+        self, lines: list[bytes]
+    ) -> tuple[BatchResult, list[tuple[Any, ...]], dict[tuple[str | None, DecisionResult], int]]:
+        out = BatchResult()
+        try:
+            items = json.loads(b"[" + b",".join(lines) + b"]")
+        except ValueError:
+            items = []
+            for line in lines:
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    out.rejected += 1
+
+        policy = self.policy
+        profile_id = policy.profile_id
+        now = self.store.now()
+        prefix = self._prefix
+        seq = self._seq
+        rows: list[tuple[Any, ...]] = []
+        results: dict[str | None, DecisionResult] = {}
+        counts: dict[tuple[str | None, DecisionResult], int] = {}
+        for item in items:
+            if type(item) is not dict:
+                out.rejected += 1
+                continue
+            url = item.get("url")
+            if type(url) is not str or not url or len(url) > MAX_URL:
+                out.rejected += 1
+                continue
+            ts = item.get("ts")
+            if ts is not None:
+                # Partition, rollup and retention code compare ts as text.
+                ts = _ts(ts) if type(ts) is str else None
+                if ts is None:
+                    out.rejected += 1
+                    continue
+            host = _str(item.get("host")) or _host(url)
+            dst_ip = _str(item.get("ip"))
+            port = item.get("port")
+            initiator = item.get("initiator")
+            if initiator is not None:
+                initiator = _encode(initiator)
+            seq += 1
+            # Same order as EVENT_COLUMNS.
+            rows.append(
+                (
+                    f"{prefix}-{seq:x}",
+                    ts or now,
+                    "mcp_browser",
+                    profile_id,
+                    url,
+                    host,
+                    _str(item.get("method")),
+                    _str(item.get("type")),
+                    None,
+                    dst_ip,
+                    port if type(port) is int else None,
+                    None,
+                    None,
+                    None,
+                    None,
+                    initiator,
+                    None,
+                )
+            )
+            if dst_ip is None:
+                result = results.get(host)
+                if result is None:
+                    result = results[host] = policy.evaluate(host, None)
+            else:
+                result = policy.evaluate(host, dst_ip)
+            ck = (host, result)
+            counts[ck] = counts.get(ck, 0) + 1
+            if result.action == "block":
+                out.blocked += 1
+        self._seq = seq
+        return out, rows, counts
+
+    def _account(
+        self,
+        out: BatchResult,
+        rows: list[tuple[Any, ...]],
+        counts: dict[tuple[str | None, DecisionResult], int],
+        queued: bool,
+        t0: int,
+    ) -> BatchResult:
+        if queued:
+            out.accepted = len(rows)
+        else:
+            out.dropped = len(rows)
+        if counts:
+            # The decisions were made either way; only the event rows are lost.
+            self.policy.record_decision_counts(counts)
+        self.totals.add(out)
+        _EVENTS["accepted"].inc(out.accepted)
+        _EVENTS["rejected"].inc(out.rejected)
+        _EVENTS["dropped"].inc(out.dropped)
+        _BATCH_TIME.observe_ns(perf_ns() - t0)
+        return out
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.policy.warm)
+        self._refresher = loop.create_task(self._refresh_loop())
+        self._metrics.start()
+
+    async def _refresh_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await loop.run_in_executor(self._executor, self.policy.poll)
+            except Exception:
+                continue  # keep serving the current snapshot
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        conn = BatchResult()
+        pending = b""
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if data:
+                    head, sep, pending = (pending + data).rpartition(b"\n")
+                    if not sep:
+                        if len(pending) > READ_SIZE:
+                            break  # a single line this long is not an event
+                        continue
+                else:
+                    # EOF: a last line without its newline is still an event.
+                    head, pending = pending, b""
+                    if not head.strip():
+                        break
+                sync = False
+                batch = []
+                for line in head.split(b"\n"):
+                    if line.startswith(b'{"op"'):
+                        sync = sync or line.replace(b" ", b"") == b'{"op":"sync"}'
+                    elif line.strip():
+                        batch.append(line)
+                if batch:
+                    conn.add(await self.ingest_async(batch))
+                if sync:
+                    await asyncio.get_running_loop().run_in_executor(
+                        self._executor, self.writer.flush
+                    )
+                    writer.write(json.dumps(vars(conn)).encode() + b"\n")
+                    await writer.drain()
+                if not data:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(
+        self,
+        path: str | os.PathLike[str] | None = None,
+        host: str = "127.0.0.1",
+        port: int | None = None,
+    ) -> asyncio.AbstractServer:
+        """Listen on the Unix socket `path` (default) or on host:port."""
+        await self.start()
+        if port is not None:
+            return await asyncio.start_server(self.handle, host, port, limit=READ_SIZE)
+        path = Path(path or socket_path(self.store.paths.root))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.unlink(missing_ok=True)  # stale socket from a crashed run
+        return await asyncio.start_unix_server(self.handle, str(path), limit=READ_SIZE)
+
+    def close(self) -> None:
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+        self.policy.flush_decisions()
+        self._submitter.shutdown(wait=True)
+        self.writer.close()
+        self._executor.shutdown(wait=False)
+        self._metrics.close()
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import os
 import uuid
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import asdict
 from urllib.parse import urlparse
 
 from typing import TYPE_CHECKING, Any
@@ -15,7 +18,21 @@ if TYPE_CHECKING:  # pragma: no cover
     from mitmproxy import http as mhttp  # type: ignore
 
 from wire_stripper.db.store import Store
-from wire_stripper.policy.engine import PolicyEngine
+from wire_stripper.db.writer import BatchWriter
+from wire_stripper.policy.engine import DecisionResult, PolicyEngine
+from wire_stripper.policy.stripping import StripPlan
+from wire_stripper.sensors.header_sets import HeaderInterner
+from wire_stripper.telemetry import metrics
+from wire_stripper.telemetry.exposition import MetricsDump, metrics_dir
+from wire_stripper.telemetry.metrics import REGISTRY, perf_ns
+from wire_stripper.telemetry.profiler import profiler_from_env
+
+_HANDLE_TIME = REGISTRY.histogram(
+    "wire_stripper_addon_handle_seconds", "Per-flow request handling (record + decide + strip)"
+)
+_STRIPPED_COOKIES = REGISTRY.counter(
+    "wire_stripper_stripped_cookies_total", "Cookies removed from requests and responses"
+)
 
 
 def _host_from_url(url: str) -> str | None:
@@ -25,24 +42,91 @@ def _host_from_url(url: str) -> str | None:
         return None
 
 
+def _drop_headers(headers: Any, plan: StripPlan) -> None:
+    if plan.headers:
+        for name in {n for n in headers.keys() if n.lower() in plan.headers}:
+            headers.pop(name, None)
+
+
 class WireStripperAddon:
     """mitmproxy addon: logs, strips, and enforces policy.
 
     v0 behavior:
     - records request metadata as events
     - runs policy engine (domain/ip) and blocks if action==block
+    - events/decisions go through a BatchWriter, so the request path never
+      waits on a SQLite commit
+    - request headers are interned into `header_set`; events keep the set id
+      plus only the volatile headers (cookie, referer, ...) in headers_json
+      (as sent, before stripping)
+    - strips cookies, Set-Cookie and fingerprinting headers per the profile's
+      grey list (see policy.stripping.StripRules); stripped cookies are
+      queued into `cookie_strip`
 
     Future:
-    - cookie/header stripping (port from browser-privacy-proxy)
     - attribution (domain->ip->asn->prefix) via local pfx2as
     """
 
-    def __init__(self, store: Store, profile_id: str = "default"):
+    def __init__(
+        self,
+        store: Store,
+        profile_id: str = "default",
+        writer: BatchWriter | None = None,
+        decision_mode: str = "rows",
+        snapshot_file: str | os.PathLike[str] | None = None,
+    ):
         self.store = store
-        self.policy = PolicyEngine(store, profile_id=profile_id)
+        self.writer = writer or BatchWriter(store)
+        self.writer.start()
+        self.policy = PolicyEngine(
+            store,
+            profile_id=profile_id,
+            writer=self.writer,
+            decision_mode=decision_mode,
+            snapshot_file=snapshot_file,
+        )
+        self.headers = HeaderInterner(
+            lambda set_id, encoded: self.writer.submit(
+                "header_set", (set_id, encoded, self.store.now())
+            )
+        )
+        self.stripped_cookies = 0
+        # Metrics are dumped under <root>/run/metrics for `wire-strip stats`;
+        # WIRE_STRIPPER_PROFILER=cprofile|yappi arms the SIGUSR2 profiler.
+        self.metrics = MetricsDump(metrics_dir(store.paths.root)).start()
+        self.profiler = profiler_from_env(store.paths.root)
+
+    def done(self) -> None:
+        # mitmproxy shutdown hook: drain queued rows before the process exits.
+        self.policy.flush_decisions()
+        self.writer.close()
+        self.metrics.close()
+
+    def stats(self) -> dict[str, Any]:
+        """Writer queue and read-pool counters, for logging or a status endpoint."""
+        pool = self.store.pool_stats()
+        return {
+            "writer": asdict(self.writer.stats),
+            "read_pool": {**asdict(pool), "mean_wait_ms": pool.mean_wait_ms},
+            "decision_cache": {
+                "cached": len(self.policy.decisions),
+                "hits": self.policy.decisions.hits,
+                "misses": self.policy.decisions.misses,
+            },
+            "stripped_cookies": self.stripped_cookies,
+            "header_sets": {
+                "cached": len(self.headers),
+                "hits": self.headers.hits,
+                "misses": self.headers.misses,
+            },
+        }
 
     def request(self, flow: "mhttp.HTTPFlow") -> None:
-        assert http is not None
+        self._enforce(flow, self.handle(flow))
+
+    def handle(self, flow: "mhttp.HTTPFlow") -> DecisionResult:
+        """Record the flow and decide on it; queues rows, never commits inline."""
+        t0 = perf_ns() if metrics.ENABLED else 0
         url = flow.request.pretty_url
         hostname = _host_from_url(url)
         dst_ip = (
@@ -52,37 +136,191 @@ class WireStripperAddon:
         )
 
         event_id = str(uuid.uuid4())
-        self.store.insert_event(
-            {
-                "event_id": event_id,
-                "ts": self.store.now(),
-                "sensor": "mitmproxy",
-                "profile_id": self.policy.profile_id,
-                "url": url,
-                "hostname": hostname,
-                "method": flow.request.method,
-                "resource_type": None,
-                "src_ip": None,
-                "dst_ip": dst_ip,
-                "dst_port": flow.server_conn.address[1]
-                if flow.server_conn and flow.server_conn.address
-                else None,
-                "proto": "tcp",
-                "bytes": None,
-                "headers_json": json.dumps(dict(flow.request.headers)),
-                "cookies_json": None,
-                "initiator_json": None,
-            }
+        header_set_id, volatile_headers = self.headers.intern(
+            flow.request.headers.items()
+        )
+        self.writer.submit(
+            "event",
+            Store.event_params(
+                {
+                    "event_id": event_id,
+                    "ts": self.store.now(),
+                    "sensor": "mitmproxy",
+                    "profile_id": self.policy.profile_id,
+                    "url": url,
+                    "hostname": hostname,
+                    "method": flow.request.method,
+                    "resource_type": None,
+                    "src_ip": None,
+                    "dst_ip": dst_ip,
+                    "dst_port": flow.server_conn.address[1]
+                    if flow.server_conn and flow.server_conn.address
+                    else None,
+                    "proto": "tcp",
+                    "bytes": None,
+                    "headers_json": volatile_headers,
+                    "cookies_json": None,
+                    "initiator_json": None,
+                    "header_set_id": header_set_id,
+                }
+            ),
         )
 
         result = self.policy.evaluate(hostname=hostname, dst_ip=dst_ip)
         self.policy.record_decision(
             url=url, hostname=hostname, dst_ip=dst_ip, result=result
         )
+        if result.action != "block":
+            plan = self.policy.strip_rules.plan(hostname)
+            if plan is not None:
+                self._strip_request(flow, plan, url, hostname, dst_ip)
+        if t0:
+            _HANDLE_TIME.observe_ns(perf_ns() - t0)
+        return result
+
+    def response(self, flow: "mhttp.HTTPFlow") -> None:
+        if flow.response is None:
+            return
+        hostname = flow.request.pretty_host
+        plan = self.policy.strip_rules.plan(hostname)
+        if plan is None:
+            return
+        headers = flow.response.headers
+        _drop_headers(headers, plan)
+        set_cookies = headers.get_all("set-cookie")
+        if set_cookies:
+            kept, stripped = plan.strip_set_cookies(set_cookies)
+            if stripped:
+                headers.set_all("set-cookie", kept)
+                dst_ip = (
+                    flow.server_conn.address[0]
+                    if flow.server_conn and flow.server_conn.address
+                    else None
+                )
+                self._record_stripped(stripped, flow.request.pretty_url, hostname, dst_ip)
+
+    def _strip_request(
+        self,
+        flow: "mhttp.HTTPFlow",
+        plan: StripPlan,
+        url: str,
+        hostname: str | None,
+        dst_ip: str | None,
+    ) -> None:
+        headers = flow.request.headers
+        _drop_headers(headers, plan)
+        values = headers.get_all("cookie")
+        if not values:
+            return
+        kept: list[str] = []
+        stripped: list[tuple[str, str]] = []
+        for value in values:
+            rest, gone = plan.strip_cookie_header(value)
+            if rest is not None:
+                kept.append(rest)
+            stripped.extend(gone)
+        if stripped:
+            headers.set_all("cookie", kept)
+            self._record_stripped(stripped, url, hostname, dst_ip)
+
+    def _record_stripped(
+        self,
+        cookies: list[tuple[str, str]],
+        url: str,
+        hostname: str | None,
+        dst_ip: str | None,
+    ) -> None:
+        now = self.store.now()
+        self.stripped_cookies += len(cookies)
+        _STRIPPED_COOKIES.inc(len(cookies))
+        self.writer.submit_many(
+            "cookie_strip",
+            [
+                (now, self.policy.profile_id, hostname, name, value, dst_ip, url)
+                for name, value in cookies
+            ],
+        )
 
+    @staticmethod
+    def _enforce(flow: "mhttp.HTTPFlow", result: DecisionResult) -> None:
         if result.action == "block":
+            assert http is not None
             flow.response = http.Response.make(
                 451,
                 b"blocked by wire_stripper policy",
                 {"Content-Type": "text/plain"},
             )
+
+
+class AsyncWireStripperAddon(WireStripperAddon):
+    """asyncio-native variant: the event loop only does in-memory work.
+
+    The policy snapshot and ASN index are loaded in an executor before the
+    first flow is handled, and a background task re-polls the list
+    generation there every `refresh_interval` seconds; `evaluate()` itself
+    never touches SQLite. Events, decisions and header sets go to the
+    BatchWriter queue (non-blocking put, so pass a writer with
+    block_timeout=0), and shutdown drains it off-loop.
+    """
+
+    def __init__(
+        self,
+        store: Store,
+        profile_id: str = "default",
+        writer: BatchWriter | None = None,
+        decision_mode: str = "rows",
+        refresh_interval: float = 1.0,
+        executor: Executor | None = None,
+        snapshot_file: str | os.PathLike[str] | None = None,
+    ):
+        super().__init__(store, profile_id, writer, decision_mode, snapshot_file)
+        self.policy.auto_refresh = False
+        self.refresh_interval = refresh_interval
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="wire-stripper-policy"
+        )
+        self._startup: asyncio.Future[None] | None = None
+        self._refresher: asyncio.Task[None] | None = None
+
+    async def running(self) -> None:
+        # mitmproxy hook: proxy is up; warm policy state before traffic.
+        await self._started()
+
+    def _started(self) -> asyncio.Future[None]:
+        if self._startup is None:
+            self._startup = asyncio.ensure_future(self._start())
+        return self._startup
+
+    async def _start(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.policy.warm)
+        self._refresher = loop.create_task(self._refresh_loop())
+
+    async def refresh(self) -> None:
+        """Pick up list changes now instead of at the next interval."""
+        await self._started()
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.policy.poll)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                # Transient SQLite errors: keep serving the current snapshot.
+                continue
+
+    async def ahandle(self, flow: "mhttp.HTTPFlow") -> DecisionResult:
+        await self._started()
+        return self.handle(flow)
+
+    async def request(self, flow: "mhttp.HTTPFlow") -> None:  # type: ignore[override]
+        self._enforce(flow, await self.ahandle(flow))
+
+    async def done(self) -> None:  # type: ignore[override]
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, super().done)
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,11 @@
+"""`mitmdump -s` entry point for one sharded proxy worker.
+
+Started by `wire-strip proxy` (sensors.shard.run_sharded), which sets the
+WIRE_STRIPPER_* environment this reads.
+"""
+
+from __future__ import annotations
+
+from wire_stripper.sensors.shard import worker_addon_from_env
+
+addons = [worker_addon_from_env()]
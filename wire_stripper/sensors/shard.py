@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from wire_stripper.db.remote import ForwardingWriter, WriterServer
+from wire_stripper.db.store import Store
+from wire_stripper.policy.mapped import publish_snapshot, snapshot_path
+from wire_stripper.sensors.mitm_addon import AsyncWireStripperAddon
+from wire_stripper.telemetry.exposition import MetricsDump, MetricsServer, collect, metrics_dir
+
+# Sharded deployment: one supervisor process owns the Store (the only SQLite
+# writer), compiles each profile's lists into a mapped snapshot file, and
+# runs a TCP front that spreads client connections over N mitmdump workers.
+# Workers map the snapshot and forward their rows over a Unix socket.
+
+WORKER_SCRIPT = Path(__file__).with_name("mitm_worker.py")
+
+
+class SnapshotPublisher:
+    """Recompiles snapshot files whenever the list generation moves."""
+
+    def __init__(self, store: Store, profiles: list[str], interval: float = 1.0):
+        self.store = store
+        self.profiles = profiles
+        self.interval = interval
+        self.generation: int | None = None
+        self.published = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def publish(self) -> None:
+        generation = self.store.list_generation()
+        if generation == self.generation:
+            return
+        for profile_id in self.profiles:
+            _, generation = publish_snapshot(self.store, profile_id)
+        self.generation = generation
+        self.published += 1
+
+    def start(self) -> "SnapshotPublisher":
+        self.publish()
+        self._thread = threading.Thread(
+            target=self._run, name="wire-stripper-publisher", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.publish()
+            except Exception:
+                continue  # keep serving the last published snapshot
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 1.0)
+            self._thread = None
+
+
+@dataclass
+class Front:
+    """TCP front for the worker proxies: least-connections byte splice.
+
+    The listener sets SO_REUSEPORT where available, so several front
+    processes can share the public port; each accepted connection is piped
+    to the worker with the fewest open connections (round-robin on ties),
+    falling through to the next one if a worker refuses.
+    """
+
+    host: str
+    port: int
+    backends: list[tuple[str, int]]
+    active: list[int] = field(default_factory=list, init=False)
+    accepted: int = 0
+    failed: int = 0
+    _next: int = field(default=0, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.active = [0] * len(self.backends)
+
+    def listen_socket(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET6 if ":" in self.host else socket.AF_INET)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(1024)
+        sock.setblocking(False)
+        return sock
+
+    async def serve(self) -> asyncio.Server:
+        return await asyncio.start_server(self._handle, sock=self.listen_socket())
+
+    def _order(self) -> list[int]:
+        n = len(self.backends)
+        start = self._next
+        self._next = (start + 1) % n
+        return sorted(range(n), key=lambda i: (self.active[i], (i - start) % n))
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.accepted += 1
+        for i in self._order():
+            try:
+                up_reader, up_writer = await asyncio.open_connection(*self.backends[i])
+            except OSError:
+                continue
+            self.active[i] += 1
+            try:
+                await asyncio.gather(_pipe(reader, up_writer), _pipe(up_reader, writer))
+            finally:
+                self.active[i] -= 1
+            return
+        self.failed += 1
+        writer.close()
+
+
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        try:
+            writer.close()
+        except OSError:
+            pass
+
+
+def worker_env(
+    root: Path, profile_id: str, writer_address: str, authkey: bytes
+) -> dict[str, str]:
+    env = dict(os.environ)
+    package_root = str(Path(__file__).resolve().parents[2])
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (package_root, env.get("PYTHONPATH")) if p)
+    env.update(
+        {
+            "WIRE_STRIPPER_ROOT": str(root),
+            "WIRE_STRIPPER_PROFILE": profile_id,
+            "WIRE_STRIPPER_WRITER_ADDR": writer_address,
+            "WIRE_STRIPPER_WRITER_KEY": authkey.hex(),
+        }
+    )
+    return env
+
+
+def worker_addon_from_env() -> AsyncWireStripperAddon:
+    """Addon for a sharded worker, configured by `worker_env()`.
+
+    The worker's Store is only read (ASN index via the read pool); rows go to
+    the supervisor through a ForwardingWriter, decisions as per-minute
+    counters to keep the single writer's load down, and the policy comes
+    from the mapped snapshot file.
+    """
+    root = os.environ["WIRE_STRIPPER_ROOT"]
+    profile_id = os.environ.get("WIRE_STRIPPER_PROFILE", "default")
+    writer = ForwardingWriter(
+        os.environ["WIRE_STRIPPER_WRITER_ADDR"],
+        authkey=bytes.fromhex(os.environ["WIRE_STRIPPER_WRITER_KEY"]),
+    )
+    return AsyncWireStripperAddon(
+        Store(root),
+        profile_id,
+        writer=writer,
+        decision_mode="counters",
+        snapshot_file=snapshot_path(root, profile_id),
+    )
+
+
+def run_sharded(
+    store: Store,
+    profile_id: str = "default",
+    workers: int | None = None,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    base_port: int = 18080,
+    mitmdump: str = "mitmdump",
+    mitm_args: list[str] | None = None,
+    metrics_port: int | None = None,
+) -> int:
+    """Run N mitmdump workers behind a Front until interrupted.
+
+    With `metrics_port`, serves Prometheus metrics merged over the
+    supervisor and every worker on 127.0.0.1:metrics_port/metrics.
+    """
+    workers = workers or os.cpu_count() or 1
+    root = store.paths.root
+    authkey = os.urandom(32)
+    server = WriterServer(store, root / "run" / "writer.sock", authkey).start()
+    publisher = SnapshotPublisher(store, [profile_id]).start()
+    dump = MetricsDump(metrics_dir(root)).start()
+    endpoint = (
+        MetricsServer(lambda: collect(metrics_dir(root)), port=metrics_port).start()
+        if metrics_port is not None
+        else None
+    )
+    env = worker_env(root, profile_id, server.address, authkey)
+    procs = [
+        subprocess.Popen(
+            [
+                mitmdump,
+                "-q",
+                "-s",
+                str(WORKER_SCRIPT),
+                "--listen-host",
+                "127.0.0.1",
+                "--listen-port",
+                str(base_port + i),
+                *(mitm_args or []),
+            ],
+            env=env,
+        )
+        for i in range(workers)
+    ]
+    front = Front(host, port, [("127.0.0.1", base_port + i) for i in range(workers)])
+
+    async def serve() -> None:
+        listener = await front.serve()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):  # pragma: no cover - Windows
+                pass
+        async with listener:
+            await stop.wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        publisher.close()
+        server.close()
+        dump.close()
+        if endpoint is not None:
+            endpoint.close()
+    return 0 if all(p.returncode in (0, -signal.SIGTERM) for p in procs) else 1
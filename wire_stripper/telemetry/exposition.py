@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable
+
+from wire_stripper.fsutil import write_atomic
+from wire_stripper.telemetry.metrics import REGISTRY, Registry, bucket_bounds, merge, quantile
+
+# Getting metrics out of the process: every process that records metrics
+# dumps `Registry.snapshot()` to `<root>/run/metrics/<pid>.json` every few
+# seconds, and readers (`wire-strip stats`, the Prometheus endpoint) merge
+# whatever dumps are fresh. That covers sharded proxy workers, which have
+# no port of their own, the same way as a single mitmdump.
+
+# Prometheus `le` bounds, in seconds; finer HDR buckets are folded into them.
+PROMETHEUS_BOUNDS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def metrics_dir(root: str | os.PathLike[str]) -> Path:
+    return Path(root) / "run" / "metrics"
+
+
+class MetricsDump:
+    """Periodically writes this process's registry snapshot for other processes to read."""
+
+    def __init__(
+        self,
+        directory: str | os.PathLike[str],
+        registry: Registry = REGISTRY,
+        interval: float = 5.0,
+    ):
+        self.directory = Path(directory)
+        self.registry = registry
+        self.interval = interval
+        self.path = self.directory / f"{os.getpid()}.json"
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def write(self) -> None:
+        snapshot = json.dumps(self.registry.snapshot(), separators=(",", ":"))
+        write_atomic(self.path, snapshot, fsync=False)
+
+    def start(self) -> "MetricsDump":
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="wire-stripper-metrics", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                continue  # e.g. data root unmounted; try again next interval
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 1.0)
+            self._thread = None
+        try:
+            self.write()
+        except OSError:
+            pass
+
+
+def read_dumps(
+    directory: str | os.PathLike[str], max_age: float | None = None
+) -> list[dict[str, Any]]:
+    """Snapshots dumped under `directory`, skipping ones older than `max_age` seconds."""
+    now = time.time()
+    out = []
+    for path in sorted(Path(directory).glob("*.json")):
+        try:
+            snap = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if max_age is None or now - snap.get("time", 0) <= max_age:
+            out.append(snap)
+    return out
+
+
+def collect(
+    directory: str | os.PathLike[str] | None,
+    registry: Registry | None = REGISTRY,
+    max_age: float | None = 60.0,
+) -> list[dict[str, Any]]:
+    """Merge fresh dumps and (live, not its stale dump) the calling process's registry."""
+    snaps = read_dumps(directory, max_age) if directory is not None else []
+    if registry is not None:
+        snaps = [s for s in snaps if s.get("pid") != os.getpid()] + [registry.snapshot()]
+    return merge(snaps)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict[str, str], le: str | None = None) -> str:
+    pairs = sorted(labels.items())
+    if le is not None:
+        pairs.append(("le", le))
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+
+def render_prometheus(metrics: list[dict[str, Any]]) -> str:
+    """Prometheus text exposition (format 0.0.4) of merged metrics."""
+    lines: list[str] = []
+    described: set[str] = set()
+    for m in metrics:
+        name = m["name"]
+        if name not in described:
+            described.add(name)
+            if m["help"]:
+                lines.append(f"# HELP {name} {m['help']}")
+            lines.append(f"# TYPE {name} {m['kind']}")
+        if m["kind"] == "counter":
+            lines.append(f"{name}{_labels(m['labels'])} {m['value']}")
+            continue
+        buckets = sorted((bucket_bounds(int(i))[1], n) for i, n in m["buckets"].items())
+        cumulative, j = 0, 0
+        for bound in PROMETHEUS_BOUNDS:
+            limit = bound * 1e9
+            while j < len(buckets) and buckets[j][0] <= limit:
+                cumulative += buckets[j][1]
+                j += 1
+            lines.append(f"{name}_bucket{_labels(m['labels'], f'{bound:g}')} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(m['labels'], '+Inf')} {m['count']}")
+        lines.append(f"{name}_sum{_labels(m['labels'])} {m['sum_ns'] / 1e9:.9f}")
+        lines.append(f"{name}_count{_labels(m['labels'])} {m['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def render_table(metrics: list[dict[str, Any]]) -> str:
+    """Human-readable summary: counter values, histogram count and percentiles (us)."""
+    rows = []
+    for m in metrics:
+        labels = ",".join(f"{k}={v}" for k, v in sorted(m["labels"].items()))
+        name = f"{m['name']}{{{labels}}}" if labels else m["name"]
+        if m["kind"] == "counter":
+            rows.append(f"{name:<64} {m['value']:>12}")
+            continue
+        count = m["count"]
+        mean = m["sum_ns"] / count / 1e3 if count else 0.0
+        p50, p99, p999 = (quantile(m, q) / 1e3 for q in (0.5, 0.99, 0.999))
+        rows.append(
+            f"{name:<64} {count:>12}  mean {mean:9.1f}  p50 {p50:9.1f}"
+            f"  p99 {p99:9.1f}  p999 {p999:9.1f} us"
+        )
+    return "\n".join(rows)
+
+
+class MetricsServer:
+    """Local HTTP endpoint serving `render_prometheus(source())` at /metrics."""
+
+    def __init__(
+        self,
+        source: Callable[[], list[dict[str, Any]]],
+        host: str = "127.0.0.1",
+        port: int = 9464,
+    ):
+        self.source = source
+        self.host = host
+        self.port = port
+        self._httpd: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        source = self.source
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render_prometheus(source()).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass  # scrapes every few seconds would flood stderr
+
+        return Handler
+
+    def start(self) -> "MetricsServer":
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]  # resolves port 0
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="wire-stripper-metrics-http", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
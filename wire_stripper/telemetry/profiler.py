@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import cProfile
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+try:
+    import yappi  # type: ignore
+except Exception:  # pragma: no cover
+    yappi = None  # type: ignore
+
+PROFILERS = ("cprofile", "yappi")
+
+
+class SignalProfiler:
+    """Opt-in profiler toggled by a signal: first signal starts, the next dumps.
+
+    `kill -USR2 <pid>` starts profiling; the second one (or `max_seconds`
+    later, whichever comes first) stops it and writes
+    `<directory>/<pid>-<time>.pstats`, loadable with `python -m pstats` or snakeviz. cProfile only sees the
+    thread that received the signal (the main thread, i.e. mitmproxy's event
+    loop); yappi, when installed, profiles every thread.
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike[str],
+        kind: str = "cprofile",
+        signum: int = getattr(signal, "SIGUSR2", 0),
+        max_seconds: float = 60.0,
+    ):
+        if kind not in PROFILERS:
+            raise ValueError(f"unknown profiler {kind!r} (expected one of {PROFILERS})")
+        if kind == "yappi" and yappi is None:
+            raise RuntimeError("yappi is not installed")
+        self.directory = Path(directory)
+        self.kind = kind
+        self.signum = signum
+        self.max_seconds = max_seconds
+        self.dumps: list[Path] = []
+        self._profile: cProfile.Profile | None = None
+        self._running = False
+        self._timer: threading.Timer | None = None
+        self._lock = threading.RLock()  # the signal handler may interrupt a holder
+
+    def install(self) -> bool:
+        """Register the signal handler; False off the main thread or without SIGUSR2."""
+        if not self.signum:
+            return False
+        try:
+            signal.signal(self.signum, self._on_signal)
+        except ValueError:
+            return False
+        return True
+
+    def _on_signal(self, signum: int, frame: Any) -> None:
+        if self._running:
+            self.stop()
+        else:
+            self.start()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._running:
+                return
+            if self.kind == "yappi":
+                yappi.clear_stats()
+                yappi.set_clock_type("cpu")
+                yappi.start()
+            else:
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+            self._running = True
+        if self.max_seconds:
+            self._timer = threading.Timer(self.max_seconds, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _expire(self) -> None:
+        # cProfile can only be disabled from the thread it profiles, so
+        # route the timeout through the signal handler on the main thread.
+        if self._running and self.signum:
+            os.kill(os.getpid(), self.signum)
+
+    def stop(self) -> Path | None:
+        """Stop profiling and write the stats file; returns its path."""
+        with self._lock:
+            if not self._running:
+                return None
+            self._running = False
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f"{os.getpid()}-{time.strftime('%Y%m%dT%H%M%S')}.pstats"
+            if self.kind == "yappi":
+                yappi.stop()
+                yappi.get_func_stats().save(str(path), type="pstat")
+            else:
+                assert self._profile is not None
+                self._profile.disable()
+                self._profile.dump_stats(path)
+                self._profile = None
+            self.dumps.append(path)
+            return path
+
+
+def profiler_from_env(root: str | os.PathLike[str]) -> SignalProfiler | None:
+    """Install a SignalProfiler if WIRE_STRIPPER_PROFILER=cprofile|yappi is set.
+
+    Dumps go to WIRE_STRIPPER_PROFILE_DIR (default `<root>/run/profiles`).
+    """
+    kind = os.environ.get("WIRE_STRIPPER_PROFILER")
+    if not kind:
+        return None
+    directory = os.environ.get("WIRE_STRIPPER_PROFILE_DIR") or Path(root) / "run" / "profiles"
+    profiler = SignalProfiler(directory, kind=kind)
+    return profiler if profiler.install() else None